@@ -1,4 +1,4 @@
-from restaurant.menu.database import SQLALCHEMY_DATABASE_URL
+from restaurant.menu.database import url_object
 
 from logging.config import fileConfig
 
@@ -11,7 +11,7 @@ from alembic import context
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+config.set_main_option("sqlalchemy.url", url_object.render_as_string(hide_password=False).replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -0,0 +1,147 @@
+"""add stored submenus_count and dishes_count
+
+Revision ID: 7a4c2e91b3d5
+Revises: a3d51c8e0f27
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4c2e91b3d5'
+down_revision: Union[str, None] = 'a3d51c8e0f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SUBMENU_COUNTERS = """
+CREATE OR REPLACE FUNCTION submenus_counters_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET submenus_count = menus.submenus_count + delta.n,
+                     dishes_count = menus.dishes_count + delta.d
+    FROM (SELECT menu_id, count(*) AS n, sum(dishes_count) AS d FROM new_rows GROUP BY menu_id) AS delta
+    WHERE menus.id = delta.menu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION submenus_counters_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET submenus_count = menus.submenus_count - delta.n,
+                     dishes_count = menus.dishes_count - delta.d
+    FROM (SELECT menu_id, count(*) AS n, sum(dishes_count) AS d FROM old_rows GROUP BY menu_id) AS delta
+    WHERE menus.id = delta.menu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION submenus_counters_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET submenus_count = menus.submenus_count + delta.n,
+                     dishes_count = menus.dishes_count + delta.d
+    FROM (
+        SELECT menu_id, sum(n) AS n, sum(d) AS d FROM (
+            SELECT menu_id, -1 AS n, -dishes_count AS d FROM old_rows
+            UNION ALL
+            SELECT menu_id, 1 AS n, dishes_count AS d FROM new_rows
+        ) AS changes
+        GROUP BY menu_id
+    ) AS delta
+    WHERE menus.id = delta.menu_id AND (delta.n <> 0 OR delta.d <> 0);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER submenus_counters_insert AFTER INSERT ON submenus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_counters_insert();
+
+CREATE TRIGGER submenus_counters_delete AFTER DELETE ON submenus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_counters_delete();
+
+CREATE TRIGGER submenus_counters_update AFTER UPDATE ON submenus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_counters_update();
+"""
+
+DISH_COUNTERS = """
+CREATE OR REPLACE FUNCTION dishes_counters_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE submenus SET dishes_count = submenus.dishes_count + delta.n
+    FROM (SELECT submenu_id, count(*) AS n FROM new_rows GROUP BY submenu_id) AS delta
+    WHERE submenus.id = delta.submenu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dishes_counters_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE submenus SET dishes_count = submenus.dishes_count - delta.n
+    FROM (SELECT submenu_id, count(*) AS n FROM old_rows GROUP BY submenu_id) AS delta
+    WHERE submenus.id = delta.submenu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dishes_counters_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE submenus SET dishes_count = submenus.dishes_count + delta.n
+    FROM (
+        SELECT submenu_id, sum(n) AS n FROM (
+            SELECT submenu_id, -1 AS n FROM old_rows
+            UNION ALL
+            SELECT submenu_id, 1 AS n FROM new_rows
+        ) AS changes
+        GROUP BY submenu_id
+    ) AS delta
+    WHERE submenus.id = delta.submenu_id AND delta.n <> 0;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER dishes_counters_insert AFTER INSERT ON dishes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_counters_insert();
+
+CREATE TRIGGER dishes_counters_delete AFTER DELETE ON dishes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_counters_delete();
+
+CREATE TRIGGER dishes_counters_update AFTER UPDATE ON dishes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_counters_update();
+"""
+
+
+def upgrade() -> None:
+    op.add_column('menus', sa.Column('submenus_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('menus', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('submenus', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE submenus SET dishes_count = counts.dishes_count
+        FROM (SELECT submenu_id, count(*) AS dishes_count FROM dishes GROUP BY submenu_id) AS counts
+        WHERE submenus.id = counts.submenu_id
+    """)
+    op.execute("""
+        UPDATE menus SET submenus_count = counts.submenus_count, dishes_count = counts.dishes_count
+        FROM (SELECT menu_id, count(*) AS submenus_count, sum(dishes_count) AS dishes_count
+              FROM submenus GROUP BY menu_id) AS counts
+        WHERE menus.id = counts.menu_id
+    """)
+    op.execute(SUBMENU_COUNTERS)
+    op.execute(DISH_COUNTERS)
+
+
+def downgrade() -> None:
+    for table in ('submenus', 'dishes'):
+        for action in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_counters_{action} ON {table}')
+            op.execute(f'DROP FUNCTION IF EXISTS {table}_counters_{action}()')
+    op.drop_column('submenus', 'dishes_count')
+    op.drop_column('menus', 'dishes_count')
+    op.drop_column('menus', 'submenus_count')
@@ -0,0 +1,64 @@
+"""create menus, submenus and dishes
+
+Revision ID: a3d51c8e0f27
+Revises: f1d8e43c229c
+Create Date: 2026-10-18 20:37:14.226905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d51c8e0f27'
+down_revision: Union[str, None] = 'f1d8e43c229c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The revisions before this one are empty: main.py used to create the tables itself, so databases it set up
+    # already have them and keep them as they are.
+    if sa.inspect(op.get_bind()).has_table('menus'):
+        return
+    op.create_table(
+        'menus',
+        sa.Column('id', postgresql.UUID(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_menus_title', 'menus', ['title'], unique=True)
+    op.create_table(
+        'submenus',
+        sa.Column('id', postgresql.UUID(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('menu_id', postgresql.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(['menu_id'], ['menus.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_submenus_title', 'submenus', ['title'], unique=True)
+    op.create_table(
+        'dishes',
+        sa.Column('id', postgresql.UUID(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('submenu_id', postgresql.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(['submenu_id'], ['submenus.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_dishes_title', 'dishes', ['title'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dishes_title', table_name='dishes')
+    op.drop_table('dishes')
+    op.drop_index('ix_submenus_title', table_name='submenus')
+    op.drop_table('submenus')
+    op.drop_index('ix_menus_title', table_name='menus')
+    op.drop_table('menus')
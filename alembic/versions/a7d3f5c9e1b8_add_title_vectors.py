@@ -0,0 +1,47 @@
+"""add title vectors to submenus and dishes, and trigram indexes on their descriptions
+
+Revision ID: a7d3f5c9e1b8
+Revises: f4b8c2d6e0a3
+Create Date: 2026-10-18 23:41:36.204817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f5c9e1b8'
+down_revision: Union[str, None] = 'f4b8c2d6e0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TITLE_VECTOR = "to_tsvector('simple', coalesce(title, ''))"
+
+TRIGRAM_INDEX = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS ix_{table}_description_trgm ON {table} USING gin (description gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    for table in ('submenus', 'dishes'):
+        op.add_column(table, sa.Column('title_vector', postgresql.TSVECTOR(),
+                                       sa.Computed(TITLE_VECTOR, persisted=True)))
+        op.create_index(f'ix_{table}_title_vector', table, ['title_vector'], postgresql_using='gin')
+        op.execute(TRIGRAM_INDEX.format(table=table))
+
+
+def downgrade() -> None:
+    for table in ('submenus', 'dishes'):
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_description_trgm')
+        op.drop_index(f'ix_{table}_title_vector', table_name=table)
+        op.drop_column(table, 'title_vector')
@@ -0,0 +1,81 @@
+"""add menus.version for ETags
+
+Revision ID: b8e3f0a1c6d2
+Revises: 7a4c2e91b3d5
+Create Date: 2026-10-18 14:03:52.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e3f0a1c6d2'
+down_revision: Union[str, None] = '7a4c2e91b3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MENU_VERSIONS = """
+CREATE OR REPLACE FUNCTION menus_version_bump() RETURNS trigger AS $$
+BEGIN
+    NEW.version := nextval('menus_version_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER menus_version_bump BEFORE UPDATE ON menus
+    FOR EACH ROW WHEN (OLD.version = NEW.version) EXECUTE FUNCTION menus_version_bump();
+"""
+
+SUBMENU_VERSIONS = """
+CREATE OR REPLACE FUNCTION submenus_version_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET version = nextval('menus_version_seq')
+    WHERE id IN (SELECT menu_id FROM old_rows UNION SELECT menu_id FROM new_rows);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER submenus_version_update AFTER UPDATE ON submenus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_version_update();
+"""
+
+DISH_VERSIONS = """
+CREATE OR REPLACE FUNCTION dishes_version_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET version = nextval('menus_version_seq')
+    WHERE id IN (SELECT submenus.menu_id FROM submenus
+                 WHERE submenus.id IN (SELECT submenu_id FROM old_rows UNION SELECT submenu_id FROM new_rows));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER dishes_version_update AFTER UPDATE ON dishes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_version_update();
+"""
+
+
+def upgrade() -> None:
+    # main.py used to run create_all, which may already have created the sequence on its own.
+    op.execute('CREATE SEQUENCE IF NOT EXISTS menus_version_seq')
+    op.add_column('menus', sa.Column('version', sa.BigInteger(), nullable=False,
+                                     server_default=sa.text("nextval('menus_version_seq')")))
+    op.execute(MENU_VERSIONS)
+    op.execute(SUBMENU_VERSIONS)
+    op.execute(DISH_VERSIONS)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS dishes_version_update ON dishes')
+    op.execute('DROP FUNCTION IF EXISTS dishes_version_update()')
+    op.execute('DROP TRIGGER IF EXISTS submenus_version_update ON submenus')
+    op.execute('DROP FUNCTION IF EXISTS submenus_version_update()')
+    op.execute('DROP TRIGGER IF EXISTS menus_version_bump ON menus')
+    op.execute('DROP FUNCTION IF EXISTS menus_version_bump()')
+    op.drop_column('menus', 'version')
+    op.execute('DROP SEQUENCE IF EXISTS menus_version_seq')
@@ -0,0 +1,177 @@
+"""notify each changed submenu and dish with its parents, and menus only for their own changes
+
+Revision ID: b9e5d1f7a3c6
+Revises: a7d3f5c9e1b8
+Create Date: 2026-10-19 00:37:12.845103
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e5d1f7a3c6'
+down_revision: Union[str, None] = 'a7d3f5c9e1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MENU_NOTIFY = """
+CREATE OR REPLACE FUNCTION menus_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('menu_changes', json_build_object('type', 'menu', 'op', TG_OP, 'id', new_rows.id)::text)
+        FROM old_rows JOIN new_rows USING (id)
+        WHERE (old_rows.title, old_rows.description) IS DISTINCT FROM (new_rows.title, new_rows.description);
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('menu_changes', json_build_object('type', 'menu', 'op', TG_OP, 'id', id)::text)
+        FROM new_rows;
+    ELSE
+        PERFORM pg_notify('menu_changes', json_build_object('type', 'menu', 'op', TG_OP, 'id', id)::text)
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER menus_notify_insert AFTER INSERT ON menus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_update AFTER UPDATE ON menus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_delete AFTER DELETE ON menus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+"""
+
+SUBMENU_NOTIFY = """
+CREATE OR REPLACE FUNCTION submenus_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'id', new_rows.id, 'menu_id', new_rows.menu_id,
+                    'op', CASE WHEN old_rows.menu_id = new_rows.menu_id THEN 'UPDATE' ELSE 'INSERT' END)::text)
+        FROM old_rows JOIN new_rows USING (id)
+        WHERE (old_rows.title, old_rows.description, old_rows.menu_id)
+              IS DISTINCT FROM (new_rows.title, new_rows.description, new_rows.menu_id);
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'op', 'DELETE', 'id', old_rows.id, 'menu_id', old_rows.menu_id)::text)
+        FROM old_rows JOIN new_rows USING (id)
+        WHERE old_rows.menu_id <> new_rows.menu_id;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'op', TG_OP, 'id', id, 'menu_id', menu_id)::text)
+        FROM new_rows;
+    ELSE
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'op', TG_OP, 'id', old_rows.id, 'menu_id', old_rows.menu_id)::text)
+        FROM old_rows JOIN menus ON menus.id = old_rows.menu_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER submenus_notify_insert AFTER INSERT ON submenus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_notify();
+
+CREATE TRIGGER submenus_notify_update AFTER UPDATE ON submenus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_notify();
+
+CREATE TRIGGER submenus_notify_delete AFTER DELETE ON submenus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_notify();
+"""
+
+DISH_NOTIFY = """
+CREATE OR REPLACE FUNCTION dishes_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'id', new_rows.id, 'menu_id', submenus.menu_id, 'submenu_id', new_rows.submenu_id,
+                    'op', CASE WHEN old_rows.submenu_id = new_rows.submenu_id THEN 'UPDATE' ELSE 'INSERT' END)::text)
+        FROM old_rows JOIN new_rows USING (id) JOIN submenus ON submenus.id = new_rows.submenu_id
+        WHERE (old_rows.title, old_rows.description, old_rows.price, old_rows.submenu_id)
+              IS DISTINCT FROM (new_rows.title, new_rows.description, new_rows.price, new_rows.submenu_id);
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'op', 'DELETE', 'id', old_rows.id, 'menu_id', submenus.menu_id,
+                    'submenu_id', old_rows.submenu_id)::text)
+        FROM old_rows JOIN new_rows USING (id) JOIN submenus ON submenus.id = old_rows.submenu_id
+        WHERE old_rows.submenu_id <> new_rows.submenu_id;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'op', TG_OP, 'id', new_rows.id, 'menu_id', submenus.menu_id,
+                    'submenu_id', new_rows.submenu_id)::text)
+        FROM new_rows JOIN submenus ON submenus.id = new_rows.submenu_id;
+    ELSE
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'op', TG_OP, 'id', old_rows.id, 'menu_id', submenus.menu_id,
+                    'submenu_id', old_rows.submenu_id)::text)
+        FROM old_rows JOIN submenus ON submenus.id = old_rows.submenu_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER dishes_notify_insert AFTER INSERT ON dishes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_notify();
+
+CREATE TRIGGER dishes_notify_update AFTER UPDATE ON dishes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_notify();
+
+CREATE TRIGGER dishes_notify_delete AFTER DELETE ON dishes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_notify();
+"""
+
+PREVIOUS_MENU_NOTIFY = """
+CREATE OR REPLACE FUNCTION menus_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('menu_changes', id::text) FROM old_rows;
+    ELSE
+        PERFORM pg_notify('menu_changes', id::text) FROM new_rows;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER menus_notify_insert AFTER INSERT ON menus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_update AFTER UPDATE ON menus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_delete AFTER DELETE ON menus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+"""
+
+
+def drop_triggers(table):
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_notify_{event} ON {table}')
+
+
+def upgrade() -> None:
+    drop_triggers('menus')
+    op.execute(MENU_NOTIFY)
+    op.execute(SUBMENU_NOTIFY)
+    op.execute(DISH_NOTIFY)
+
+
+def downgrade() -> None:
+    for table in ('dishes', 'submenus', 'menus'):
+        drop_triggers(table)
+    op.execute('DROP FUNCTION IF EXISTS dishes_notify()')
+    op.execute('DROP FUNCTION IF EXISTS submenus_notify()')
+    op.execute(PREVIOUS_MENU_NOTIFY)
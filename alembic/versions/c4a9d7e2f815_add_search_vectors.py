@@ -0,0 +1,51 @@
+"""add search vectors and trigram indexes on submenus and dishes, and an index on dishes.price
+
+Revision ID: c4a9d7e2f815
+Revises: b8e3f0a1c6d2
+Create Date: 2026-10-18 16:21:07.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9d7e2f815'
+down_revision: Union[str, None] = 'b8e3f0a1c6d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR = ("setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                 "setweight(to_tsvector('simple', coalesce(description, '')), 'B')")
+
+TRIGRAM_INDEX = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ix_{table}_title_trgm ON {table} USING gin (title gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    for table in ('submenus', 'dishes'):
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(),
+                                       sa.Computed(SEARCH_VECTOR, persisted=True)))
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], postgresql_using='gin')
+        op.execute(TRIGRAM_INDEX.format(table=table))
+    op.create_index('ix_dishes_price', 'dishes', ['price'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dishes_price', table_name='dishes')
+    for table in ('submenus', 'dishes'):
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_title_trgm')
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,28 @@
+"""add parent key indexes on submenus and dishes, in list order
+
+Revision ID: d2f6b8a4e913
+Revises: c4a9d7e2f815
+Create Date: 2026-10-18 18:04:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8a4e913'
+down_revision: Union[str, None] = 'c4a9d7e2f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_submenus_menu_id_title', 'submenus', ['menu_id', 'title', 'id'])
+    op.create_index('ix_dishes_submenu_id_title', 'dishes', ['submenu_id', 'title', 'id'],
+                    postgresql_include=['description', 'price'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dishes_submenu_id_title', table_name='dishes')
+    op.drop_index('ix_submenus_menu_id_title', table_name='submenus')
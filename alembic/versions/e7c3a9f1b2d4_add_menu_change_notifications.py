@@ -0,0 +1,54 @@
+"""notify menu_changes on every write to a menu or below it
+
+Revision ID: e7c3a9f1b2d4
+Revises: d2f6b8a4e913
+Create Date: 2026-10-18 19:41:07.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a9f1b2d4'
+down_revision: Union[str, None] = 'd2f6b8a4e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MENU_NOTIFY = """
+CREATE OR REPLACE FUNCTION menus_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('menu_changes', id::text) FROM old_rows;
+    ELSE
+        PERFORM pg_notify('menu_changes', id::text) FROM new_rows;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER menus_notify_insert AFTER INSERT ON menus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_update AFTER UPDATE ON menus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_delete AFTER DELETE ON menus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+"""
+
+
+def upgrade() -> None:
+    op.execute(MENU_NOTIFY)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS menus_notify_delete ON menus')
+    op.execute('DROP TRIGGER IF EXISTS menus_notify_update ON menus')
+    op.execute('DROP TRIGGER IF EXISTS menus_notify_insert ON menus')
+    op.execute('DROP FUNCTION IF EXISTS menus_notify()')
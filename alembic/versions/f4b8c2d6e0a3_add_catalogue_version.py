@@ -0,0 +1,48 @@
+"""keep the catalogue version on a row every write to menus updates
+
+Revision ID: f4b8c2d6e0a3
+Revises: e7c3a9f1b2d4
+Create Date: 2026-10-18 22:14:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8c2d6e0a3'
+down_revision: Union[str, None] = 'e7c3a9f1b2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CATALOGUE_VERSION = """
+CREATE OR REPLACE FUNCTION catalogue_version_bump() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalogue SET version = nextval('menus_version_seq');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalogue_version_bump AFTER INSERT OR UPDATE OR DELETE ON menus
+    FOR EACH STATEMENT EXECUTE FUNCTION catalogue_version_bump();
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalogue',
+        sa.Column('id', sa.Boolean(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('menus_version_seq')"), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute('INSERT INTO catalogue (id) VALUES (true)')
+    op.execute(CATALOGUE_VERSION)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS catalogue_version_bump ON menus')
+    op.execute('DROP FUNCTION IF EXISTS catalogue_version_bump()')
+    op.drop_table('catalogue')
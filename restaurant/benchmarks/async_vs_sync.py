@@ -0,0 +1,99 @@
+"""Requests/sec of the sync and async request paths under concurrent clients.
+
+Run from the ``restaurant`` directory against a configured database:
+
+    python -m benchmarks.async_vs_sync --concurrency 50 200 1000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.seed import seed, cleanup, urls
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, DB_ASYNC='true' if mode == 'async' else 'false')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--workers', str(workers),
+         '--log-level', 'warning'],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/v1/menus/').status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+async def load(base_url, targets, concurrency, duration):
+    completed = 0
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker(offset):
+            nonlocal completed, errors
+            i = offset
+            while time.monotonic() < deadline:
+                try:
+                    response = await client.get(targets[i % len(targets)])
+                    if response.status_code == 200:
+                        completed += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                i += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return {'rps': round(completed / elapsed, 1), 'requests': completed, 'errors': errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--menus', type=int, default=5)
+    parser.add_argument('--submenus', type=int, default=5)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    cleanup()
+    targets = urls(seed(args.menus, args.submenus, args.dishes))
+    results = {}
+    try:
+        for mode in ('sync', 'async'):
+            server = start_server(mode, args.port, args.workers)
+            try:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(load(f'http://127.0.0.1:{args.port}', targets, concurrency, args.duration))
+                    results[f'{mode}/{concurrency}'] = result
+                    print(f'{mode:>5} c={concurrency:<5} {result["rps"]:>9} req/s  errors={result["errors"]}')
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        cleanup()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Bulk import through POST /import/ versus one POST per item.
+
+    python -m benchmarks.bulk_import --menus 10 --submenus 10 --dishes 1000
+"""
+import argparse
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.seed import cleanup, TITLE_PREFIX
+from main import app
+
+PREFIX = '/api/v1/menus'
+
+
+def payload(menus, submenus, dishes):
+    return [{'title': f'{TITLE_PREFIX}{m}', 'description': '',
+             'submenus': [{'title': f'{TITLE_PREFIX}{m}-{s}', 'description': '',
+                           'dishes': [{'title': f'{TITLE_PREFIX}{m}-{s}-{d}', 'description': '', 'price': f'{d}.50'}
+                                      for d in range(dishes)]}
+                          for s in range(submenus)]}
+            for m in range(menus)]
+
+
+def one_by_one(client, menus):
+    for menu in menus:
+        menu_id = client.post(f'{PREFIX}/', json={'title': menu['title'], 'description': ''}).json()['id']
+        for submenu in menu['submenus']:
+            submenu_id = client.post(f'{PREFIX}/{menu_id}/submenus/',
+                                     json={'title': submenu['title'], 'description': ''}).json()['id']
+            for dish in submenu['dishes']:
+                client.post(f'{PREFIX}/{menu_id}/submenus/{submenu_id}/dishes/', json=dish)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=1000)
+    parser.add_argument('--sample', type=int, default=2000, help='dishes posted one by one for the per-item rate')
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    menus = payload(args.menus, args.submenus, args.dishes)
+    total = args.menus * args.submenus * args.dishes
+    cleanup()
+    try:
+        for name, content_type, body in (
+                ('json', 'application/json', json.dumps(menus)),
+                ('ndjson', 'application/x-ndjson', '\n'.join(json.dumps(menu) for menu in menus))):
+            started = time.perf_counter()
+            response = client.post(f'{PREFIX}/import/', content=body, headers={'content-type': content_type})
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 201, response.text
+            print(f'import {name:<6} {total} dishes  {elapsed:8.2f} s  {total / elapsed:10.0f} dishes/s')
+            cleanup()
+
+        sample = payload(1, 1, args.sample)
+        started = time.perf_counter()
+        one_by_one(client, sample)
+        elapsed = time.perf_counter() - started
+        print(f'one by one   {args.sample} dishes  {elapsed:8.2f} s  {args.sample / elapsed:10.0f} dishes/s'
+              f'  (~{total / args.sample * elapsed:.0f} s for {total})')
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
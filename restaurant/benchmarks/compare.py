@@ -0,0 +1,58 @@
+"""Compare two benchmarks.endpoints JSON results and flag regressions.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.2
+
+Exits with status 1 when any route got slower than the threshold at p50 or p90, or runs more queries per request.
+"""
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p90_ms')
+
+
+def compare(before, after, threshold):
+    rows, regressions = [], []
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name), after.get(name)
+        if old is None or new is None:
+            rows.append((name, 'only in ' + ('after' if old is None else 'before')))
+            continue
+        changes = []
+        for metric in METRICS:
+            if metric in old and metric in new and old[metric]:
+                ratio = new[metric] / old[metric] - 1
+                changes.append(f'{metric} {old[metric]:8.2f} -> {new[metric]:8.2f} ({ratio:+6.1%})')
+                if ratio > threshold:
+                    regressions.append(f'{name} {metric} {ratio:+.1%}')
+        if 'queries' in old and 'queries' in new:
+            changes.append(f"queries {old['queries']:g} -> {new['queries']:g}")
+            if new['queries'] > old['queries']:
+                regressions.append(f"{name} queries {old['queries']:g} -> {new['queries']:g}")
+        rows.append((name, '  '.join(changes)))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative slowdown, default 20%%')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before.get('meta') != after.get('meta'):
+        print(f"warning: runs used different settings: {before.get('meta')} vs {after.get('meta')}")
+    rows, regressions = compare(before['endpoints'], after['endpoints'], args.threshold)
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    for name, text in rows:
+        print(f'{name:<12} {text}')
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Python-side CPU of the hot reads, with queries built once at import versus rebuilt on every call.
+
+    python -m benchmarks.compiled_queries --calls 2000
+
+CPU time is this process's alone, so the database's share of each read is left out.
+"""
+import argparse
+import time
+
+from sqlalchemy import and_, tuple_
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import seed, cleanup
+from menu import crud, models
+from menu.database import engine
+from menu.pagination import decode_cursor
+
+
+def keyset(query, model, limit=None, after=None):
+    query = query.order_by(model.title, model.id)
+    if after is not None:
+        query = query.filter(tuple_(model.title, model.id) > tuple_(*decode_cursor(after)))
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+# The reads as crud built them before, a new Query on every call.
+
+def rebuilt_menus(db, limit=None, after=None):
+    menus = db.query(models.Menu.id, models.Menu.title, models.Menu.description, models.Menu.submenus_count,
+                     models.Menu.dishes_count)
+    return keyset(menus, models.Menu, limit, after).all()
+
+
+def rebuilt_menu(db, menu_id):
+    return db.query(models.Menu.id, models.Menu.title, models.Menu.description, models.Menu.submenus_count,
+                    models.Menu.dishes_count).filter(models.Menu.id == menu_id).first()
+
+
+def rebuilt_submenus(db, menu_id, limit=None, after=None):
+    submenus = db.query(models.SubMenu.id, models.SubMenu.title, models.SubMenu.description,
+                        models.SubMenu.dishes_count).filter(models.SubMenu.menu_id == menu_id)
+    return keyset(submenus, models.SubMenu, limit, after).all()
+
+
+def rebuilt_dishes(db, submenu_id, menu_id, limit=None, after=None):
+    dishes = (db.query(models.Dish).select_from(models.Dish).join(models.SubMenu).join(models.Menu)
+              .filter(and_(models.SubMenu.id == submenu_id, models.Menu.id == menu_id)))
+    return keyset(dishes, models.Dish, limit, after).all()
+
+
+def cpu_per_call(func, calls):
+    started = time.process_time()
+    for _ in range(calls):
+        func()
+    return (time.process_time() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--submenus', type=int, default=5)
+    parser.add_argument('--dishes', type=int, default=20)
+    args = parser.parse_args()
+
+    cleanup()
+    tree = seed(1, args.submenus, args.dishes)
+    menu_id, submenu_id = tree[0]['id'], tree[0]['submenus'][0]['id']
+    reads = {
+        'menus page': (lambda db: rebuilt_menus(db, limit=10), lambda db: crud.get_menus(db, limit=10)),
+        'menu': (lambda db: rebuilt_menu(db, menu_id), lambda db: crud.get_menu_by_id(db, menu_id)),
+        'submenus': (lambda db: rebuilt_submenus(db, menu_id), lambda db: crud.get_submenus(db, menu_id)),
+        'dishes page': (lambda db: rebuilt_dishes(db, submenu_id, menu_id, limit=10),
+                        lambda db: crud.get_dishes(db, submenu_id, menu_id, limit=10)),
+    }
+    try:
+        with Session(engine) as db:
+            print(f'Python CPU per call, {args.calls} calls each')
+            for name, (rebuilt, built_once) in reads.items():
+                # Warm both the compiled cache and the connection first.
+                cpu_per_call(lambda: rebuilt(db), 50)
+                cpu_per_call(lambda: built_once(db), 50)
+                before = cpu_per_call(lambda: rebuilt(db), args.calls)
+                after = cpu_per_call(lambda: built_once(db), args.calls)
+                print(f'  {name:<12} rebuilt {before:8.1f} us   built once {after:8.1f} us   {before / after:5.2f}x')
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Bytes on the wire and CPU per request for each Accept-Encoding, with bodies compressed once per ETag versus on
+every request.
+
+    python -m benchmarks.compression --dishes 10 1000 --requests 200
+
+CPU is the process's, for whole requests served in process, so every column pays for the same database read and
+serialization; the differences are the compression.
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.seed import seed, cleanup
+from main import create_app
+from menu import compression, config
+from menu.config import Settings
+
+
+def cpu_per_request(client, url, coding, requests):
+    headers = {'Accept-Encoding': coding}
+    response = client.get(url, headers=headers)
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    return (time.process_time() - started) / requests * 1000, response.num_bytes_downloaded
+
+
+def measure(cache_bytes, urls, codings, requests):
+    """CPU and wire bytes per (url name, coding), served by an app whose compressed-body cache holds `cache_bytes`."""
+    config.COMPRESSION_CACHE_BYTES = cache_bytes
+    with TestClient(create_app(Settings(compression=True, metrics=False, query_stats=False))) as client:
+        return {(name, coding): cpu_per_request(client, url, coding, requests)
+                for name, url in urls.items() for coding in codings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dishes', type=int, nargs='+', default=[10, 1000])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    codings = ['identity', 'gzip'] + (['br'] if compression.brotli else [])
+    default_bytes = config.COMPRESSION_CACHE_BYTES
+    for size in args.dishes:
+        cleanup()
+        tree = seed(1, 1, size)
+        menu_url = f"/api/v1/menus/{tree[0]['id']}/"
+        urls = {'dishes': f"{menu_url}submenus/{tree[0]['submenus'][0]['id']}/dishes/",
+                'tree': f"/api/v1/menus/tree/?menu_id={tree[0]['id']}"}
+        try:
+            cached = measure(default_bytes, urls, codings, args.requests)
+            # Nothing fits in a cache of 0 bytes, so every request compresses again.
+            uncached = measure(0, urls, codings, args.requests)
+        finally:
+            cleanup()
+        print(f'{size} dishes           wire bytes   cpu cached   cpu per request')
+        for name, coding in cached:
+            (cached_ms, wire), (uncached_ms, _) = cached[name, coding], uncached[name, coding]
+            print(f'  {name:<7} {coding:<8} {wire:>12} {cached_ms:9.3f} ms {uncached_ms:13.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
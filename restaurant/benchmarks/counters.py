@@ -0,0 +1,63 @@
+"""Menu and submenu list reads with stored counters versus counting on every read.
+
+    python -m benchmarks.counters --dishes 10000 100000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import seed, cleanup
+from menu import counters, crud, models
+from menu.database import engine
+
+
+def aggregated_menus(db):
+    return db.execute(counters.aggregated_menus()).all()
+
+
+def aggregated_submenus(db, menu_id):
+    return db.execute(
+        select(models.SubMenu.id, models.SubMenu.title, models.SubMenu.description,
+               select(func.count(models.Dish.id)).where(models.SubMenu.id == models.Dish.submenu_id)
+               .scalar_subquery())
+        .filter(models.SubMenu.menu_id == menu_id)
+    ).all()
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dishes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for total in args.dishes:
+        cleanup()
+        tree = seed(args.menus, args.submenus, max(total // (args.menus * args.submenus), 1))
+        menu_id = tree[0]['id']
+        try:
+            with Session(engine) as db:
+                print(f'{total} dishes')
+                print(f'  menus     stored {timed(lambda: crud.get_menus(db), args.repeat):8.2f} ms   '
+                      f'aggregated {timed(lambda: aggregated_menus(db), args.repeat):8.2f} ms')
+                print(f'  submenus  stored {timed(lambda: crud.get_submenus(db, menu_id), args.repeat):8.2f} ms   '
+                      f'aggregated {timed(lambda: aggregated_submenus(db, menu_id), args.repeat):8.2f} ms')
+        finally:
+            cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Latency percentiles per API route, in process over ASGI or against multi-worker uvicorn.
+
+Run from the ``restaurant`` directory against a configured database:
+
+    python -m benchmarks.endpoints --requests 200 --output before.json
+    python -m benchmarks.endpoints --mode uvicorn --workers 4 --concurrency 32 --duration 5
+    python -m benchmarks.compare before.json after.json
+
+Set DB_ASYNC=true to measure the async request path instead. The JSON output is written with sorted keys and
+no timestamps so two runs can be diffed directly.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import time
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks.async_vs_sync import start_server
+from benchmarks.seed import seed, cleanup, TITLE_PREFIX
+from menu import config, database
+
+PREFIX = '/api/v1/menus'
+
+
+def endpoints(tree):
+    """Route name -> (method, url, json body) for one representative resource of each route."""
+    menu = tree[0]
+    submenu = menu['submenus'][0]
+    menu_url = f"{PREFIX}/{menu['id']}/"
+    submenu_url = f"{menu_url}submenus/{submenu['id']}/"
+    dish_url = f"{submenu_url}dishes/{submenu['dishes'][0]}/"
+    return {
+        'menus': ('GET', f'{PREFIX}/', None),
+        'menus_page': ('GET', f'{PREFIX}/?limit=10', None),
+        'menu': ('GET', menu_url, None),
+        'submenus': ('GET', f'{menu_url}submenus/', None),
+        'submenu': ('GET', submenu_url, None),
+        'dishes': ('GET', f'{submenu_url}dishes/', None),
+        'dishes_page': ('GET', f'{submenu_url}dishes/?limit=10', None),
+        'dish': ('GET', dish_url, None),
+        'tree': ('GET', f'{PREFIX}/tree/', None),
+        'tree_menu': ('GET', f"{PREFIX}/tree/?menu_id={menu['id']}", None),
+        'update_dish': ('PATCH', dish_url, {'title': f'{TITLE_PREFIX}0-0-0', 'description': '', 'price': '1.50'}),
+    }
+
+
+def summary(timings, elapsed=None):
+    if len(timings) < 2:
+        return {'requests': len(timings)}
+    timings = sorted(timings)
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    result = {
+        'requests': len(timings),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p90_ms': round(cuts[89] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+    }
+    if elapsed:
+        result['rps'] = round(len(timings) / elapsed, 1)
+    return result
+
+
+class StatementCounter:
+    def __init__(self, engines):
+        self.engines = engines
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, 'before_cursor_execute', self)
+
+
+async def run_asgi(targets, requests, warmup):
+    from main import app
+
+    engines = [database.engine]
+    if config.DB_ASYNC:
+        engines.append(database.async_engine.sync_engine)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        for name, (method, url, body) in targets.items():
+            for _ in range(warmup):
+                (await client.request(method, url, json=body)).raise_for_status()
+            timings = []
+            with StatementCounter(engines) as statements:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = await client.request(method, url, json=body)
+                    timings.append(time.perf_counter() - started)
+                    response.raise_for_status()
+            results[name] = {**summary(timings), 'queries': round(statements.count / requests, 2)}
+            print(f'{name:<12} p50 {results[name]["p50_ms"]:8.2f} ms  p99 {results[name]["p99_ms"]:8.2f} ms  '
+                  f'{results[name]["queries"]:5} queries')
+    return results
+
+
+async def run_load(base_url, method, url, body, concurrency, duration):
+    timings = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body)
+                    if response.is_success:
+                        timings.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return {**summary(timings, elapsed), 'errors': errors}
+
+
+def run_uvicorn(targets, args):
+    server = start_server('async' if config.DB_ASYNC else 'sync', args.port, args.workers)
+    results = {}
+    try:
+        for name, (method, url, body) in targets.items():
+            results[name] = asyncio.run(run_load(f'http://127.0.0.1:{args.port}', method, url, body,
+                                                 args.concurrency, args.duration))
+            result = results[name]
+            print(f'{name:<12} p50 {result.get("p50_ms", 0):8.2f} ms  p99 {result.get("p99_ms", 0):8.2f} ms  '
+                  f'{result.get("rps", 0):9} req/s  errors={result["errors"]}')
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['asgi', 'uvicorn'], default='asgi')
+    parser.add_argument('--menus', type=int, default=5)
+    parser.add_argument('--submenus', type=int, default=5)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--only', nargs='+', help='route names to run, default all')
+    parser.add_argument('--requests', type=int, default=200, help='asgi mode: timed requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='asgi mode: untimed requests per route')
+    parser.add_argument('--workers', type=int, default=4, help='uvicorn mode: server processes')
+    parser.add_argument('--concurrency', type=int, default=32, help='uvicorn mode: concurrent clients')
+    parser.add_argument('--duration', type=float, default=5, help='uvicorn mode: seconds per route')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    cleanup()
+    tree = seed(args.menus, args.submenus, args.dishes)
+    targets = endpoints(tree)
+    if args.only:
+        targets = {name: targets[name] for name in args.only}
+    try:
+        if args.mode == 'asgi':
+            results = asyncio.run(run_asgi(targets, args.requests, args.warmup))
+        else:
+            results = run_uvicorn(targets, args)
+    finally:
+        cleanup()
+    if args.output:
+        meta = {key: getattr(args, key) for key in ('mode', 'menus', 'submenus', 'dishes', 'requests', 'workers',
+                                                    'concurrency', 'duration')}
+        meta['async'] = config.DB_ASYNC
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'meta': meta, 'endpoints': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""CPU per dishes list response through FastAPI's response_model versus the FAST_JSON path.
+
+    python -m benchmarks.fast_json --sizes 10 1000 10000
+
+Each response is a whole request served in process, database read included, so both columns pay for that alike.
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.seed import seed, cleanup
+from main import app
+from menu import config, fast_json
+
+
+def cpu_per_response(client, url, requests):
+    client.get(url)
+    started = time.process_time()
+    for _ in range(requests):
+        assert client.get(url).status_code == 200
+    return (time.process_time() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--without-orjson', action='store_true', help='measure the TypeAdapter.dump_json fallback')
+    args = parser.parse_args()
+
+    if args.without_orjson:
+        fast_json.orjson = None
+
+    client = TestClient(app)
+    print(f"Serializing with {'orjson' if fast_json.orjson else 'TypeAdapter.dump_json'}")
+    for size in args.sizes:
+        cleanup()
+        tree = seed(1, 1, size)
+        url = f"/api/v1/menus/{tree[0]['id']}/submenus/{tree[0]['submenus'][0]['id']}/dishes/"
+        requests = max(args.requests * 1000 // size, 5)
+        try:
+            config.FAST_JSON = False
+            model = cpu_per_response(client, url, requests)
+            config.FAST_JSON = True
+            fast = cpu_per_response(client, url, requests)
+            print(f'  {size:>6} dishes  response_model {model:8.2f} ms   fast {fast:8.2f} ms   {model / fast:5.2f}x')
+        finally:
+            cleanup()
+
+
+if __name__ == '__main__':
+    main()
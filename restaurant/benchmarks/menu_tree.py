@@ -0,0 +1,75 @@
+"""Full menu tree in one request versus the menus -> submenus -> dishes fan-out.
+
+    python -m benchmarks.menu_tree --menus 10 --submenus 10 --dishes 20 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from benchmarks.seed import seed, cleanup
+from main import app
+from menu.database import engine
+
+PREFIX = '/api/v1/menus'
+
+
+def fan_out(client):
+    requests = 1
+    menus = client.get(f'{PREFIX}/').json()
+    for menu in menus:
+        submenus = client.get(f"{PREFIX}/{menu['id']}/submenus/").json()
+        requests += 1
+        for submenu in submenus:
+            client.get(f"{PREFIX}/{menu['id']}/submenus/{submenu['id']}/dishes/").json()
+            requests += 1
+    return requests
+
+
+def tree(client):
+    client.get(f'{PREFIX}/tree/').json()
+    return 1
+
+
+def measure(name, func, client, repeat):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for _ in range(repeat):
+            statements.clear()
+            started = time.perf_counter()
+            requests = func(client)
+            timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    print(f'{name:>8}: {statistics.median(timings) * 1000:9.1f} ms median  '
+          f'{requests:5} requests  {len(statements):5} queries')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cleanup()
+    seed(args.menus, args.submenus, args.dishes)
+    try:
+        client = TestClient(app)
+        measure('fan-out', fan_out, client, args.repeat)
+        measure('tree', tree, client, args.repeat)
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
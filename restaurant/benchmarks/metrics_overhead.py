@@ -0,0 +1,55 @@
+"""Per-request cost of MetricsMiddleware around an ASGI app that does nothing.
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from menu.metrics import Metrics, MetricsMiddleware
+
+
+class Route:
+    path = '/api/v1/menus/{menu_id}/'
+    methods = {'GET'}
+
+
+ROUTE = Route()
+START = {'type': 'http.response.start', 'status': 200, 'headers': []}
+BODY = {'type': 'http.response.body', 'body': b'{"id": "x"}'}
+
+
+async def app(scope, receive, send):
+    scope['route'] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def send(message):
+    pass
+
+
+async def run(handler, requests):
+    scope = {'type': 'http', 'method': 'GET', 'path': '/'}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await handler(dict(scope), None, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    middleware = MetricsMiddleware(app, Metrics())
+    bare = min(asyncio.run(run(app, args.requests)) for _ in range(args.repeat))
+    wrapped = min(asyncio.run(run(middleware, args.requests)) for _ in range(args.repeat))
+    print(f'bare app      {bare:6.2f} us/request')
+    print(f'with metrics  {wrapped:6.2f} us/request')
+    print(f'overhead      {wrapped - bare:6.2f} us/request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Cross-worker invalidation: how long a committed write takes to reach another worker's listener, and what the
+menus_notify triggers add to the writes themselves.
+
+    python -m benchmarks.notify --writes 200 --menus 100 --submenus 10 --dishes 10
+
+The triggers are disabled for the baseline with ALTER TABLE, so run this against a database nothing else writes to.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import seed, cleanup
+from menu import database, models, notify
+from menu.notify import InvalidationListener
+
+TRIGGERS = ('menus_notify_insert', 'menus_notify_update', 'menus_notify_delete')
+
+
+def propagation(tree, writes):
+    arrived, received = {}, threading.Event()
+    applied = notify.apply
+
+    def apply(menu_id):
+        arrived[menu_id] = time.perf_counter()
+        received.set()
+        applied(menu_id)
+
+    notify.apply = apply
+    listener = InvalidationListener(database.engine.url)
+    listener.start()
+    listener.listening.wait()
+    latencies = []
+    try:
+        submenu_id = tree[0]['submenus'][0]['id']
+        with Session(database.engine) as session:
+            for write in range(writes):
+                received.clear()
+                session.execute(update(models.SubMenu).filter(models.SubMenu.id == submenu_id)
+                                .values(description=f'write {write}'))
+                # From before the COMMIT: the listener often has the notification before commit() returns here.
+                committing = time.perf_counter()
+                session.commit()
+                assert received.wait(5), 'no notification'
+                latencies.append(arrived[tree[0]['id']] - committing)
+    finally:
+        listener.stop()
+        notify.apply = applied
+    return latencies
+
+
+def set_triggers(enabled):
+    with Session(database.engine) as session:
+        for trigger in TRIGGERS:
+            session.execute(text(f"ALTER TABLE menus {'ENABLE' if enabled else 'DISABLE'} TRIGGER {trigger}"))
+        session.commit()
+
+
+def timed_seed(args, enabled):
+    set_triggers(enabled)
+    try:
+        started = time.perf_counter()
+        seed(args.menus, args.submenus, args.dishes)
+        return time.perf_counter() - started
+    finally:
+        set_triggers(True)
+        cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--menus', type=int, default=100)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=10)
+    args = parser.parse_args()
+
+    cleanup()
+    try:
+        latencies = sorted(propagation(seed(1, 1, 1), args.writes))
+    finally:
+        cleanup()
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'COMMIT sent -> listener  p50 {cuts[49] * 1000:6.2f} ms   p99 {cuts[98] * 1000:6.2f} ms   '
+          f'max {latencies[-1] * 1000:6.2f} ms over {len(latencies)} writes')
+
+    without = min(timed_seed(args, False) for _ in range(3))
+    with_triggers = min(timed_seed(args, True) for _ in range(3))
+    rows = args.menus * (1 + args.submenus * (1 + args.dishes))
+    print(f'bulk insert of {rows} rows  without {without * 1000:8.1f} ms   with triggers {with_triggers * 1000:8.1f} ms'
+          f'   +{(with_triggers / without - 1) * 100:.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Deep dish pages with keyset cursors versus LIMIT/OFFSET.
+
+    python -m benchmarks.pagination --dishes 100000 --page 50
+"""
+import argparse
+
+from sqlalchemy import and_, text
+from sqlalchemy.orm import Session
+
+from benchmarks.counters import timed
+from benchmarks.seed import seed, cleanup
+from menu import crud, models
+from menu.database import engine
+from menu.pagination import encode_cursor
+
+
+def offset_page(db, menu_id, submenu_id, offset, limit):
+    return (db.query(models.Dish).select_from(models.Dish).join(models.SubMenu).join(models.Menu)
+            .filter(and_(models.SubMenu.id == submenu_id, models.Menu.id == menu_id))
+            .order_by(models.Dish.title, models.Dish.id).offset(offset).limit(limit).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dishes', type=int, default=100000)
+    parser.add_argument('--page', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    cleanup()
+    tree = seed(1, 1, args.dishes)
+    menu_id, submenu_id = tree[0]['id'], tree[0]['submenus'][0]['id']
+    depths = sorted({0, 1000, args.dishes // 10, args.dishes // 2, args.dishes - args.page})
+    try:
+        with Session(engine) as db:
+            db.execute(text('ANALYZE menus, submenus, dishes'))
+            print(f'{args.dishes} dishes, page of {args.page}')
+            for depth in depths:
+                after = None
+                if depth:
+                    after = encode_cursor(offset_page(db, menu_id, submenu_id, depth - 1, 1)[0])
+                keyset_ms = timed(lambda: crud.get_dishes(db, submenu_id, menu_id, limit=args.page, after=after),
+                                  args.repeat)
+                offset_ms = timed(lambda: offset_page(db, menu_id, submenu_id, depth, args.page), args.repeat)
+                print(f'  depth {depth:>8}  keyset {keyset_ms:8.2f} ms   offset {offset_ms:8.2f} ms')
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
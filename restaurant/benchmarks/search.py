@@ -0,0 +1,112 @@
+"""Search latency percentiles over a large seeded catalogue.
+
+    python -m benchmarks.search --menus 10 --submenus 100 --dishes 1000 --requests 200 --keep
+
+Seeding a million dishes takes a few minutes; --keep leaves them in place for the next run, which reuses them.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import seed, cleanup, TITLE_PREFIX
+from main import app
+from menu import models
+from menu.database import engine
+from menu.pagination import NEXT_CURSOR_HEADER
+
+URL = '/api/v1/search/'
+VOCABULARY = (
+    'apple apricot artichoke asparagus aubergine avocado bacon basil bean beef beetroot berry biscuit blueberry '
+    'bread brioche broccoli brownie burger butter cabbage cake caramel carrot cashew cauliflower celery cheddar '
+    'cheese cherry chestnut chicken chickpea chili chive chocolate chorizo cinnamon clam coconut cod coffee cookie '
+    'coriander corn couscous crab cranberry cream crepe cucumber cumin curry custard date dill dumpling duck egg '
+    'fennel feta fig fish garlic ginger goat gnocchi grape gravy haddock halibut ham hazelnut herring honey hummus '
+    'jam kale lamb lasagna leek lemon lentil lettuce lime lobster mackerel mango maple melon mint miso mozzarella '
+    'muffin mushroom mussel mustard noodle nutmeg oat octopus olive onion orange oregano oyster pancake papaya '
+    'paprika parmesan parsley pasta pastry peach peanut pear pea pecan pepper pesto pie pineapple pistachio pizza '
+    'plum pork potato prawn pumpkin quail quinoa radish raisin raspberry ravioli rice risotto rosemary saffron '
+    'sage salad salmon sardine sausage scallop sesame shrimp soup spinach squid steak strawberry sushi tahini taco '
+    'tart thyme toast tofu tomato trout truffle tuna turkey vanilla veal venison waffle walnut wasabi yogurt '
+    'baked boiled braised charred crispy fried glazed grilled hot mild poached roasted salted seared smoked spicy '
+    'steamed stewed sweet toasted').split()
+
+
+def queries(rng):
+    """Query kind -> a function returning the params of one request of that kind."""
+    word = lambda: rng.choice(VOCABULARY)
+    return {
+        'word': lambda: {'q': word()},
+        'prefix': lambda: {'q': word()[:3]},
+        'two_words': lambda: {'q': f'{word()} {word()}'},
+        'price_range': lambda: {'q': word(), 'min_price': 10, 'max_price': 50},
+        'submenus': lambda: {'q': 'submenu', 'type': 'submenu'},
+        'typo': lambda: {'q': word()[:-1] + 'q'},
+        'three_words': lambda: {'q': f'{word()} {word()} {word()}'},
+    }
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(sorted(timings), n=100, method='inclusive')
+    return {'p50_ms': cuts[49] * 1000, 'p95_ms': cuts[94] * 1000, 'p99_ms': cuts[98] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=100)
+    parser.add_argument('--dishes', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--keep', action='store_true', help='keep the seeded catalogue for the next run')
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        seeded = session.execute(select(func.count()).select_from(models.Dish)
+                                 .where(models.Dish.title.startswith(TITLE_PREFIX))).scalar()
+    if seeded != args.menus * args.submenus * args.dishes:
+        cleanup()
+        started = time.perf_counter()
+        seed(args.menus, args.submenus, args.dishes, vocabulary=VOCABULARY)
+        print(f'seeded {args.menus * args.submenus * args.dishes} dishes in {time.perf_counter() - started:.0f} s')
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('VACUUM ANALYZE submenus, dishes')
+
+    rng = random.Random(1)
+    try:
+        # Entered, the client keeps one event loop for every request and runs the app's lifespan, as a server does.
+        with TestClient(app) as client:
+            for kind, params in queries(rng).items():
+                timings, hits = [], 0
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    response = client.get(URL, params=params())
+                    timings.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.text
+                    hits += len(response.json())
+                result = percentiles(timings)
+                print(f"{kind:12} p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+                      f"p99 {result['p99_ms']:7.2f} ms  {hits / args.requests:5.1f} hits")
+            timings = []
+            for _ in range(args.requests // 10):
+                params, cursor = queries(rng)['word'](), None
+                for _ in range(5):
+                    started = time.perf_counter()
+                    response = client.get(URL, params={**params, **({'after': cursor} if cursor else {})})
+                    timings.append(time.perf_counter() - started)
+                    cursor = response.headers.get(NEXT_CURSOR_HEADER)
+                    if cursor is None:
+                        break
+            result = percentiles(timings)
+            print(f"{'pages 1-5':12} p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+                  f"p99 {result['p99_ms']:7.2f} ms")
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import random
+import uuid
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.database import engine as default_engine, Base
+
+TITLE_PREFIX = 'bench-'
+BATCH_SIZE = 10000
+
+
+def seed(menus, submenus, dishes, engine=default_engine, prefix=TITLE_PREFIX, vocabulary=None):
+    """Insert menus x submenus x dishes rows and return their ids as a nested list of dicts.
+
+    With a `vocabulary`, dish titles and descriptions also get a few of its words, drawn at random, to search for.
+    """
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+
+    def words(count):
+        return ' ' + ' '.join(rng.choices(vocabulary, k=count)) if vocabulary else ''
+
+    tree = []
+    menu_rows, submenu_rows, dish_rows = [], [], []
+    for m in range(menus):
+        menu_id = str(uuid.uuid4())
+        menu_rows.append({'id': menu_id, 'title': f'{prefix}{m}', 'description': f'menu {m}'})
+        menu = {'id': menu_id, 'submenus': []}
+        tree.append(menu)
+        for s in range(submenus):
+            submenu_id = str(uuid.uuid4())
+            submenu_rows.append({'id': submenu_id, 'title': f'{prefix}{m}-{s}', 'description': f'submenu {s}',
+                                 'menu_id': menu_id})
+            submenu = {'id': submenu_id, 'dishes': []}
+            menu['submenus'].append(submenu)
+            for d in range(dishes):
+                dish_id = str(uuid.uuid4())
+                dish_rows.append({'id': dish_id, 'title': f'{prefix}{m}-{s}-{d}{words(2)}',
+                                  'description': f'dish {d}{words(4)}',
+                                  'price': d % 1000 + 0.5, 'submenu_id': submenu_id})
+                submenu['dishes'].append(dish_id)
+    with Session(engine) as session:
+        for model, rows in ((models.Menu, menu_rows), (models.SubMenu, submenu_rows), (models.Dish, dish_rows)):
+            for start in range(0, len(rows), BATCH_SIZE):
+                session.execute(insert(model), rows[start:start + BATCH_SIZE])
+        session.commit()
+    return tree
+
+
+def cleanup(engine=default_engine, prefix=TITLE_PREFIX):
+    with Session(engine) as session:
+        session.execute(delete(models.Menu).where(models.Menu.title.startswith(prefix)))
+        session.commit()
+
+
+def urls(tree, prefix='/api/v1/menus'):
+    result = [f'{prefix}/']
+    for menu in tree:
+        result.append(f"{prefix}/{menu['id']}/")
+        result.append(f"{prefix}/{menu['id']}/submenus/")
+        for submenu in menu['submenus']:
+            result.append(f"{prefix}/{menu['id']}/submenus/{submenu['id']}/")
+            result.append(f"{prefix}/{menu['id']}/submenus/{submenu['id']}/dishes/")
+    return result
@@ -0,0 +1,83 @@
+"""Read routes served by SQL versus the in-memory catalogue snapshot, and what the snapshot costs to hold and load.
+
+    python -m benchmarks.snapshot --menus 50 --submenus 10 --dishes 20 --requests 200
+
+Requests are served in process, so the difference is the database round trips and their CPU on both sides. The
+snapshot holds every row in the database, the benchmark's and any already there.
+"""
+import argparse
+import time
+import tracemalloc
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from benchmarks.endpoints import endpoints, summary
+from benchmarks.seed import seed, cleanup
+from main import app
+from menu import config, database, snapshot
+
+
+def timings(client, url, requests):
+    client.get(url)
+    result = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        assert client.get(url).status_code == 200
+        result.append(time.perf_counter() - started)
+    return result
+
+
+def load():
+    snapshot.invalidate()
+    started = time.perf_counter()
+    with Session(database.engine) as db:
+        snapshot.current(db)
+    return time.perf_counter() - started
+
+
+def load_report():
+    config.SNAPSHOT = True
+    elapsed = min(load() for _ in range(3))
+    # Traced apart from the timing, which tracing slows several times over.
+    tracemalloc.start()
+    load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    status = snapshot.status()
+    rows = status['menus'] + status['submenus'] + status['dishes']
+    print(f"Snapshot of {status['menus']} menus, {status['submenus']} submenus, {status['dishes']} dishes")
+    print(f"  load {elapsed * 1000:.1f} ms   footprint {status['bytes'] / 2 ** 20:.2f} MiB, "
+          f"{status['bytes'] / max(rows, 1):.0f} B per row   "
+          f"allocated {retained / 2 ** 20:.2f} MiB, peak {peak / 2 ** 20:.2f} MiB while loading")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=50)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    cleanup()
+    tree = seed(args.menus, args.submenus, args.dishes)
+    try:
+        load_report()
+        print(f"{'route':<12} {'sql p50':>10} {'snapshot p50':>14} {'speedup':>8}")
+        for name, (method, url, _) in endpoints(tree).items():
+            if method != 'GET':
+                continue
+            requests = args.requests // 10 if name == 'tree' else args.requests
+            config.SNAPSHOT = False
+            sql = summary(timings(client, url, requests))['p50_ms']
+            config.SNAPSHOT = True
+            memory = summary(timings(client, url, requests))['p50_ms']
+            print(f'{name:<12} {sql:8.3f}ms {memory:12.3f}ms {sql / memory:7.2f}x')
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
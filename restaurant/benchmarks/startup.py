@@ -0,0 +1,53 @@
+"""Worker cold start: importing main, running the lifespan startup, and serving a first request, each in a fresh
+process as a new uvicorn worker would.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = '''
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+# The harness's own import, left out of the worker's timings.
+from fastapi.testclient import TestClient
+client_imported = time.perf_counter()
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    assert client.get('/api/v1/menus/', params={'limit': 10}).status_code == 200
+    served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'startup_ms': (ready - client_imported) * 1000,
+                  'first_request_ms': (served - ready) * 1000}))
+'''
+
+
+def cold_start(mode):
+    env = dict(os.environ, DB_ASYNC='true' if mode == 'async' else 'false')
+    output = subprocess.run([sys.executable, '-c', WORKER], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--modes', nargs='+', choices=('sync', 'async'), default=['sync', 'async'])
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        runs = [cold_start(mode) for _ in range(args.runs)]
+        medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f'{mode:<5} ' + '   '.join(f'{key} {value:7.1f}' for key, value in medians.items()))
+
+
+if __name__ == '__main__':
+    main()
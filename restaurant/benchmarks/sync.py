@@ -0,0 +1,58 @@
+"""Nightly POS sync touching a small share of the catalogue: POST /sync/ versus replaying it all with PUT /import/.
+
+    python -m benchmarks.sync --menus 5 --submenus 10 --dishes 200 --changed 0.01
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.seed import cleanup
+from benchmarks.upsert import catalogue, PREFIX
+from main import app
+from menu.query_stats import assert_max_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=5)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=200)
+    parser.add_argument('--changed', type=float, default=0.01, help='share of dishes whose price changes')
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    total = args.menus * args.submenus * args.dishes
+    cleanup()
+    try:
+        # The snapshot replaces the whole catalogue, so whatever else is in the database is carried along unchanged.
+        others = client.get(f'{PREFIX}/tree/').json()
+        menus = catalogue(args.menus, args.submenus, args.dishes, '1.00')
+        assert client.put(f'{PREFIX}/import/', json=menus).status_code == 200
+        dishes = [dish for menu in menus for submenu in menu['submenus'] for dish in submenu['dishes']]
+        step = max(1, round(1 / args.changed)) if args.changed else len(dishes) + 1
+        for dish in dishes[::step]:
+            dish['price'] = '2.00'
+
+        started = time.perf_counter()
+        with assert_max_queries(3 + 1 + total // 1000) as captured:
+            response = client.post(f'{PREFIX}/sync/', json=others + menus)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        updated = response.json()['updated']['dishes']
+        print(f'POST /sync/    {total} dishes  {elapsed:8.2f} s  {updated} rows written  '
+              f'{captured[0].count} statements')
+
+        started = time.perf_counter()
+        with assert_max_queries(3 * (1 + total // 1000)) as captured:
+            response = client.put(f'{PREFIX}/import/', json=menus)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        print(f'PUT /import/   {total} dishes  {elapsed:8.2f} s  {total + len(menus) * (1 + args.submenus)} rows '
+              f'written  {captured[0].count} statements')
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Nightly re-sync of a full catalogue: one PUT /import/ per batch versus GET, compare, PATCH per item.
+
+    python -m benchmarks.upsert --menus 5 --submenus 10 --dishes 20
+"""
+import argparse
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from benchmarks.seed import cleanup, TITLE_PREFIX
+from main import app
+from menu.query_stats import assert_max_queries
+
+PREFIX = '/api/v1/menus'
+
+
+def catalogue(menus, submenus, dishes, price):
+    return [{'id': str(uuid.uuid5(uuid.NAMESPACE_OID, f'{m}')), 'title': f'{TITLE_PREFIX}{m}', 'description': '',
+             'submenus': [{'id': str(uuid.uuid5(uuid.NAMESPACE_OID, f'{m}-{s}')), 'title': f'{TITLE_PREFIX}{m}-{s}',
+                           'description': '',
+                           'dishes': [{'id': str(uuid.uuid5(uuid.NAMESPACE_OID, f'{m}-{s}-{d}')),
+                                       'title': f'{TITLE_PREFIX}{m}-{s}-{d}', 'description': '', 'price': price}
+                                      for d in range(dishes)]}
+                          for s in range(submenus)]}
+            for m in range(menus)]
+
+
+def item_by_item(client, menus):
+    """What a sync job had to do before PUT: read each item, and PATCH it when it differs."""
+    requests = 0
+    for menu in menus:
+        menu_url = f"{PREFIX}/{menu['id']}/"
+        for submenu in menu['submenus']:
+            submenu_url = f"{menu_url}submenus/{submenu['id']}/"
+            for dish in submenu['dishes']:
+                dish_url = f"{submenu_url}dishes/{dish['id']}/"
+                current = client.get(dish_url).json()
+                requests += 1
+                if current['price'] != dish['price']:
+                    client.patch(dish_url, json=dish)
+                    requests += 1
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menus', type=int, default=5)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=20)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    total = args.menus * args.submenus * args.dishes
+    cleanup()
+    try:
+        assert client.put(f'{PREFIX}/import/', json=catalogue(args.menus, args.submenus, args.dishes, '1.00')
+                          ).status_code == 200
+        menus = catalogue(args.menus, args.submenus, args.dishes, '2.00')
+        started = time.perf_counter()
+        with assert_max_queries(3 * (1 + total // 1000)) as captured:
+            response = client.put(f'{PREFIX}/import/', json=menus)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        print(f'PUT /import/   {total} dishes  {elapsed:8.2f} s  1 request  {captured[0].count} statements')
+
+        menus = catalogue(args.menus, args.submenus, args.dishes, '3.00')
+        started = time.perf_counter()
+        requests = item_by_item(client, menus)
+        elapsed = time.perf_counter() - started
+        print(f'item by item   {total} dishes  {elapsed:8.2f} s  {requests} requests')
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,86 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from menu.database import engine, Base
-from menu.routers import menu_router
+from menu import database
+from menu.config import Settings
+from menu.status import status_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is Alembic's (alembic upgrade head), so a worker starts without connecting or running DDL.
+    await database.create_engines(app.state.settings)
+    listener = None
+    if app.state.settings.cache_notify:
+        from menu.notify import InvalidationListener
+
+        listener = InvalidationListener(database.engine.url)
+        listener.start()
+    yield
+    if listener is not None:
+        listener.stop()
+    await database.dispose_engines()
+
+
+def create_app(settings: Settings = None) -> FastAPI:
+    """The API as `settings` describe it. Only the modules it serves are imported."""
+    settings = settings or Settings()
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = settings
+
+    if settings.compression:
+        from menu.compression import CompressionMiddleware
+
+        # Innermost, so the statistics and metrics below count the compression in the request's time.
+        app.add_middleware(CompressionMiddleware)
+
+    if settings.query_stats:
+        from menu.query_stats import QueryStatsMiddleware
+
+        app.add_middleware(QueryStatsMiddleware)
+
+    if settings.metrics:
+        from menu.metrics import MetricsMiddleware, metrics_router
+
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics_router)
+
+    if settings.replica_urls:
+        from menu.replicas import StickyPrimaryMiddleware
 
-Base.metadata.create_all(bind=engine)
+        app.add_middleware(StickyPrimaryMiddleware)
 
+    if settings.db_async:
+        from menu.async_routers import async_menu_router
+        from menu.async_search import async_search_router
 
-app = FastAPI()
+        app.include_router(
+            async_menu_router,
+            prefix='/api/v1/menus'
+        )
+        app.include_router(
+            async_search_router,
+            prefix='/api/v1/search'
+        )
+    else:
+        from menu.routers import menu_router
+        from menu.search import search_router
 
-app.include_router(
-    menu_router,
-    prefix='/api/v1/menus'
-)
+        app.include_router(
+            menu_router,
+            prefix='/api/v1/menus'
+        )
+        app.include_router(
+            search_router,
+            prefix='/api/v1/search'
+        )
 
+    app.include_router(
+        status_router,
+        prefix='/api/v1/status'
+    )
+    return app
 
 
+app = create_app()
@@ -0,0 +1,297 @@
+from typing import List
+from uuid import UUID
+
+from asyncpg import UniqueViolationError
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas, cache, pagination, bulk, sync, snapshot
+from .crud import (raise_if_not_exist, is_valid_uuid, menu_tree_query, build_menu_tree, insert_values, menu_exists,
+                   insert_menu_query, insert_submenu_query, insert_dish_query, insert_conflicts_query,
+                   raise_insert_conflict, parents_query, raise_not_found, update_menu_query, update_submenu_query,
+                   update_dish_query, delete_menu_query, delete_submenu_query, delete_dish_query, upsert_menu_query,
+                   upsert_submenu_query, upsert_dish_query, upsert_rows_query, raise_upsert_conflict,
+                   upsert_conflicts, sync_statements, MENU_BY_ID, MENU_PAGES, SUBMENU_BY_ID, SUBMENU_PAGES,
+                   DISH_BY_ID, DISH_PAGES)
+
+
+async def get_submenus(db: AsyncSession, menu_id: UUID, limit: int = None, after: str = None):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        submenus = catalogue.get_submenus(menu_id, limit, after)
+        if submenus is not None:
+            return submenus
+    connection = await db.connection()
+    return (await connection.execute(*pagination.keyset(SUBMENU_PAGES, limit, after, menu_id=menu_id))).all()
+
+
+async def get_submenu_by_id(db: AsyncSession, menu_id: UUID, submenu_id: UUID):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        return catalogue.get_submenu_by_id(menu_id, submenu_id)
+    connection = await db.connection()
+    return (await connection.execute(SUBMENU_BY_ID, {'menu_id': menu_id, 'submenu_id': submenu_id})).first()
+
+
+async def create_submenu(db: AsyncSession, menu_id: UUID, submenu: schemas.MenuBase):
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    values = insert_values(submenu)
+    db_submenu = (await db.execute(insert_submenu_query(menu_id, values))).first()
+    if db_submenu is None:
+        raise_insert_conflict((await db.execute(insert_conflicts_query(models.SubMenu, values, menu_id))).one(),
+                              models.SubMenu)
+    await db.commit()
+    await cache.invalidate_submenu_async(menu_id, db_submenu.id, subtree=True)
+    return db_submenu
+
+
+async def get_menus(db: AsyncSession, limit: int = None, after: str = None):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        menus = catalogue.get_menus(limit, after)
+        if menus is not None:
+            return menus
+    connection = await db.connection()
+    return (await connection.execute(*pagination.keyset(MENU_PAGES, limit, after))).all()
+
+
+async def get_menu_by_id(db: AsyncSession, menu_id: UUID):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        return catalogue.get_menu_by_id(menu_id)
+    connection = await db.connection()
+    return (await connection.execute(MENU_BY_ID, {'menu_id': menu_id})).first()
+
+
+async def get_menu_tree(db: AsyncSession, menu_id: UUID = None):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        return catalogue.get_menu_tree(menu_id)
+    return build_menu_tree((await db.execute(menu_tree_query(menu_id))).scalars().all())
+
+
+async def create_menu(db: AsyncSession, menu: schemas.MenuBase):
+    values = insert_values(menu)
+    db_menu = (await db.execute(insert_menu_query(values))).first()
+    if db_menu is None:
+        raise_insert_conflict((await db.execute(insert_conflicts_query(models.Menu, values))).one(), models.Menu)
+    await db.commit()
+    await cache.invalidate_menu_async(db_menu.id, subtree=True)
+    return db_menu
+
+
+async def import_menus(db: AsyncSession, menus: List[schemas.MenuImport]):
+    rows, conflicts = bulk.flatten(menus)
+    for model, query in bulk.lookups(rows):
+        conflicts += bulk.existing_conflicts(model, rows[model], (await db.execute(query)).all())
+    if conflicts:
+        raise HTTPException(status_code=409, detail=conflicts)
+    try:
+        raw = await (await db.connection()).get_raw_connection()
+        await bulk.copy_rows_async(raw.driver_connection, rows)
+        await db.commit()
+    except UniqueViolationError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail='A duplicate record already exists')
+    for menu in rows[models.Menu]:
+        await cache.invalidate_menu_async(menu['id'], subtree=True)
+    return bulk.counts(rows)
+
+
+async def get_dishes(db: AsyncSession, submenu_id: UUID, menu_id: UUID, limit: int = None, after: str = None):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        dishes = catalogue.get_dishes(menu_id, submenu_id, limit, after)
+        if dishes is not None:
+            return dishes
+    connection = await db.connection()
+    return (await connection.execute(*pagination.keyset(DISH_PAGES, limit, after, menu_id=menu_id,
+                                                        submenu_id=submenu_id))).all()
+
+
+async def get_dish_by_id(db: AsyncSession, submenu_id: UUID, menu_id: UUID, dish_id: UUID):
+    catalogue = await snapshot.current_async(db)
+    if catalogue is not None:
+        return catalogue.get_dish_by_id(menu_id, submenu_id, dish_id)
+    connection = await db.connection()
+    return (await connection.execute(DISH_BY_ID, {'menu_id': menu_id, 'submenu_id': submenu_id,
+                                                  'dish_id': dish_id})).first()
+
+
+async def create_dish(db: AsyncSession, menu_id: UUID, submenu_id: UUID, dish: schemas.DishCreate):
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    if not is_valid_uuid(submenu_id):
+        raise_if_not_exist((await db.execute(select(menu_exists(menu_id)))).scalar(), "ID of Menu not registered", 400)
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    values = insert_values(dish)
+    db_dish = (await db.execute(insert_dish_query(menu_id, submenu_id, values))).first()
+    if db_dish is None:
+        found = (await db.execute(insert_conflicts_query(models.Dish, values, menu_id, submenu_id))).one()
+        raise_insert_conflict(found, models.Dish)
+    await db.commit()
+    await cache.invalidate_dish_async(menu_id, submenu_id, db_dish.id)
+    return db_dish
+
+
+async def delete_menu_by_id(db: AsyncSession, menu_id: UUID):
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    raise_if_not_exist((await db.execute(delete_menu_query(menu_id))).first(), "Menu not found")
+    await db.commit()
+    await cache.invalidate_menu_async(menu_id, subtree=True)
+    return {"status": True, "message": "The menu has been deleted"}
+
+
+async def delete_submenu_by_id(db: AsyncSession, menu_id: UUID, submenu_id: UUID):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    if (await db.execute(delete_submenu_query(menu_id, submenu_id))).first() is None:
+        raise_not_found((await db.execute(parents_query(menu_id, submenu_id))).one(), "Submenu not found")
+    await db.commit()
+    await cache.invalidate_submenu_async(menu_id, submenu_id, subtree=True)
+    return {"status": True, "message": "The submenu has been deleted"}
+
+
+async def delete_dish_by_id(db: AsyncSession, menu_id: UUID, submenu_id: UUID, dish_id: UUID):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    if (await db.execute(delete_dish_query(menu_id, submenu_id, dish_id))).first() is None:
+        raise_not_found((await db.execute(parents_query(menu_id, submenu_id))).one(), "Dish not found")
+    await db.commit()
+    await cache.invalidate_dish_async(menu_id, submenu_id, dish_id)
+    return {"status": True, "message": "The dish has been deleted"}
+
+
+async def update_menu(db: AsyncSession, menu_id: UUID, menu: schemas.MenuBase):
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    try:
+        db_menu = (await db.execute(update_menu_query(menu_id, menu))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Menu already registered")
+    raise_if_not_exist(db_menu, "Menu not found")
+    await db.commit()
+    await cache.invalidate_menu_async(menu_id)
+    return db_menu
+
+
+async def update_submenu(db: AsyncSession, menu_id: UUID, submenu_id: UUID, submenu: schemas.MenuBase):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_submenu = (await db.execute(update_submenu_query(menu_id, submenu_id, submenu))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Submenu already registered")
+    if db_submenu is None:
+        raise_not_found((await db.execute(parents_query(menu_id, submenu_id))).one(), "Submenu not found")
+    await db.commit()
+    await cache.invalidate_submenu_async(menu_id, submenu_id, counts=False)
+    return db_submenu
+
+
+async def update_dish(db: AsyncSession, menu_id: UUID, submenu_id: UUID, dish_id: UUID, dish: schemas.DishUpdate):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_dish = (await db.execute(update_dish_query(menu_id, submenu_id, dish_id, dish))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Dish already registered")
+    if db_dish is None:
+        raise_not_found((await db.execute(parents_query(menu_id, submenu_id))).one(), "Dish not found")
+    await db.commit()
+    await cache.invalidate_dish_async(menu_id, submenu_id, dish_id, counts=False)
+    return db_dish
+
+
+async def upsert_menu(db: AsyncSession, menu_id: UUID, menu: schemas.MenuBase):
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    try:
+        db_menu = (await db.execute(upsert_menu_query(menu_id, menu))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Menu already registered")
+    await db.commit()
+    await cache.invalidate_menu_async(menu_id, subtree=True)
+    return db_menu
+
+
+async def upsert_submenu(db: AsyncSession, menu_id: UUID, submenu_id: UUID, submenu: schemas.MenuBase):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_submenu = (await db.execute(upsert_submenu_query(menu_id, submenu_id, submenu))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Submenu already registered")
+    if db_submenu is None:
+        raise_upsert_conflict((await db.execute(parents_query(menu_id, submenu_id))).one(), models.SubMenu)
+    await db.commit()
+    await cache.invalidate_submenu_async(menu_id, submenu_id, subtree=True)
+    return db_submenu
+
+
+async def upsert_dish(db: AsyncSession, menu_id: UUID, submenu_id: UUID, dish_id: UUID, dish: schemas.DishUpdate):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_dish = (await db.execute(upsert_dish_query(menu_id, submenu_id, dish_id, dish))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Dish already registered")
+    if db_dish is None:
+        raise_upsert_conflict((await db.execute(parents_query(menu_id, submenu_id))).one(), models.Dish)
+    await db.commit()
+    await cache.invalidate_dish_async(menu_id, submenu_id, dish_id)
+    return db_dish
+
+
+async def upsert_menus(db: AsyncSession, menus: List[schemas.MenuImport]):
+    rows, conflicts = bulk.flatten(menus)
+    if conflicts:
+        raise HTTPException(status_code=409, detail=conflicts)
+    upserted = {}
+    try:
+        for model, model_rows in rows.items():
+            upserted[model] = set((await db.execute(upsert_rows_query(model), model_rows)).scalars()) \
+                if model_rows else set()
+    except IntegrityError:
+        await db.rollback()
+        for model, query in bulk.lookups(rows):
+            conflicts += bulk.title_conflicts(model, rows[model], (await db.execute(query)).all())
+        raise HTTPException(status_code=409, detail=conflicts or 'A duplicate record already exists')
+    conflicts = upsert_conflicts(rows, upserted)
+    if conflicts:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=conflicts)
+    await db.commit()
+    for menu in rows[models.Menu]:
+        await cache.invalidate_menu_async(menu['id'], subtree=True)
+    return bulk.counts(rows)
+
+
+async def sync_menus(db: AsyncSession, menus: List[schemas.MenuImport]):
+    rows, conflicts = bulk.flatten(menus)
+    if conflicts:
+        raise HTTPException(status_code=409, detail=conflicts)
+    state = {model: {row.id: row for row in await db.execute(query)} for model, query in sync.state_queries()}
+    plan = sync.Plan(rows, state)
+    try:
+        for statement, params in sync_statements(plan):
+            await db.execute(statement, params)
+    except IntegrityError:
+        await db.rollback()
+        for model, query in bulk.lookups(rows):
+            conflicts += bulk.title_conflicts(model, rows[model], (await db.execute(query)).all())
+        raise HTTPException(status_code=409, detail=conflicts or 'A duplicate record already exists')
+    await db.commit()
+    for menu_id in plan.touched:
+        await cache.invalidate_menu_async(menu_id, subtree=True)
+    return plan.result
@@ -0,0 +1,228 @@
+from typing import List, Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi import Depends
+from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import (schemas, async_crud, cache, database, pagination, bulk, export, conditional, fast_json, replicas,
+               snapshot)
+from .crud import is_valid_uuid
+from .routers import (menus_adapter, menu_adapter, submenus_adapter, submenu_adapter, dishes_adapter, dish_adapter,
+                      menu_tree_adapter)
+
+async_menu_router = APIRouter()
+
+
+# Dependency
+async def get_async_db(request: Request):
+    db = None
+    if database.async_read_replicas and replicas.reads_replica(request):
+        db = await replicas.async_read_session(database.async_read_replicas, database.AsyncSessionLocal)
+    async with db or replicas.primary_session(request, database.AsyncSessionLocal) as db:
+        yield db
+
+
+def catalogue_etag(route):
+    async def dependency(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        catalogue = await snapshot.current_async(db)
+        if catalogue is not None:
+            version = catalogue.catalogue_version
+        else:
+            version = (await db.execute(conditional.catalogue_version_query())).scalar()
+        conditional.check(request, response, route, conditional.make_etag(route, version))
+    return dependency
+
+
+def menu_etag(route):
+    async def dependency(menu_id, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        version = None
+        if is_valid_uuid(menu_id):
+            catalogue = await snapshot.current_async(db)
+            if catalogue is not None:
+                version = catalogue.menu_version(menu_id)
+            else:
+                version = (await db.execute(conditional.menu_version_query(menu_id))).scalar()
+        conditional.check(request, response, route, None if version is None else conditional.make_etag(route, version))
+    return dependency
+
+
+async def tree_etag(request: Request, response: Response, menu_id: Optional[UUID] = None,
+                    db: AsyncSession = Depends(get_async_db)):
+    if menu_id is None:
+        await catalogue_etag('tree')(request, response, db)
+    else:
+        await menu_etag('tree')(str(menu_id), request, response, db)
+
+
+@async_menu_router.get("/", response_model=List[schemas.Menu], dependencies=[Depends(catalogue_etag('menus'))])
+async def get_menus(response: Response, limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+                    after: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    if limit is not None or after is not None:
+        menus = pagination.paginated(response, await async_crud.get_menus(db=db, limit=limit, after=after), limit)
+    else:
+        menus = await cache.read_through_async(cache.MENUS_KEY, lambda: async_crud.get_menus(db=db), menus_adapter,
+                                               replicas.read_source(db))
+    return fast_json.respond(response, menus, menus_adapter)
+
+
+@async_menu_router.get("/tree/", response_model=List[schemas.MenuTree], dependencies=[Depends(tree_etag)])
+async def get_menu_tree(menu_id: Optional[UUID] = None, db: AsyncSession = Depends(get_async_db)):
+    return await cache.read_through_async(cache.tree_key(menu_id),
+                                          lambda: async_crud.get_menu_tree(db=db, menu_id=menu_id), menu_tree_adapter,
+                                          replicas.read_source(db))
+
+
+@async_menu_router.get("/export/")
+async def export_menus(fmt: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+                       db: AsyncSession = Depends(get_async_db)):
+    return StreamingResponse(export.stream_export_async(db.bind, fmt), media_type=export.MEDIA_TYPES[fmt],
+                             headers={'Content-Disposition': f'attachment; filename="menus.{fmt}"'})
+
+
+@async_menu_router.get("/{menu_id}/", response_model=schemas.Menu, dependencies=[Depends(menu_etag('menu'))])
+async def get_menu_by_id(menu_id, db: AsyncSession = Depends(get_async_db)):
+    menu = await cache.read_through_async(cache.menu_key(menu_id),
+                                          lambda: async_crud.get_menu_by_id(db=db, menu_id=menu_id), menu_adapter,
+                                          replicas.read_source(db))
+    if menu is None:
+        raise HTTPException(status_code=404, detail="menu not found")
+    else:
+        return menu
+
+
+@async_menu_router.get("/{menu_id}/submenus/", response_model=List[schemas.SubMenu],
+                       dependencies=[Depends(menu_etag('submenus'))])
+async def get_submenus(menu_id, response: Response,
+                       limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+                       after: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    if limit is not None or after is not None:
+        submenus = pagination.paginated(response, await async_crud.get_submenus(db=db, menu_id=menu_id, limit=limit,
+                                                                                after=after), limit)
+    else:
+        submenus = await cache.read_through_async(cache.submenus_key(menu_id),
+                                                  lambda: async_crud.get_submenus(db=db, menu_id=menu_id),
+                                                  submenus_adapter, replicas.read_source(db))
+    return fast_json.respond(response, submenus, submenus_adapter)
+
+
+@async_menu_router.get("/{menu_id}/submenus/{submenu_id}/", response_model=schemas.SubMenu,
+                       dependencies=[Depends(menu_etag('submenu'))])
+async def get_submenu_by_id(menu_id, submenu_id, db: AsyncSession = Depends(get_async_db)):
+    submenus = await cache.read_through_async(cache.submenu_key(menu_id, submenu_id),
+                                              lambda: async_crud.get_submenu_by_id(db=db, menu_id=menu_id,
+                                                                                   submenu_id=submenu_id),
+                                              submenu_adapter, replicas.read_source(db))
+    if submenus is None:
+        raise HTTPException(status_code=404, detail="submenu not found")
+    else:
+        return submenus
+
+
+@async_menu_router.get("/{menu_id}/submenus/{submenu_id}/dishes/", response_model=List[schemas.Dish],
+                       dependencies=[Depends(menu_etag('dishes'))])
+async def get_dishes(menu_id, submenu_id, response: Response,
+                     limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+                     after: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    if limit is not None or after is not None:
+        dishes = pagination.paginated(response, await async_crud.get_dishes(db=db, menu_id=menu_id,
+                                                                            submenu_id=submenu_id, limit=limit,
+                                                                            after=after), limit)
+    else:
+        dishes = await cache.read_through_async(cache.dishes_key(menu_id, submenu_id),
+                                                lambda: async_crud.get_dishes(db=db, menu_id=menu_id,
+                                                                              submenu_id=submenu_id),
+                                                dishes_adapter, replicas.read_source(db))
+    return fast_json.respond(response, dishes, dishes_adapter)
+
+
+@async_menu_router.get("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", response_model=schemas.Dish,
+                       dependencies=[Depends(menu_etag('dish'))])
+async def get_dish_by_id(menu_id, submenu_id, dish_id, db: AsyncSession = Depends(get_async_db)):
+    dish = await cache.read_through_async(cache.dish_key(menu_id, submenu_id, dish_id),
+                                          lambda: async_crud.get_dish_by_id(db=db, menu_id=menu_id,
+                                                                            submenu_id=submenu_id, dish_id=dish_id),
+                                          dish_adapter, replicas.read_source(db))
+    if dish is None:
+        raise HTTPException(status_code=404, detail="dish not found")
+    else:
+        return dish
+
+
+@async_menu_router.post("/", response_model=schemas.MenuCreate, status_code=201)
+async def create_menu(menu: schemas.MenuBase, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_menu(db=db, menu=menu)
+
+
+@async_menu_router.post("/import/", response_model=schemas.ImportResult, status_code=201)
+async def import_menus(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.import_menus(db=db, menus=await bulk.read_import(request))
+
+
+@async_menu_router.put("/import/", response_model=schemas.ImportResult)
+async def upsert_menus(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.upsert_menus(db=db, menus=bulk.require_ids(await bulk.read_import(request)))
+
+
+@async_menu_router.post("/sync/", response_model=schemas.SyncResult)
+async def sync_menus(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.sync_menus(db=db, menus=bulk.require_ids(await bulk.read_import(request)))
+
+
+@async_menu_router.post("/{menu_id}/submenus/", response_model=schemas.SubMenuCreate, status_code=201)
+async def create_submenu(menu_id, submenu: schemas.MenuBase, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_submenu(db=db, menu_id=menu_id, submenu=submenu)
+
+
+@async_menu_router.post("/{menu_id}/submenus/{submenu_id}/dishes/", response_model=schemas.Dish, status_code=201)
+async def create_dish(menu_id, submenu_id, dish: schemas.DishCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_dish(db=db, menu_id=menu_id, submenu_id=submenu_id, dish=dish)
+
+
+@async_menu_router.patch("/{menu_id}/", response_model=schemas.Menu)
+async def update_menu(menu_id, menu: schemas.MenuBase, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.update_menu(db=db, menu_id=menu_id, menu=menu)
+
+
+@async_menu_router.patch("/{menu_id}/submenus/{submenu_id}/", response_model=schemas.SubMenu)
+async def update_submenu(menu_id, submenu_id, submenu: schemas.MenuBase, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.update_submenu(db=db, menu_id=menu_id, submenu=submenu, submenu_id=submenu_id)
+
+
+@async_menu_router.patch("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", response_model=schemas.Dish)
+async def update_dish(menu_id, submenu_id, dish_id, dish: schemas.DishUpdate,
+                      db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.update_dish(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id, dish=dish)
+
+
+@async_menu_router.put("/{menu_id}/", response_model=schemas.Menu)
+async def upsert_menu(menu_id, menu: schemas.MenuBase, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.upsert_menu(db=db, menu_id=menu_id, menu=menu)
+
+
+@async_menu_router.put("/{menu_id}/submenus/{submenu_id}/", response_model=schemas.SubMenu)
+async def upsert_submenu(menu_id, submenu_id, submenu: schemas.MenuBase, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.upsert_submenu(db=db, menu_id=menu_id, submenu_id=submenu_id, submenu=submenu)
+
+
+@async_menu_router.put("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", response_model=schemas.Dish)
+async def upsert_dish(menu_id, submenu_id, dish_id, dish: schemas.DishUpdate,
+                      db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.upsert_dish(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id, dish=dish)
+
+
+@async_menu_router.delete("/{menu_id}/")
+async def delete_menu_by_id(menu_id, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.delete_menu_by_id(db=db, menu_id=menu_id)
+
+
+@async_menu_router.delete("/{menu_id}/submenus/{submenu_id}/")
+async def delete_submenu_by_id(menu_id, submenu_id, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.delete_submenu_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id)
+
+
+@async_menu_router.delete("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/")
+async def delete_dish_by_id(menu_id, submenu_id, dish_id, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.delete_dish_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id)
@@ -0,0 +1,31 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schemas
+from .async_routers import get_async_db
+from .search import SearchParams, page, trigram_query, trigram_checks
+
+async_search_router = APIRouter()
+
+
+async def async_has_trigram(db: AsyncSession):
+    key = str(db.get_bind().url)
+    if key not in trigram_checks:
+        trigram_checks[key] = (await db.execute(trigram_query())).scalar()
+    return trigram_checks[key]
+
+
+async def async_fetch(db: AsyncSession, query):
+    return (await db.execute(*query)).all() if query is not None else []
+
+
+@async_search_router.get("/", response_model=List[schemas.SearchHit])
+async def async_search(response: Response, params: SearchParams = Depends(),
+                       db: AsyncSession = Depends(get_async_db)):
+    rows = await async_fetch(db, params.query())
+    if not rows and params.first_page and await async_has_trigram(db):
+        params.mode = 'trgm'
+        rows = await async_fetch(db, params.query())
+    return page(response, params.mode, rows, params.limit)
@@ -0,0 +1,176 @@
+import csv
+import io
+import uuid
+from typing import List
+
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import String, any_, bindparam, cast, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from . import models, schemas
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+menus_import_adapter = TypeAdapter(List[schemas.MenuImport])
+menu_import_adapter = TypeAdapter(schemas.MenuImport)
+
+LABELS = {models.Menu: 'Menu', models.SubMenu: 'Submenu', models.Dish: 'Dish'}
+COLUMNS = {
+    models.Menu: ('id', 'title', 'description'),
+    models.SubMenu: ('id', 'title', 'description', 'menu_id'),
+    models.Dish: ('id', 'title', 'description', 'price', 'submenu_id'),
+}
+PARENT_KEYS = {models.SubMenu: 'menu_id', models.Dish: 'submenu_id'}
+
+
+def validation_error(exc: ValidationError, *loc):
+    errors = exc.errors(include_url=False, include_context=False)
+    return RequestValidationError([{**error, 'loc': ('body', *loc, *error['loc'])} for error in errors])
+
+
+def parse_json(body: bytes):
+    try:
+        return menus_import_adapter.validate_json(body)
+    except ValidationError as exc:
+        raise validation_error(exc)
+
+
+async def parse_ndjson(chunks):
+    menus, buffer, line_no = [], b'', 0
+
+    def parse(line):
+        if line.strip():
+            try:
+                menus.append(menu_import_adapter.validate_json(line))
+            except ValidationError as exc:
+                raise validation_error(exc, line_no)
+
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b'\n')
+        for line in lines:
+            line_no += 1
+            parse(line)
+    line_no += 1
+    parse(buffer)
+    return menus
+
+
+async def read_import(request):
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type in NDJSON_TYPES:
+        return await parse_ndjson(request.stream())
+    return parse_json(await request.body())
+
+
+def _id(item):
+    return item.id if 'id' in item.model_fields_set else uuid.uuid4()
+
+
+def flatten(menus: List[schemas.MenuImport]):
+    """Split the nested payload into insert rows per model, reporting duplicates inside the payload itself."""
+    rows = {models.Menu: [], models.SubMenu: [], models.Dish: []}
+    conflicts = []
+    seen = {model: (set(), set()) for model in rows}
+
+    def add(model, item, **values):
+        row = {'id': _id(item), 'title': item.title, 'description': item.description, **values}
+        ids, titles = seen[model]
+        if row['title'] in titles:
+            conflicts.append(conflict(model, row, 'Duplicate title in import'))
+        if row['id'] in ids:
+            conflicts.append(conflict(model, row, 'Duplicate id in import'))
+        ids.add(row['id'])
+        titles.add(row['title'])
+        rows[model].append(row)
+        return row['id']
+
+    for menu in menus:
+        menu_id = add(models.Menu, menu)
+        for submenu in menu.submenus:
+            submenu_id = add(models.SubMenu, submenu, menu_id=menu_id)
+            for dish in submenu.dishes:
+                add(models.Dish, dish, price=dish.price, submenu_id=submenu_id)
+    return rows, conflicts
+
+
+def conflict(model, row, message):
+    return {'type': LABELS[model].lower(), 'id': str(row['id']), 'title': row['title'], 'message': message}
+
+
+def uuid_array(name, ids):
+    """Bind a list of ids as one uuid[] parameter, whatever the driver makes of a list of UUIDs."""
+    return cast(bindparam(name, [str(id) for id in ids], type_=ARRAY(String)), ARRAY(UUID))
+
+
+def lookups(rows):
+    for model, model_rows in rows.items():
+        if model_rows:
+            ids = uuid_array('ids', [row['id'] for row in model_rows])
+            titles = bindparam('titles', [row['title'] for row in model_rows], type_=ARRAY(String))
+            yield model, select(model.id, model.title).where(or_(model.id == any_(ids), model.title == any_(titles)))
+
+
+def existing_conflicts(model, model_rows, existing):
+    ids = {row.id for row in existing}
+    titles = {row.title for row in existing}
+    conflicts = []
+    for row in model_rows:
+        if row['title'] in titles:
+            conflicts.append(conflict(model, row, f'Title of {LABELS[model]} already registered'))
+        if row['id'] in ids:
+            conflicts.append(conflict(model, row, f'ID of {LABELS[model]} already registered'))
+    return conflicts
+
+
+def title_conflicts(model, model_rows, existing):
+    """Titles held by some other row, which an upsert on id cannot take over."""
+    owners = {row.title: row.id for row in existing}
+    return [conflict(model, row, f'Title of {LABELS[model]} already registered')
+            for row in model_rows if owners.get(row['title'], row['id']) != row['id']]
+
+
+def require_ids(menus: List[schemas.MenuImport]):
+    """Upserts are keyed by id, so every item of the payload has to bring its own."""
+    errors = []
+
+    def check(item, *loc):
+        if 'id' not in item.model_fields_set:
+            errors.append({'type': 'missing', 'loc': ('body', *loc, 'id'), 'msg': 'Field required', 'input': None})
+
+    for i, menu in enumerate(menus):
+        check(menu, i)
+        for j, submenu in enumerate(menu.submenus):
+            check(submenu, i, 'submenus', j)
+            for k, dish in enumerate(submenu.dishes):
+                check(dish, i, 'submenus', j, 'dishes', k)
+    if errors:
+        raise RequestValidationError(errors)
+    return menus
+
+
+def copy_rows(dbapi_connection, rows):
+    """COPY the rows in over psycopg2. The counter triggers fire once per COPY like for any INSERT."""
+    with dbapi_connection.cursor() as cursor:
+        for model, model_rows in rows.items():
+            if model_rows:
+                columns = COLUMNS[model]
+                buffer = io.StringIO()
+                # Quote everything so empty strings are not read back as NULL.
+                csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows([row[c] for c in columns] for row in model_rows)
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                                   buffer)
+
+
+async def copy_rows_async(driver_connection, rows):
+    """The asyncpg counterpart of copy_rows, using its binary COPY."""
+    for model, model_rows in rows.items():
+        if model_rows:
+            columns = COLUMNS[model]
+            await driver_connection.copy_records_to_table(
+                model.__tablename__, columns=columns, records=[tuple(row[c] for c in columns) for row in model_rows])
+
+
+def counts(rows):
+    return {'menus': len(rows[models.Menu]), 'submenus': len(rows[models.SubMenu]), 'dishes': len(rows[models.Dish])}
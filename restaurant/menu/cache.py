@@ -0,0 +1,292 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+
+from starlette.concurrency import run_in_threadpool
+
+from . import replicas, snapshot
+from .config import CACHE_BACKEND, CACHE_TTL, CACHE_MAX_SIZE, CACHE_REDIS_URL
+
+MENUS_KEY = 'menus'
+TREE_KEY = 'tree'
+
+
+def menu_key(menu_id):
+    return f'menu:{str(menu_id).lower()}'
+
+
+def tree_key(menu_id=None):
+    if menu_id is None:
+        return TREE_KEY
+    return f'{menu_key(menu_id)}:tree'
+
+
+def submenus_key(menu_id):
+    return f'{menu_key(menu_id)}:submenus'
+
+
+def submenu_key(menu_id, submenu_id):
+    return f'{menu_key(menu_id)}:submenu:{str(submenu_id).lower()}'
+
+
+def dishes_key(menu_id, submenu_id):
+    return f'{submenu_key(menu_id, submenu_id)}:dishes'
+
+
+def dish_key(menu_id, submenu_id, dish_id):
+    return f'{submenu_key(menu_id, submenu_id)}:dish:{str(dish_id).lower()}'
+
+
+class BaseCache(ABC):
+    enabled = True
+    # Whether other workers read and invalidate it too.
+    shared = False
+    # Whether its calls wait on the network, which the event loop must not; see run.
+    blocking = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys):
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    async def run(self, function, *args, **kwargs):
+        """`function`, which works on this cache, called from the event loop: in the threadpool if the cache blocks."""
+        if self.blocking:
+            return await run_in_threadpool(function, *args, **kwargs)
+        return function(*args, **kwargs)
+
+    def get_or_set(self, key, loader, lookup=True, store=True):
+        value = self.get(key) if lookup else None
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = loader()
+        if value is not None and store:
+            self.set(key, value)
+        return value
+
+    async def get_or_set_async(self, key, loader, lookup=True, store=True):
+        value = await self.run(self.get, key) if lookup else None
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await loader()
+        if value is not None and store:
+            await self.run(self.set, key, value)
+        return value
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class NullCache(BaseCache):
+    enabled = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+    def get_or_set(self, key, loader, lookup=True, store=True):
+        return loader()
+
+    async def get_or_set_async(self, key, loader, lookup=True, store=True):
+        return await loader()
+
+
+class LRUCache(BaseCache):
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache(BaseCache):
+    shared = True
+    blocking = True
+
+    def __init__(self, client, ttl=CACHE_TTL, namespace='restaurant:'):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def get(self, key):
+        data = self.client.get(self.namespace + key)
+        if data is None:
+            return None
+        return json.loads(data)
+
+    def set(self, key, value):
+        self.client.set(self.namespace + key, json.dumps(value), ex=self.ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.namespace + key for key in keys])
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=f'{self.namespace}{prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        self.delete_prefix('')
+
+
+def build_cache(backend=CACHE_BACKEND):
+    if backend == 'memory':
+        return LRUCache()
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        return RedisCache(redis.Redis.from_url(CACHE_REDIS_URL))
+    return NullCache()
+
+
+_cache = build_cache()
+
+
+def get_cache():
+    return _cache
+
+
+def set_cache(backend: BaseCache):
+    global _cache
+    _cache = backend
+
+
+def read_through(key, loader, adapter, source=replicas.PRIMARY):
+    """`key`'s cached value, else what `loader` reads from a session on `source` (replicas.read_source). Only the
+    primary's reads are stored: a lagging replica would otherwise put old rows where every worker reads them. A read
+    inside a client's post-write window (STICKY) skips the lookup, as the entry may predate its write."""
+    if not _cache.enabled:
+        return loader()
+    return _cache.get_or_set(key, lambda: _dump(loader(), adapter), lookup=source != replicas.STICKY,
+                             store=source != replicas.REPLICA)
+
+
+async def read_through_async(key, loader, adapter, source=replicas.PRIMARY):
+    if not _cache.enabled:
+        return await loader()
+
+    async def load():
+        return _dump(await loader(), adapter)
+
+    return await _cache.get_or_set_async(key, load, lookup=source != replicas.STICKY,
+                                         store=source != replicas.REPLICA)
+
+
+def _dump(result, adapter):
+    if result is None:
+        return None
+    return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode='json')
+
+
+def invalidate_menu(menu_id, subtree=False):
+    snapshot.invalidate()
+    _cache.delete(MENUS_KEY, menu_key(menu_id), TREE_KEY, tree_key(menu_id))
+    if subtree:
+        _cache.delete_prefix(menu_key(menu_id))
+
+
+def invalidate_submenu(menu_id, submenu_id, counts=True, subtree=False):
+    snapshot.invalidate()
+    _cache.delete(submenu_key(menu_id, submenu_id), submenus_key(menu_id), TREE_KEY, tree_key(menu_id))
+    if counts:
+        _cache.delete(MENUS_KEY, menu_key(menu_id))
+    if subtree:
+        _cache.delete_prefix(submenu_key(menu_id, submenu_id))
+
+
+def invalidate_dish(menu_id, submenu_id, dish_id, counts=True):
+    snapshot.invalidate()
+    _cache.delete(dish_key(menu_id, submenu_id, dish_id), dishes_key(menu_id, submenu_id), TREE_KEY,
+                  tree_key(menu_id))
+    if counts:
+        _cache.delete(submenu_key(menu_id, submenu_id), submenus_key(menu_id), MENUS_KEY, menu_key(menu_id))
+
+
+async def invalidate_menu_async(menu_id, subtree=False):
+    await _cache.run(invalidate_menu, menu_id, subtree=subtree)
+
+
+async def invalidate_submenu_async(menu_id, submenu_id, counts=True, subtree=False):
+    await _cache.run(invalidate_submenu, menu_id, submenu_id, counts=counts, subtree=subtree)
+
+
+async def invalidate_dish_async(menu_id, submenu_id, dish_id, counts=True):
+    await _cache.run(invalidate_dish, menu_id, submenu_id, dish_id, counts=counts)
@@ -0,0 +1,128 @@
+import gzip
+import time
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from . import config, snapshot
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def negotiate(accept_encoding: str):
+    """The coding to answer an Accept-Encoding with: br, then gzip, among those the client takes; None for identity."""
+    accepted = {}
+    for item in accept_encoding.lower().split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    for coding in ('br', 'gzip') if brotli is not None else ('gzip',):
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == 'br':
+        return brotli.compress(body, quality=config.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=config.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressedBodies:
+    """Compressed bodies by (path, query, ETag, coding), the least recently used dropped past `max_bytes`. The ETag
+    names the data version, so a body is compressed once per version, URL and coding.
+
+    The body and its ETag come from separate reads, which the cache, the snapshot or a write in between may set
+    apart. So a body lasts `ttl` seconds (0 for ever), and all go whenever this worker invalidates its cache and
+    snapshot (snapshot.generation), rather than for as long as a mismatched ETag would."""
+
+    def __init__(self, max_bytes, ttl=0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._bodies = OrderedDict()
+        self._generation = snapshot.generation()
+
+    def get_or_compress(self, key, body, coding):
+        generation = snapshot.generation()
+        if generation != self._generation:
+            self.clear()
+            self._generation = generation
+        expires_at, compressed = self._bodies.get(key, (0, None))
+        if compressed is not None and (not expires_at or time.monotonic() < expires_at):
+            self.hits += 1
+            self._bodies.move_to_end(key)
+            return compressed
+        if compressed is not None:
+            self.size -= len(self._bodies.pop(key)[1])
+        self.misses += 1
+        compressed = compress(body, coding)
+        if len(compressed) <= self.max_bytes:
+            self._bodies[key] = (time.monotonic() + self.ttl if self.ttl else 0, compressed)
+            self.size += len(compressed)
+            while self.size > self.max_bytes:
+                self.size -= len(self._bodies.popitem(last=False)[1][1])
+        return compressed
+
+    def clear(self):
+        self._bodies.clear()
+        self.size = 0
+
+
+class CompressionMiddleware:
+    """gzip or brotli, as the client's Accept-Encoding prefers, for JSON GET responses of at least
+    COMPRESSION_MIN_SIZE bytes. Bodies that carry an ETag are compressed once per ETag and served from `bodies`
+    after; the rest are compressed per request. A compressed response's ETag turns weak, which If-None-Match still
+    matches (see conditional.matches). Streamed responses, such as the exports, pass through as they are."""
+
+    def __init__(self, app):
+        self.app = app
+        self.bodies = CompressedBodies(config.COMPRESSION_CACHE_BYTES, config.COMPRESSION_CACHE_TTL)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return await self.app(scope, receive, send)
+        coding = negotiate(Headers(scope=scope).get('accept-encoding', ''))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if start is None:
+                return await send(message)
+            response, start = start, None
+            headers = MutableHeaders(raw=response['headers'])
+            body = message.get('body', b'')
+            if (message.get('more_body') or response['status'] != 200 or 'content-encoding' in headers
+                    or not headers.get('content-type', '').startswith('application/json')
+                    or len(body) < config.COMPRESSION_MIN_SIZE):
+                await send(response)
+                return await send(message)
+            headers.add_vary_header('Accept-Encoding')
+            if coding is not None:
+                etag = headers.get('etag')
+                if etag is None:
+                    body = compress(body, coding)
+                else:
+                    body = self.bodies.get_or_compress((scope['path'], scope['query_string'], etag, coding), body,
+                                                       coding)
+                    headers['etag'] = etag if etag.startswith('W/') else f'W/{etag}'
+                headers['content-encoding'] = coding
+                headers['content-length'] = str(len(body))
+            await send(response)
+            await send({**message, 'body': body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,36 @@
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from . import models
+from .config import CACHE_CONTROL_ROUTES
+
+
+def catalogue_version_query():
+    # One row, which every write to menus updates; see triggers.CATALOGUE_VERSION.
+    return select(func.coalesce(select(models.Catalogue.version).scalar_subquery(), 0))
+
+
+def menu_version_query(menu_id):
+    return select(models.Menu.version).filter(models.Menu.id == menu_id)
+
+
+def make_etag(*parts):
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def matches(if_none_match, etag):
+    if if_none_match is None or etag is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+
+
+def check(request, response, route, etag):
+    """Answer 304 when the client already holds `etag`, otherwise attach the validators to the response."""
+    headers = {'Cache-Control': CACHE_CONTROL_ROUTES[route]}
+    if etag is not None:
+        headers['ETag'] = etag
+    if matches(request.headers.get('if-none-match'), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
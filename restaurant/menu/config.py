@@ -1,12 +1,75 @@
 import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 
-load_dotenv()
+# .env fills in what the environment leaves unset, read as values rather than written into os.environ.
+ENV = {**dotenv_values(), **os.environ}
 
-DB_URL = os.environ.get('DATABASE_URL')
-DB_HOST = os.environ.get('DB_HOST')
-DB_PORT = os.environ.get("DB_PORT")
-DB_USER = os.environ.get("DB_USERNAME")
-DB_PASSWORD = os.environ.get("DB_PASSWORD")
-DB_BASE = os.environ.get("DATABASE")
+
+def env_bool(name, default=False):
+    return ENV.get(name, str(default)).lower() in ("1", "true", "yes")
+
+
+DB_URL = ENV.get('DATABASE_URL')
+DB_HOST = ENV.get('DB_HOST')
+DB_PORT = ENV.get("DB_PORT")
+DB_USER = ENV.get("DB_USERNAME")
+DB_PASSWORD = ENV.get("DB_PASSWORD")
+DB_BASE = ENV.get("DATABASE")
+
+CACHE_BACKEND = ENV.get("CACHE_BACKEND", "none")
+CACHE_TTL = int(ENV.get("CACHE_TTL", 60))
+CACHE_MAX_SIZE = int(ENV.get("CACHE_MAX_SIZE", 1024))
+CACHE_REDIS_URL = ENV.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_NOTIFY = env_bool("CACHE_NOTIFY")
+
+DB_ASYNC = env_bool("DB_ASYNC")
+QUERY_STATS = env_bool("QUERY_STATS", True)
+METRICS = env_bool("METRICS", True)
+FAST_JSON = env_bool("FAST_JSON")
+SNAPSHOT = env_bool("SNAPSHOT")
+SNAPSHOT_TTL = int(ENV.get("SNAPSHOT_TTL", 60))
+COMPRESSION = env_bool("COMPRESSION")
+COMPRESSION_MIN_SIZE = int(ENV.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL = int(ENV.get("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(ENV.get("COMPRESSION_BROTLI_QUALITY", 5))
+COMPRESSION_CACHE_BYTES = int(ENV.get("COMPRESSION_CACHE_BYTES", 32 * 2 ** 20))
+COMPRESSION_CACHE_TTL = int(ENV.get("COMPRESSION_CACHE_TTL", 60))
+
+DB_POOL_SIZE = int(ENV.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(ENV.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(ENV.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(ENV.get("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING")
+DB_NULL_POOL = env_bool("DB_NULL_POOL")
+
+DB_REPLICA_URLS = tuple(url.strip() for url in ENV.get("DB_REPLICA_URLS", "").split(",") if url.strip())
+DB_REPLICA_RETRY = float(ENV.get("DB_REPLICA_RETRY", 30))
+DB_STICKY_SECONDS = float(ENV.get("DB_STICKY_SECONDS", 5))
+
+CACHE_CONTROL = ENV.get("CACHE_CONTROL", "no-cache")
+CACHE_CONTROL_ROUTES = {
+    route: ENV.get(f"CACHE_CONTROL_{route.upper()}", CACHE_CONTROL)
+    for route in ("menus", "tree", "menu", "submenus", "submenu", "dishes", "dish")
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """What create_app builds an app from; each defaults to its environment variable. `database_url`, when given,
+    replaces the DB_* variables and DATABASE_URL. The pool options apply to every engine, replicas included."""
+    db_async: bool = DB_ASYNC
+    query_stats: bool = QUERY_STATS
+    metrics: bool = METRICS
+    database_url: Optional[str] = None
+    replica_urls: Tuple[str, ...] = DB_REPLICA_URLS
+    cache_notify: bool = CACHE_NOTIFY
+    compression: bool = COMPRESSION
+    pool_size: int = DB_POOL_SIZE
+    max_overflow: int = DB_MAX_OVERFLOW
+    pool_timeout: float = DB_POOL_TIMEOUT
+    pool_recycle: int = DB_POOL_RECYCLE
+    pool_pre_ping: bool = DB_POOL_PRE_PING
+    null_pool: bool = DB_NULL_POOL
@@ -0,0 +1,102 @@
+import argparse
+
+from sqlalchemy import select, func, update, or_
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def dish_counts():
+    return (select(models.Dish.submenu_id, func.count().label('dishes_count'))
+            .group_by(models.Dish.submenu_id)
+            .subquery('dish_counts'))
+
+
+def submenu_counts():
+    dishes = dish_counts()
+    return (select(models.SubMenu.menu_id,
+                   func.count().label('submenus_count'),
+                   func.coalesce(func.sum(dishes.c.dishes_count), 0).label('dishes_count'))
+            .outerjoin(dishes, dishes.c.submenu_id == models.SubMenu.id)
+            .group_by(models.SubMenu.menu_id)
+            .subquery('submenu_counts'))
+
+
+def aggregated_menus(menu_id=None):
+    counts = submenu_counts()
+    query = (select(models.Menu.id,
+                    models.Menu.title,
+                    models.Menu.description,
+                    func.coalesce(counts.c.submenus_count, 0).label('submenus_count'),
+                    func.coalesce(counts.c.dishes_count, 0).label('dishes_count'))
+             .outerjoin(counts, counts.c.menu_id == models.Menu.id))
+    if menu_id is not None:
+        query = query.filter(models.Menu.id == menu_id)
+    return query
+
+
+def submenu_drift():
+    dishes = dish_counts()
+    actual = func.coalesce(dishes.c.dishes_count, 0)
+    return (select(models.SubMenu.id, models.SubMenu.dishes_count, actual.label('actual_dishes_count'))
+            .outerjoin(dishes, dishes.c.submenu_id == models.SubMenu.id)
+            .where(models.SubMenu.dishes_count != actual))
+
+
+def menu_drift():
+    actual = aggregated_menus().subquery('actual')
+    return (select(models.Menu.id,
+                   models.Menu.submenus_count,
+                   models.Menu.dishes_count,
+                   actual.c.submenus_count.label('actual_submenus_count'),
+                   actual.c.dishes_count.label('actual_dishes_count'))
+            .join(actual, actual.c.id == models.Menu.id)
+            .where(or_(models.Menu.submenus_count != actual.c.submenus_count,
+                       models.Menu.dishes_count != actual.c.dishes_count)))
+
+
+def check_counters(db: Session):
+    return {
+        'submenus': [row._asdict() for row in db.execute(submenu_drift())],
+        'menus': [row._asdict() for row in db.execute(menu_drift())],
+    }
+
+
+def repair_counters(db: Session):
+    submenus = submenu_drift().subquery()
+    fixed_submenus = db.execute(
+        update(models.SubMenu)
+        .where(models.SubMenu.id == submenus.c.id)
+        .values(dishes_count=submenus.c.actual_dishes_count)
+    ).rowcount
+    menus = menu_drift().subquery()
+    fixed_menus = db.execute(
+        update(models.Menu)
+        .where(models.Menu.id == menus.c.id)
+        .values(submenus_count=menus.c.actual_submenus_count, dishes_count=menus.c.actual_dishes_count)
+    ).rowcount
+    db.commit()
+    return {'submenus': fixed_submenus, 'menus': fixed_menus}
+
+
+def main():
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description='Check or repair the stored submenus_count/dishes_count columns.')
+    parser.add_argument('--repair', action='store_true', help='rewrite the counters that drifted')
+    args = parser.parse_args()
+    with Session(engine) as db:
+        if args.repair:
+            fixed = repair_counters(db)
+            print(f"repaired {fixed['submenus']} submenus and {fixed['menus']} menus")
+        else:
+            drift = check_counters(db)
+            for table, rows in drift.items():
+                for row in rows:
+                    print(table, row)
+            print(f"{len(drift['submenus'])} submenus and {len(drift['menus'])} menus out of sync")
+            raise SystemExit(1 if drift['submenus'] or drift['menus'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,33 @@
+import uuid
+from typing import List
 from uuid import UUID
 
 from fastapi import HTTPException
 from psycopg2 import errors
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, update, delete, literal, any_, bindparam
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
-
-from . import models, schemas
+from sqlalchemy.orm import Session, selectinload
+
+from . import models, schemas, cache, pagination, bulk, sync, snapshot
+
+# The hot reads, built once: each call only binds its ids, page size and cursor, so building and compiling the
+# statement is paid at import, and asyncpg reuses the statement it prepared for the last call with the same text.
+# They select plain columns, so they run on the session's connection, skipping the ORM's execution layer.
+MENU = select(models.Menu.id, models.Menu.title, models.Menu.description, models.Menu.submenus_count,
+              models.Menu.dishes_count)
+MENU_BY_ID = MENU.where(models.Menu.id == bindparam('menu_id'))
+MENU_PAGES = pagination.keyset_statements(MENU, models.Menu)
+SUBMENU = (select(models.SubMenu.id, models.SubMenu.title, models.SubMenu.description, models.SubMenu.dishes_count)
+           .where(models.SubMenu.menu_id == bindparam('menu_id')))
+SUBMENU_BY_ID = SUBMENU.where(models.SubMenu.id == bindparam('submenu_id'))
+SUBMENU_PAGES = pagination.keyset_statements(SUBMENU, models.SubMenu)
+# The submenu's menu_id stands for the menu, which its foreign key guarantees exists.
+DISH = (select(models.Dish.id, models.Dish.title, models.Dish.description, models.Dish.price)
+        .join(models.SubMenu, models.SubMenu.id == models.Dish.submenu_id)
+        .where(models.Dish.submenu_id == bindparam('submenu_id'), models.SubMenu.menu_id == bindparam('menu_id')))
+DISH_BY_ID = DISH.where(models.Dish.id == bindparam('dish_id'))
+DISH_PAGES = pagination.keyset_statements(DISH, models.Dish)
 
 
 def raise_if_not_exist(item: object, message: str, status_code=404):
@@ -22,227 +43,490 @@ def is_valid_uuid(uuid_to_test, version=4):
     return str(uuid_obj) == uuid_to_test
 
 
-def get_submenus(db: Session, menu_id: UUID):
-    submenus = db.query(models.SubMenu.id,
-                        models.SubMenu.title,
-                        models.SubMenu.description,
-                        (
-                            select(func.count(models.Dish.id))
-                            .where(models.SubMenu.id == models.Dish.submenu_id)
-                            .scalar_subquery().label('dishes_count')
-                        )
-                        ).filter(models.SubMenu.menu_id == menu_id)
-    return submenus.all()
+MENU_COLUMNS = (models.Menu.id, models.Menu.title, models.Menu.description, models.Menu.submenus_count,
+                models.Menu.dishes_count)
+SUBMENU_COLUMNS = (models.SubMenu.id, models.SubMenu.title, models.SubMenu.description, models.SubMenu.dishes_count)
+DISH_COLUMNS = (models.Dish.id, models.Dish.title, models.Dish.description, models.Dish.price)
 
 
-def get_submenu_by_id(db: Session, menu_id: UUID, submenu_id: UUID):
-    submenus = db.query(models.SubMenu.id,
-                        models.SubMenu.title,
-                        models.SubMenu.description,
-                        (
-                            select(func.count(models.Dish.id))
-                            .where(models.SubMenu.id == models.Dish.submenu_id)
-                            .scalar_subquery().label('dishes_count')
-                        )
-                        ).filter(and_(models.SubMenu.menu_id == menu_id, models.SubMenu.id == submenu_id))
-    return submenus.first()
+def insert_values(item: schemas.MenuBase):
+    return {'id': uuid.uuid4(), **item.model_dump(exclude_unset=True)}
 
 
-def get_submenu_by_title(db: Session, title: str):
-    return db.query(models.SubMenu).filter(models.SubMenu.title == title).first()
+def update_values(item: schemas.MenuBase):
+    return item.model_dump(exclude_unset=True, exclude={'id'})
 
 
-def create_submenu(db: Session, menu_id: UUID, submenu: schemas.MenuBase):
-    if is_valid_uuid(menu_id):
-        db_submenu = models.SubMenu()
-        submenu_data = submenu.model_dump(exclude_unset=True)
-        for key, value in submenu_data.items():
-            setattr(db_submenu, key, value)
-        db_submenu.menu_id = menu_id
-        db.add(db_submenu)
-        db.commit()
-        db.refresh(db_submenu)
-        return get_submenu_by_id(db=db, menu_id=menu_id, submenu_id=db_submenu.id)
-    else:
-        raise HTTPException(status_code=422, detail="Wrong id type")
+def literals(model, values):
+    columns = model.__table__.c
+    return [literal(value, columns[key].type) for key, value in values.items()]
 
 
-def get_menus(db: Session):
-    menus = (db.query(
-        models.Menu.id,
-        models.Menu.title,
-        models.Menu.description,
-        func.count(models.SubMenu.id).label('submenus_count'),
-        (
-            select(func.coalesce(func.count(models.Dish.id), 0))
-            .where(models.SubMenu.id == models.Dish.submenu_id)
-            .scalar_subquery()
-        ).label('dishes_count')
-    ).join(models.SubMenu, isouter=True)
-             .group_by(models.Menu.id, models.Menu.title, models.Menu.description, 'dishes_count'))
+def insert_menu_query(values):
+    return insert(models.Menu).values(**values).on_conflict_do_nothing().returning(*MENU_COLUMNS)
 
-    return menus.all()
 
+def insert_submenu_query(menu_id: UUID, values):
+    """INSERT ... SELECT from the parent row: a missing parent, like a taken title or id, just inserts nothing."""
+    menu = select(*literals(models.SubMenu, values), models.Menu.id).where(models.Menu.id == menu_id)
+    return (insert(models.SubMenu).from_select([*values, 'menu_id'], menu)
+            .on_conflict_do_nothing().returning(*SUBMENU_COLUMNS))
+
+
+def insert_dish_query(menu_id: UUID, submenu_id: UUID, values):
+    submenu = (select(*literals(models.Dish, values), models.SubMenu.id)
+               .where(models.SubMenu.id == submenu_id, models.SubMenu.menu_id == menu_id))
+    return (insert(models.Dish).from_select([*values, 'submenu_id'], submenu)
+            .on_conflict_do_nothing().returning(*DISH_COLUMNS))
+
+
+def menu_exists(menu_id: UUID):
+    return select(models.Menu.id).where(models.Menu.id == menu_id).exists()
+
+
+def submenu_exists(menu_id: UUID, submenu_id: UUID):
+    return select(models.SubMenu.id).where(models.SubMenu.id == submenu_id, models.SubMenu.menu_id == menu_id).exists()
+
+
+def insert_conflicts_query(model, values, menu_id: UUID = None, submenu_id: UUID = None):
+    """Why an insert wrote no row. Only run on that error path, so a successful write stays one statement."""
+    return select(menu_exists(menu_id).label('menu'),
+                  submenu_exists(menu_id, submenu_id).label('submenu'),
+                  select(model.id).where(model.title == values['title']).exists().label('title'),
+                  select(model.id).where(model.id == values['id']).exists().label('taken_id'))
+
+
+def raise_insert_conflict(found, model):
+    label = bulk.LABELS[model]
+    if model is not models.Menu:
+        raise_if_not_exist(found.menu, "ID of Menu not registered", 400)
+    if model is models.Dish:
+        raise_if_not_exist(found.submenu, "ID of Submenu not registered", 400)
+    if found.title:
+        raise HTTPException(status_code=400, detail=f"Title of {label} already registered")
+    if found.taken_id:
+        raise HTTPException(status_code=400, detail=f"ID of {label} already registered")
+    # The conflicting row was deleted before we looked.
+    raise HTTPException(status_code=409, detail='A duplicate record already exists')
+
+
+def raise_not_found(found, message: str):
+    raise_if_not_exist(found.menu, "Menu not found")
+    raise_if_not_exist(found.submenu, "Submenu not found")
+    raise HTTPException(status_code=404, detail=message)
+
+
+def parents_query(menu_id: UUID, submenu_id: UUID):
+    """Which parent is missing when an update or delete matched no row."""
+    return select(menu_exists(menu_id).label('menu'), submenu_exists(menu_id, submenu_id).label('submenu'))
+
+
+def update_menu_query(menu_id: UUID, menu: schemas.MenuBase):
+    return (update(models.Menu).where(models.Menu.id == menu_id).values(**update_values(menu))
+            .returning(*MENU_COLUMNS).execution_options(synchronize_session=False))
+
+
+def update_submenu_query(menu_id: UUID, submenu_id: UUID, submenu: schemas.MenuBase):
+    return (update(models.SubMenu)
+            .where(models.SubMenu.id == submenu_id, models.SubMenu.menu_id == menu_id)
+            .values(**update_values(submenu))
+            .returning(*SUBMENU_COLUMNS).execution_options(synchronize_session=False))
+
+
+def update_dish_query(menu_id: UUID, submenu_id: UUID, dish_id: UUID, dish: schemas.DishUpdate):
+    return (update(models.Dish)
+            .where(models.Dish.id == dish_id, models.Dish.submenu_id == submenu_id,
+                   models.SubMenu.id == models.Dish.submenu_id, models.SubMenu.menu_id == menu_id)
+            .values(**update_values(dish))
+            .returning(*DISH_COLUMNS).execution_options(synchronize_session=False))
+
+
+def delete_menu_query(menu_id: UUID):
+    return (delete(models.Menu).where(models.Menu.id == menu_id)
+            .returning(models.Menu.id).execution_options(synchronize_session=False))
 
-def get_menu_by_id(db: Session, menu_id: UUID):
-    menus = (db.query(
-        models.Menu.id,
-        models.Menu.title,
-        models.Menu.description,
-        func.count(models.SubMenu.id).label('submenus_count'),
-        (
-            select(func.count(models.Dish.id))
-            .where(models.SubMenu.id == models.Dish.submenu_id)
-            .scalar_subquery()
-        ).label('dishes_count')
-    ).filter(models.Menu.id == menu_id)
-             .join(models.SubMenu, isouter=True)
-             .group_by(models.Menu.id, models.Menu.title, models.Menu.description, 'dishes_count'))
-
-    return menus.first()
-
-
-def get_menu_by_title(db: Session, title: str):
-    return db.query(models.Menu).filter(models.Menu.title == title).first()
-
-
-def check_menu_by_id(db: Session, menu_id: UUID):
-    if is_valid_uuid(menu_id):
-        return db.query(models.Menu.id).filter(models.Menu.id == menu_id).first()
-    else:
-        raise HTTPException(status_code=422, detail="Wrong id type")
 
+def delete_submenu_query(menu_id: UUID, submenu_id: UUID):
+    return (delete(models.SubMenu).where(models.SubMenu.id == submenu_id, models.SubMenu.menu_id == menu_id)
+            .returning(models.SubMenu.id).execution_options(synchronize_session=False))
 
-def check_submenu_by_id(db: Session, submenu_id: UUID):
-    if is_valid_uuid(submenu_id):
-        return db.query(models.SubMenu).filter(models.SubMenu.id == submenu_id).first()
-    else:
+
+def delete_dish_query(menu_id: UUID, submenu_id: UUID, dish_id: UUID):
+    return (delete(models.Dish)
+            .where(models.Dish.id == dish_id, models.Dish.submenu_id == submenu_id,
+                   models.SubMenu.id == models.Dish.submenu_id, models.SubMenu.menu_id == menu_id)
+            .returning(models.Dish.id).execution_options(synchronize_session=False))
+
+
+def on_conflict_update(model, statement, columns, moves=False):
+    """Make `statement` an upsert on id. Unless `moves` is set, a row is never moved under another parent, which
+    would leave the counters and cache keys of the old one behind; the upsert skips it instead and the caller
+    reports the id as taken."""
+    parent_key = None if moves else bulk.PARENT_KEYS.get(model)
+    return statement.on_conflict_do_update(
+        index_elements=[model.id],
+        set_={column: statement.excluded[column] for column in columns if column not in ('id', parent_key)},
+        where=None if parent_key is None else getattr(model, parent_key) == statement.excluded[parent_key])
+
+
+def upsert_menu_query(menu_id: UUID, menu: schemas.MenuBase):
+    values = {**update_values(menu), 'id': menu_id}
+    return on_conflict_update(models.Menu, insert(models.Menu).values(**values), values).returning(*MENU_COLUMNS)
+
+
+def upsert_submenu_query(menu_id: UUID, submenu_id: UUID, submenu: schemas.MenuBase):
+    values = {**update_values(submenu), 'id': submenu_id}
+    menu = select(*literals(models.SubMenu, values), models.Menu.id).where(models.Menu.id == menu_id)
+    statement = insert(models.SubMenu).from_select([*values, 'menu_id'], menu)
+    return on_conflict_update(models.SubMenu, statement, values).returning(*SUBMENU_COLUMNS)
+
+
+def upsert_dish_query(menu_id: UUID, submenu_id: UUID, dish_id: UUID, dish: schemas.DishUpdate):
+    values = {**update_values(dish), 'id': dish_id}
+    submenu = (select(*literals(models.Dish, values), models.SubMenu.id)
+               .where(models.SubMenu.id == submenu_id, models.SubMenu.menu_id == menu_id))
+    statement = insert(models.Dish).from_select([*values, 'submenu_id'], submenu)
+    return on_conflict_update(models.Dish, statement, values).returning(*DISH_COLUMNS)
+
+
+def upsert_rows_query(model, moves=False):
+    """Executed with a list of rows, which SQLAlchemy batches into multi-row INSERTs."""
+    return on_conflict_update(model, insert(model), bulk.COLUMNS[model], moves).returning(model.id)
+
+
+def delete_rows_query(model, ids):
+    return delete(model).where(model.id == any_(bulk.uuid_array('ids', ids))).execution_options(
+        synchronize_session=False)
+
+
+def sync_statements(plan: sync.Plan):
+    """Deletes that free titles, upserts from parents down to dishes, then the deletes that had to wait for the
+    items moving out from under them. Empty steps are skipped, so an unchanged catalogue writes nothing."""
+    for model in sync.MODELS:
+        if plan.deletes[model]:
+            yield delete_rows_query(model, plan.deletes[model]), None
+    for model in sync.MODELS:
+        if plan.writes[model]:
+            yield upsert_rows_query(model, moves=True), plan.writes[model]
+    for model in sync.MODELS:
+        if plan.deferred[model]:
+            yield delete_rows_query(model, plan.deferred[model]), None
+
+
+def raise_upsert_conflict(found, model):
+    """An upsert wrote no row: its parent is missing, or the id belongs to a row under another parent."""
+    raise_if_not_exist(found.menu, "Menu not found")
+    if model is models.Dish:
+        raise_if_not_exist(found.submenu, "Submenu not found")
+    raise HTTPException(status_code=400, detail=f"ID of {bulk.LABELS[model]} already registered")
+
+
+def upsert_conflicts(rows, upserted):
+    """Rows an upsert batch skipped because their id is registered under another parent."""
+    return [bulk.conflict(model, row, f'ID of {bulk.LABELS[model]} already registered')
+            for model, model_rows in rows.items() for row in model_rows if row['id'] not in upserted[model]]
+
+
+def get_submenus(db: Session, menu_id: UUID, limit: int = None, after: str = None):
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        submenus = catalogue.get_submenus(menu_id, limit, after)
+        if submenus is not None:
+            return submenus
+    return db.connection().execute(*pagination.keyset(SUBMENU_PAGES, limit, after, menu_id=menu_id)).all()
+
+
+def get_submenu_by_id(db: Session, menu_id: UUID, submenu_id: UUID):
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        return catalogue.get_submenu_by_id(menu_id, submenu_id)
+    return db.connection().execute(SUBMENU_BY_ID, {'menu_id': menu_id, 'submenu_id': submenu_id}).first()
+
+
+def create_submenu(db: Session, menu_id: UUID, submenu: schemas.MenuBase):
+    if not is_valid_uuid(menu_id):
         raise HTTPException(status_code=422, detail="Wrong id type")
+    values = insert_values(submenu)
+    db_submenu = db.execute(insert_submenu_query(menu_id, values)).first()
+    if db_submenu is None:
+        raise_insert_conflict(db.execute(insert_conflicts_query(models.SubMenu, values, menu_id)).one(),
+                              models.SubMenu)
+    db.commit()
+    cache.invalidate_submenu(menu_id, db_submenu.id, subtree=True)
+    return db_submenu
+
+
+def get_menus(db: Session, limit: int = None, after: str = None):
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        menus = catalogue.get_menus(limit, after)
+        if menus is not None:
+            return menus
+    return db.connection().execute(*pagination.keyset(MENU_PAGES, limit, after)).all()
+
+
+def get_menu_by_id(db: Session, menu_id: UUID):
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        return catalogue.get_menu_by_id(menu_id)
+    return db.connection().execute(MENU_BY_ID, {'menu_id': menu_id}).first()
+
+
+def menu_tree_query(menu_id: UUID = None):
+    query = (select(models.Menu)
+             .options(selectinload(models.Menu.children).selectinload(models.SubMenu.children))
+             .order_by(models.Menu.title, models.Menu.id))
+    if menu_id is not None:
+        query = query.filter(models.Menu.id == menu_id)
+    return query
+
+
+def build_menu_tree(menus):
+    tree = []
+    for menu in menus:
+        submenus = []
+        for submenu in sorted(menu.children, key=lambda item: (item.title, item.id)):
+            dishes = sorted(submenu.children, key=lambda item: (item.title, item.id))
+            submenus.append({
+                'id': submenu.id,
+                'title': submenu.title,
+                'description': submenu.description,
+                'dishes_count': len(dishes),
+                'dishes': dishes,
+            })
+        tree.append({
+            'id': menu.id,
+            'title': menu.title,
+            'description': menu.description,
+            'submenus_count': len(submenus),
+            'dishes_count': sum(submenu['dishes_count'] for submenu in submenus),
+            'submenus': submenus,
+        })
+    return tree
+
+
+def get_menu_tree(db: Session, menu_id: UUID = None):
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        return catalogue.get_menu_tree(menu_id)
+    return build_menu_tree(db.execute(menu_tree_query(menu_id)).scalars().all())
 
 
 def create_menu(db: Session, menu: schemas.MenuBase):
-    db_menu = models.Menu()
-    menu_data = menu.model_dump(exclude_unset=True)
-    for key, value in menu_data.items():
-        setattr(db_menu, key, value)
+    values = insert_values(menu)
+    db_menu = db.execute(insert_menu_query(values)).first()
+    if db_menu is None:
+        raise_insert_conflict(db.execute(insert_conflicts_query(models.Menu, values)).one(), models.Menu)
+    db.commit()
+    cache.invalidate_menu(db_menu.id, subtree=True)
+    return db_menu
+
+
+def import_menus(db: Session, menus: List[schemas.MenuImport]):
+    rows, conflicts = bulk.flatten(menus)
+    for model, query in bulk.lookups(rows):
+        conflicts += bulk.existing_conflicts(model, rows[model], db.execute(query).all())
+    if conflicts:
+        raise HTTPException(status_code=409, detail=conflicts)
     try:
-        db.add(db_menu)
+        bulk.copy_rows(db.connection().connection.dbapi_connection, rows)
         db.commit()
-        db.refresh(db_menu)
-    except IntegrityError:
-        raise HTTPException(status_code=500, detail='A duplicate record already exists')
-    return get_menu_by_id(db, menu_id=db_menu.id)
+    except errors.UniqueViolation:
+        db.rollback()
+        raise HTTPException(status_code=409, detail='A duplicate record already exists')
+    for menu in rows[models.Menu]:
+        cache.invalidate_menu(menu['id'], subtree=True)
+    return bulk.counts(rows)
 
 
-def get_dishes(db: Session, submenu_id: UUID, menu_id: UUID):
-    dishes = (db.query(models.Dish).select_from(models.Dish).join(models.SubMenu).join(models.Menu).filter(
-        and_(models.SubMenu.id == submenu_id, models.Menu.id == menu_id))
-    )
-    return dishes.all()
+def get_dishes(db: Session, submenu_id: UUID, menu_id: UUID, limit: int = None, after: str = None):
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        dishes = catalogue.get_dishes(menu_id, submenu_id, limit, after)
+        if dishes is not None:
+            return dishes
+    return db.connection().execute(*pagination.keyset(DISH_PAGES, limit, after, menu_id=menu_id,
+                                                      submenu_id=submenu_id)).all()
 
 
 def get_dish_by_id(db: Session, submenu_id: UUID, menu_id: UUID, dish_id: UUID):
-    dishes = (db.query(models.Dish).select_from(models.Dish).where(models.Dish.id == dish_id).join(models.SubMenu).join(
-        models.Menu).filter(
-        and_(models.SubMenu.id == submenu_id, models.Menu.id == menu_id))
-    )
-    return dishes.first()
+    catalogue = snapshot.current(db)
+    if catalogue is not None:
+        return catalogue.get_dish_by_id(menu_id, submenu_id, dish_id)
+    return db.connection().execute(DISH_BY_ID, {'menu_id': menu_id, 'submenu_id': submenu_id,
+                                                'dish_id': dish_id}).first()
 
 
 def create_dish(db: Session, menu_id: UUID, submenu_id: UUID, dish: schemas.DishCreate):
-    if is_valid_uuid(menu_id) and is_valid_uuid(submenu_id):
-        db_dish = models.Dish()
-        dish_data = dish.model_dump(exclude_unset=True)
-        for key, value in dish_data.items():
-            setattr(db_dish, key, value)
-        db_dish.submenu_id = submenu_id
-        try:
-            db.add(db_dish)
-            db.commit()
-            db.refresh(db_dish)
-        except IntegrityError:
-            raise HTTPException(status_code=500, detail='A duplicate record already exists')
-
-        return get_dish_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=db_dish.id)
-    else:
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    if not is_valid_uuid(submenu_id):
+        raise_if_not_exist(db.execute(select(menu_exists(menu_id))).scalar(), "ID of Menu not registered", 400)
         raise HTTPException(status_code=422, detail="Wrong id type")
+    values = insert_values(dish)
+    db_dish = db.execute(insert_dish_query(menu_id, submenu_id, values)).first()
+    if db_dish is None:
+        found = db.execute(insert_conflicts_query(models.Dish, values, menu_id, submenu_id)).one()
+        raise_insert_conflict(found, models.Dish)
+    db.commit()
+    cache.invalidate_dish(menu_id, submenu_id, db_dish.id)
+    return db_dish
 
 
 def delete_menu_by_id(db: Session, menu_id: UUID):
-    if is_valid_uuid(menu_id):
-        menu = db.get(models.Menu, menu_id)
-        raise_if_not_exist(menu, "Menu not found")
-        db.delete(menu)
-        db.commit()
-    else:
+    if not is_valid_uuid(menu_id):
         raise HTTPException(status_code=422, detail="Wrong id type")
+    raise_if_not_exist(db.execute(delete_menu_query(menu_id)).first(), "Menu not found")
+    db.commit()
+    cache.invalidate_menu(menu_id, subtree=True)
     return {"status": True, "message": "The menu has been deleted"}
 
 
 def delete_submenu_by_id(db: Session, menu_id: UUID, submenu_id: UUID):
-    if is_valid_uuid(menu_id) and is_valid_uuid(submenu_id):
-        menu = db.get(models.Menu, menu_id)
-        raise_if_not_exist(menu, "Menu not found")
-        submenu = db.get(models.SubMenu, submenu_id)
-        db.delete(submenu)
-        db.commit()
-    else:
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id)):
         raise HTTPException(status_code=422, detail="One or more wrong types id")
+    if db.execute(delete_submenu_query(menu_id, submenu_id)).first() is None:
+        raise_not_found(db.execute(parents_query(menu_id, submenu_id)).one(), "Submenu not found")
+    db.commit()
+    cache.invalidate_submenu(menu_id, submenu_id, subtree=True)
     return {"status": True, "message": "The submenu has been deleted"}
 
 
 def delete_dish_by_id(db: Session, menu_id: UUID, submenu_id: UUID, dish_id: UUID):
-    if is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id):
-        menu = db.get(models.Menu, menu_id)
-        raise_if_not_exist(menu, "Menu not found")
-        submenu = db.get(models.SubMenu, submenu_id)
-        raise_if_not_exist(submenu, "Submenu not found")
-        dish = db.get(models.Dish, dish_id)
-        raise_if_not_exist(dish, "Dish not found")
-        db.delete(dish)
-        db.commit()
-    else:
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id)):
         raise HTTPException(status_code=422, detail="One or more wrong types id")
+    if db.execute(delete_dish_query(menu_id, submenu_id, dish_id)).first() is None:
+        raise_not_found(db.execute(parents_query(menu_id, submenu_id)).one(), "Dish not found")
+    db.commit()
+    cache.invalidate_dish(menu_id, submenu_id, dish_id)
     return {"status": True, "message": "The dish has been deleted"}
 
 
 def update_menu(db: Session, menu_id: UUID, menu: schemas.MenuBase):
-    db_menu = db.get(models.Menu, menu_id)
-    raise_if_not_exist(menu, "Menu not found")
-    menu_data = menu.model_dump(exclude_unset=True)
-    for key, value in menu_data.items():
-        setattr(db_menu, key, value)
-    db.add(db_menu)
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    try:
+        db_menu = db.execute(update_menu_query(menu_id, menu)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Menu already registered")
+    raise_if_not_exist(db_menu, "Menu not found")
     db.commit()
-    db.refresh(db_menu)
-    return get_menu_by_id(db, db_menu.id)
+    cache.invalidate_menu(menu_id)
+    return db_menu
 
 
 def update_submenu(db: Session, menu_id: UUID, submenu_id: UUID, submenu: schemas.MenuBase):
-    db_menu = db.get(models.Menu, menu_id)
-    raise_if_not_exist(db_menu, "Menu not found")
-    db_submenu = db.get(models.SubMenu, submenu_id)
-    raise_if_not_exist(db_submenu, "Submenu not found")
-    submenu_data = submenu.model_dump(exclude_unset=True)
-    for key, value in submenu_data.items():
-        setattr(db_submenu, key, value)
-    db.add(db_submenu)
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_submenu = db.execute(update_submenu_query(menu_id, submenu_id, submenu)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Submenu already registered")
+    if db_submenu is None:
+        raise_not_found(db.execute(parents_query(menu_id, submenu_id)).one(), "Submenu not found")
     db.commit()
-    db.refresh(db_submenu)
-    return get_submenu_by_id(db=db, menu_id=menu_id, submenu_id=db_submenu.id)
+    cache.invalidate_submenu(menu_id, submenu_id, counts=False)
+    return db_submenu
 
 
 def update_dish(db: Session, menu_id: UUID, submenu_id: UUID, dish_id: UUID, dish: schemas.DishUpdate):
-    db_menu = db.get(models.Menu, menu_id)
-    raise_if_not_exist(db_menu, "Menu not found")
-    db_submenu = db.get(models.SubMenu, submenu_id)
-    raise_if_not_exist(db_submenu, "Submenu not found")
-    db_dish = db.get(models.Dish, dish_id)
-    raise_if_not_exist(db_dish, "Submenu not found")
-    dish_data = dish.model_dump(exclude_unset=True)
-    for key, value in dish_data.items():
-        setattr(db_dish, key, value)
-    db.add(db_dish)
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_dish = db.execute(update_dish_query(menu_id, submenu_id, dish_id, dish)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Dish already registered")
+    if db_dish is None:
+        raise_not_found(db.execute(parents_query(menu_id, submenu_id)).one(), "Dish not found")
+    db.commit()
+    cache.invalidate_dish(menu_id, submenu_id, dish_id, counts=False)
+    return db_dish
+
+
+def upsert_menu(db: Session, menu_id: UUID, menu: schemas.MenuBase):
+    if not is_valid_uuid(menu_id):
+        raise HTTPException(status_code=422, detail="Wrong id type")
+    try:
+        db_menu = db.execute(upsert_menu_query(menu_id, menu)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Menu already registered")
+    db.commit()
+    cache.invalidate_menu(menu_id, subtree=True)
+    return db_menu
+
+
+def upsert_submenu(db: Session, menu_id: UUID, submenu_id: UUID, submenu: schemas.MenuBase):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_submenu = db.execute(upsert_submenu_query(menu_id, submenu_id, submenu)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Submenu already registered")
+    if db_submenu is None:
+        raise_upsert_conflict(db.execute(parents_query(menu_id, submenu_id)).one(), models.SubMenu)
+    db.commit()
+    cache.invalidate_submenu(menu_id, submenu_id, subtree=True)
+    return db_submenu
+
+
+def upsert_dish(db: Session, menu_id: UUID, submenu_id: UUID, dish_id: UUID, dish: schemas.DishUpdate):
+    if not (is_valid_uuid(menu_id) and is_valid_uuid(submenu_id) and is_valid_uuid(dish_id)):
+        raise HTTPException(status_code=422, detail="One or more wrong types id")
+    try:
+        db_dish = db.execute(upsert_dish_query(menu_id, submenu_id, dish_id, dish)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Title of Dish already registered")
+    if db_dish is None:
+        raise_upsert_conflict(db.execute(parents_query(menu_id, submenu_id)).one(), models.Dish)
+    db.commit()
+    cache.invalidate_dish(menu_id, submenu_id, dish_id)
+    return db_dish
+
+
+def upsert_menus(db: Session, menus: List[schemas.MenuImport]):
+    rows, conflicts = bulk.flatten(menus)
+    if conflicts:
+        raise HTTPException(status_code=409, detail=conflicts)
+    upserted = {}
+    try:
+        for model, model_rows in rows.items():
+            upserted[model] = set(db.execute(upsert_rows_query(model), model_rows).scalars()) if model_rows else set()
+    except IntegrityError:
+        db.rollback()
+        for model, query in bulk.lookups(rows):
+            conflicts += bulk.title_conflicts(model, rows[model], db.execute(query).all())
+        raise HTTPException(status_code=409, detail=conflicts or 'A duplicate record already exists')
+    conflicts = upsert_conflicts(rows, upserted)
+    if conflicts:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=conflicts)
+    db.commit()
+    for menu in rows[models.Menu]:
+        cache.invalidate_menu(menu['id'], subtree=True)
+    return bulk.counts(rows)
+
+
+def sync_menus(db: Session, menus: List[schemas.MenuImport]):
+    rows, conflicts = bulk.flatten(menus)
+    if conflicts:
+        raise HTTPException(status_code=409, detail=conflicts)
+    state = {model: {row.id: row for row in db.execute(query)} for model, query in sync.state_queries()}
+    plan = sync.Plan(rows, state)
+    try:
+        for statement, params in sync_statements(plan):
+            db.execute(statement, params)
+    except IntegrityError:
+        db.rollback()
+        for model, query in bulk.lookups(rows):
+            conflicts += bulk.title_conflicts(model, rows[model], db.execute(query).all())
+        raise HTTPException(status_code=409, detail=conflicts or 'A duplicate record already exists')
     db.commit()
-    db.refresh(db_dish)
-    return get_dish_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=db_dish.id)
+    for menu_id in plan.touched:
+        cache.invalidate_menu(menu_id, subtree=True)
+    return plan.result
@@ -1,9 +1,12 @@
-from sqlalchemy import URL
+from sqlalchemy import URL, make_url
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from .config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_BASE, DB_URL
+from .config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_BASE, DB_URL, Settings
+from . import query_stats
+from .pool import engine_options
+from .replicas import Replicas
 
 if DB_URL:
     DB = DB_URL.split('@')[1].split(':')[0]
@@ -22,8 +25,77 @@ url_object = URL.create(
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_BASE}"
 
-engine = create_engine(url_object)
+Base = declarative_base()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ENGINE_NAMES = ('engine', 'SessionLocal', 'read_replicas', 'async_engine', 'AsyncSessionLocal', 'async_read_replicas')
 
-Base = declarative_base()
+
+def _build_engines(settings: Settings):
+    """The engines and session factories `settings` describe, by their ENGINE_NAMES. Nothing connects until the first
+    query."""
+    url = make_url(settings.database_url) if settings.database_url else url_object
+    engine = create_engine(url, **engine_options(settings))
+    query_stats.instrument(engine)
+    replica_urls = [make_url(replica_url) for replica_url in settings.replica_urls]
+    replicas = [create_engine(replica_url, **engine_options(settings)) for replica_url in replica_urls]
+    for replica in replicas:
+        query_stats.instrument(replica)
+    created = {'engine': engine, 'SessionLocal': sessionmaker(autocommit=False, autoflush=False, bind=engine),
+               'read_replicas': Replicas(replicas) if replicas else None}
+    if settings.db_async:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(url.set(drivername="postgresql+asyncpg"),
+                                           **engine_options(settings, is_async=True))
+        async_replicas = [create_async_engine(replica_url.set(drivername="postgresql+asyncpg"),
+                                              **engine_options(settings, is_async=True))
+                          for replica_url in replica_urls]
+        for replica in [async_engine, *async_replicas]:
+            query_stats.instrument(replica.sync_engine)
+        created.update(async_engine=async_engine,
+                       AsyncSessionLocal=async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False),
+                       async_read_replicas=Replicas(async_replicas) if async_replicas else None)
+    return created
+
+
+async def create_engines(settings: Settings = None):
+    """Set `engine` and `SessionLocal`, and with db_async `async_engine` and `AsyncSessionLocal`, disposing of any set
+    before; `read_replicas` and `async_read_replicas` hold the replica_urls' engines, None without any. create_app's
+    lifespan calls this for each worker; anything that reaches for an engine before then gets those the environment
+    describes, whose pools close here."""
+    await dispose_engines()
+    globals().update(_build_engines(settings or Settings()))
+
+
+async def dispose_engines():
+    for replica in getattr(globals().get('async_read_replicas'), 'engines', ()):
+        await replica.dispose()
+    for replica in getattr(globals().get('read_replicas'), 'engines', ()):
+        replica.dispose()
+    if 'async_engine' in globals():
+        await globals()['async_engine'].dispose()
+    if 'engine' in globals():
+        globals()['engine'].dispose()
+    for name in ENGINE_NAMES:
+        globals().pop(name, None)
+
+
+def engines():
+    """The engines in use, as the pool status and metrics name them."""
+    found = {'sync': __getattr__('engine')}
+    if 'async_engine' in globals():
+        found['async'] = globals()['async_engine']
+    for name, replicas in (('sync', globals().get('read_replicas')), ('async', globals().get('async_read_replicas'))):
+        for index, replica in enumerate(getattr(replicas, 'engines', ())):
+            found[f'{name}_replica_{index}'] = replica
+    return found
+
+
+def __getattr__(name):
+    # Only reached while the engines are unset, so importing this module creates none.
+    if name in ENGINE_NAMES:
+        if 'engine' not in globals():
+            globals().update(_build_engines(Settings()))
+        if name in globals():
+            return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+from sqlalchemy import String, cast, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CHUNK_ROWS = 1000
+
+COLUMNS = ('menu_id', 'menu_title', 'menu_description',
+           'submenu_id', 'submenu_title', 'submenu_description',
+           'dish_id', 'dish_title', 'dish_description', 'dish_price')
+
+
+def export_query():
+    """One row per dish, plus one row for every menu or submenu without children.
+
+    Everything is selected as text, which spares building a UUID and a Decimal per cell only to print them again.
+    """
+    columns = (models.Menu.id, models.Menu.title, models.Menu.description,
+               models.SubMenu.id, models.SubMenu.title, models.SubMenu.description,
+               models.Dish.id, models.Dish.title, models.Dish.description, models.Dish.price)
+    return (select(*[cast(column, String).label(name) for column, name in zip(columns, COLUMNS)])
+            .outerjoin(models.SubMenu, models.SubMenu.menu_id == models.Menu.id)
+            .outerjoin(models.Dish, models.Dish.submenu_id == models.SubMenu.id)
+            .order_by(models.Menu.title, models.Menu.id, models.SubMenu.title, models.SubMenu.id,
+                      models.Dish.title, models.Dish.id)
+            .execution_options(yield_per=CHUNK_ROWS))
+
+
+def encode_ndjson(rows):
+    return ''.join(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def encode_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def header(fmt):
+    return encode_csv([COLUMNS]) if fmt == 'csv' else ''
+
+
+ENCODERS = {'ndjson': encode_ndjson, 'csv': encode_csv}
+
+
+def stream_export(bind, fmt):
+    """Yield the catalogue in chunks from a server-side cursor on a session of its own.
+
+    The request session is closed once the route returns, before the body is streamed, so only its bind is reused.
+    """
+    encode = ENCODERS[fmt]
+    yield header(fmt)
+    with Session(bind=bind) as db:
+        for partition in db.execute(export_query()).partitions():
+            yield encode(partition)
+
+
+async def stream_export_async(bind, fmt):
+    # Imported here, so a sync app never loads the asyncio extension.
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    encode = ENCODERS[fmt]
+    yield header(fmt)
+    async with AsyncSession(bind=bind) as db:
+        result = await db.stream(export_query())
+        async for partition in result.partitions():
+            yield encode(partition)
@@ -0,0 +1,176 @@
+import time
+from bisect import bisect_left
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from . import cache, database
+from .pool import pool_status
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+CONTENT_TYPE = 'text/plain; version=0.0.4'  # Starlette appends the charset to text types
+
+# Counters are plain ints bumped from the middleware, which always runs on the event loop thread, so no lock is
+# taken per request. Each worker process keeps its own set; Prometheus sums them across scrape targets.
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class RouteMetrics:
+    __slots__ = ('labels', 'duration', 'size', 'statuses')
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+
+    def observe(self, seconds, size, status):
+        self.duration.observe(seconds)
+        self.size.observe(size)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+def _labels(route):
+    if route is None:
+        return 'method="",route="<unmatched>"'
+    methods = ','.join(sorted(getattr(route, 'methods', None) or ()))
+    return f'method="{methods}",route="{route.path}"'
+
+
+class Metrics:
+    def __init__(self):
+        self.routes = {}
+        self.in_flight = 0
+        self.exceptions = 0
+
+    def route(self, route):
+        # Routes define __eq__ and are not hashable; they live as long as the app, so their id is a stable key.
+        key = id(route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics(_labels(route))
+        return metrics
+
+    def render(self):
+        lines = [
+            '# HELP http_requests_in_flight Requests currently being served.',
+            '# TYPE http_requests_in_flight gauge',
+            f'http_requests_in_flight {self.in_flight}',
+            '# HELP http_request_exceptions_total Requests that raised instead of returning a response.',
+            '# TYPE http_request_exceptions_total counter',
+            f'http_request_exceptions_total {self.exceptions}',
+        ]
+        routes = sorted(self.routes.values(), key=lambda item: item.labels)
+        lines += ['# HELP http_request_duration_seconds Request duration by route template.',
+                  '# TYPE http_request_duration_seconds histogram']
+        for route in routes:
+            lines.extend(route.duration.render('http_request_duration_seconds', route.labels))
+        lines += ['# HELP http_response_size_bytes Response body size by route template.',
+                  '# TYPE http_response_size_bytes histogram']
+        for route in routes:
+            lines.extend(route.size.render('http_response_size_bytes', route.labels))
+        lines += ['# HELP http_responses_total Responses by route template and status code.',
+                  '# TYPE http_responses_total counter']
+        for route in routes:
+            for status, count in sorted(route.statuses.items()):
+                lines.append(f'http_responses_total{{{route.labels},status="{status}"}} {count}')
+        lines.extend(render_pools())
+        lines.extend(render_cache())
+        return '\n'.join(lines) + '\n'
+
+
+POOL_METRICS = (
+    ('size', 'db_pool_size', 'gauge', 'Configured pool size.'),
+    ('checked_in', 'db_pool_checked_in', 'gauge', 'Idle connections in the pool.'),
+    ('checked_out', 'db_pool_checked_out', 'gauge', 'Connections currently checked out.'),
+    ('overflow', 'db_pool_overflow', 'gauge', 'Connections open beyond the pool size.'),
+    ('checkouts', 'db_pool_checkouts_total', 'counter', 'Connections handed out.'),
+    ('timeouts', 'db_pool_timeouts_total', 'counter', 'Checkouts that timed out waiting for a connection.'),
+    ('wait_time_total', 'db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection.'),
+)
+
+
+def render_pools():
+    statuses = {name: pool_status(engine) for name, engine in database.engines().items()}
+    for key, name, kind, help_text in POOL_METRICS:
+        samples = [f'{name}{{engine="{engine}"}} {status[key]}' for engine, status in statuses.items() if key in status]
+        if samples:
+            yield f'# HELP {name} {help_text}'
+            yield f'# TYPE {name} {kind}'
+            yield from samples
+
+
+def render_cache():
+    backend = cache.get_cache()
+    stats = backend.stats()
+    for key in ('hits', 'misses'):
+        yield f'# HELP cache_{key}_total Read-through cache {key}.'
+        yield f'# TYPE cache_{key}_total counter'
+        yield f'cache_{key}_total{{backend="{type(backend).__name__}"}} {stats[key]}'
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        registry = self.registry
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            registry.exceptions += 1
+            raise
+        finally:
+            registry.in_flight -= 1
+            registry.route(scope.get('route')).observe(time.perf_counter() - started, size, status)
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    # Rendered on the event loop thread, the same one the middleware updates the counters from.
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
@@ -1,17 +1,37 @@
 import uuid
 
-from sqlalchemy import Column, ForeignKey, String, Numeric
+from sqlalchemy import (BigInteger, Boolean, Column, Computed, ForeignKey, Index, Integer, String, Numeric, Sequence,
+                        event)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.dialects.postgresql.base import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
+from . import triggers
 from .database import Base
 
+menus_version_seq = Sequence("menus_version_seq", metadata=Base.metadata)
+
+# Search matches anywhere through search_vector, and ranks matches in the title first through title_vector, which
+# has a GIN index of its own; see menu.search. The 'simple' configuration neither stems nor drops stop words, since
+# the catalogue mixes languages.
+SEARCH_VECTOR = ("setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                 "setweight(to_tsvector('simple', coalesce(description, '')), 'B')")
+TITLE_VECTOR = "to_tsvector('simple', coalesce(title, ''))"
+
+
+def tsvector(expression):
+    # Deferred, so loading a row for anything but search does not drag its tsvector along.
+    return deferred(Column(TSVECTOR, Computed(expression, persisted=True)))
+
 
 class Menu(Base):
     __tablename__ = "menus"
     id = Column(UUID, primary_key=True, default=uuid.uuid4)
     title = Column(String, unique=True, index=True)
     description = Column(String, default='')
+    submenus_count = Column(Integer, nullable=False, default=0, server_default='0')
+    dishes_count = Column(Integer, nullable=False, default=0, server_default='0')
+    version = Column(BigInteger, nullable=False, server_default=menus_version_seq.next_value())
     children = relationship(
         "SubMenu",
         back_populates="parent",
@@ -20,6 +40,14 @@ class Menu(Base):
     )
 
 
+class Catalogue(Base):
+    """A single row, whose version moves on with every write to menus; the ETag of the list of menus. See
+    triggers.CATALOGUE_VERSION."""
+    __tablename__ = "catalogue"
+    id = Column(Boolean, primary_key=True, default=True)
+    version = Column(BigInteger, nullable=False, server_default=menus_version_seq.next_value())
+
+
 class SubMenu(Base):
     __tablename__ = "submenus"
 
@@ -27,6 +55,9 @@ class SubMenu(Base):
     title = Column(String, unique=True, index=True)
     description = Column(String, default='')
     menu_id = Column(UUID, ForeignKey("menus.id", ondelete="CASCADE"))
+    dishes_count = Column(Integer, nullable=False, default=0, server_default='0')
+    search_vector = tsvector(SEARCH_VECTOR)
+    title_vector = tsvector(TITLE_VECTOR)
     parent = relationship("Menu", back_populates="children")
     children = relationship(
         "Dish",
@@ -42,6 +73,35 @@ class Dish(Base):
     id = Column(UUID, primary_key=True,default=uuid.uuid4)
     title = Column(String, unique=True, index=True)
     description = Column(String, default='')
-    price = Column(Numeric(10, 2), default=0.00)
+    price = Column(Numeric(10, 2), default=0.00, index=True)
     submenu_id = Column(UUID, ForeignKey("submenus.id", ondelete="CASCADE"))
+    search_vector = tsvector(SEARCH_VECTOR)
+    title_vector = tsvector(TITLE_VECTOR)
     parent = relationship("SubMenu", back_populates="children")
+
+
+Index("ix_submenus_search_vector", SubMenu.search_vector, postgresql_using="gin")
+Index("ix_dishes_search_vector", Dish.search_vector, postgresql_using="gin")
+Index("ix_submenus_title_vector", SubMenu.title_vector, postgresql_using="gin")
+Index("ix_dishes_title_vector", Dish.title_vector, postgresql_using="gin")
+
+# Parent key first, so lists, the tree's child loads and ON DELETE CASCADE all find a parent's children here, then
+# the keyset order of the lists. Dishes carry the rest of what a list returns, for index-only scans; submenus do
+# not, as an index on dishes_count would cost its counter updates their HOT path.
+Index("ix_submenus_menu_id_title", SubMenu.menu_id, SubMenu.title, SubMenu.id)
+Index("ix_dishes_submenu_id_title", Dish.submenu_id, Dish.title, Dish.id,
+      postgresql_include=["description", "price"])
+
+
+event.listen(Menu.__table__, "after_create", triggers.menu_versions)
+event.listen(Menu.__table__, "after_create", triggers.menu_notify)
+event.listen(Menu.__table__, "after_create", triggers.catalogue_version)
+event.listen(Catalogue.__table__, "after_create", triggers.catalogue_row)
+event.listen(SubMenu.__table__, "after_create", triggers.submenu_counters)
+event.listen(SubMenu.__table__, "after_create", triggers.submenu_versions)
+event.listen(SubMenu.__table__, "after_create", triggers.submenu_notify)
+event.listen(Dish.__table__, "after_create", triggers.dish_counters)
+event.listen(Dish.__table__, "after_create", triggers.dish_versions)
+event.listen(Dish.__table__, "after_create", triggers.dish_notify)
+event.listen(SubMenu.__table__, "after_create", triggers.trigram_index("submenus"))
+event.listen(Dish.__table__, "after_create", triggers.trigram_index("dishes"))
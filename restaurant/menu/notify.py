@@ -0,0 +1,101 @@
+import json
+import logging
+import select
+import threading
+
+import psycopg2
+from sqlalchemy import URL
+
+from . import cache, snapshot
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'menu_changes'
+APPLICATION_NAME = 'menu-invalidation'
+# How long the listener blocks between checks for stop(), and how long it waits before reconnecting.
+POLL_SECONDS = 1.0
+RETRY_SECONDS = 1.0
+
+
+def apply(payload):
+    """Drop what this worker holds of a row another connection changed (see triggers.MENU_NOTIFY): the row's keys and
+    those of its parents that show it. A row inserted or deleted changes its parents' counts too, and a menu or
+    submenu deleted takes everything below it."""
+    change = json.loads(payload)
+    counts, subtree = change['op'] != 'UPDATE', change['op'] == 'DELETE'
+    if change['type'] == 'menu':
+        cache.invalidate_menu(change['id'], subtree=subtree)
+    elif change['type'] == 'submenu':
+        cache.invalidate_submenu(change['menu_id'], change['id'], counts=counts, subtree=subtree)
+    else:
+        cache.invalidate_dish(change['menu_id'], change['submenu_id'], change['id'], counts=counts)
+
+
+def flush():
+    """Drop everything this worker holds: changes made while nobody listened were never sent to it. A shared cache is
+    left alone, as the workers that made those changes invalidated it themselves, and every worker's restart would
+    otherwise empty it for all."""
+    if not cache.get_cache().shared:
+        cache.get_cache().clear()
+    snapshot.invalidate()
+
+
+class InvalidationListener:
+    """A thread that LISTENs on menu_changes over its own connection and applies each change to this worker's cache
+    and snapshot. A lost connection, or any other failure such as a cache it cannot reach, is retried every
+    RETRY_SECONDS; every (re)connection flushes, since a change missed or not applied is not sent again."""
+
+    def __init__(self, url: URL):
+        self.connect_args = {**url.translate_connect_args(username='user', database='dbname'),
+                             'application_name': APPLICATION_NAME,
+                             # A half-open connection would otherwise wait forever for notifications.
+                             'keepalives': 1, 'keepalives_idle': 10, 'keepalives_interval': 5,
+                             'keepalives_count': 3}
+        self.listening = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run, name=APPLICATION_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                connection = psycopg2.connect(**self.connect_args)
+            except psycopg2.OperationalError as error:
+                logger.warning("Cannot listen for menu changes: %s", error)
+                self._stopping.wait(RETRY_SECONDS)
+                continue
+            failed = False
+            try:
+                self.listen(connection)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as error:
+                logger.warning("Lost the menu changes listener connection: %s", error)
+            except Exception:
+                logger.exception("Cannot apply menu changes; listening again to flush")
+                failed = True
+            finally:
+                self.listening.clear()
+                connection.close()
+            if failed:
+                self._stopping.wait(RETRY_SECONDS)
+
+    def listen(self, connection):
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        flush()
+        self.listening.set()
+        while not self._stopping.is_set():
+            if select.select([connection], [], [], POLL_SECONDS)[0]:
+                connection.poll()
+                while connection.notifies:
+                    apply(connection.notifies.pop(0).payload)
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, bindparam, tuple_
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def encode(values):
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_cursor(row):
+    return encode([row.title, str(row.id)])
+
+
+def decode_cursor(cursor: str):
+    try:
+        title, id_ = decode(cursor)
+        return str(title), UUID(id_)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_statements(query, model):
+    """`query` in keyset order, as the statement of a first page and that of a page after a cursor. The page size
+    and cursor are bound parameters, so each compiles once; a NULL `limit` is no limit at all."""
+    query = query.order_by(model.title, model.id).limit(bindparam('limit', type_=Integer))
+    after = tuple_(bindparam('after_title', type_=model.title.type), bindparam('after_id', type_=model.id.type))
+    return query, query.where(tuple_(model.title, model.id) > after)
+
+
+def keyset(statements, limit: int = None, after: str = None, **params):
+    """The statement of `statements` (see keyset_statements) for this page, with its parameters."""
+    first, following = statements
+    params['limit'] = limit + 1 if limit is not None else None
+    if after is None:
+        return first, params
+    params['after_title'], params['after_id'] = decode_cursor(after)
+    return following, params
+
+
+def page(rows, limit: int = None):
+    if limit is not None and len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def paginated(response, rows, limit: int = None):
+    rows, next_cursor = page(rows, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
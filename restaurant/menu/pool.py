@@ -0,0 +1,99 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_wait(self, seconds):
+        self.checkouts += 1
+        self.wait_time_total += seconds
+        if seconds > self.wait_time_max:
+            self.wait_time_max = seconds
+
+    def as_dict(self):
+        return {
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'checked_out': self.checkouts - self.checkins,
+            'timeouts': self.timeouts,
+            'wait_time_total': round(self.wait_time_total, 6),
+            'wait_time_max': round(self.wait_time_max, 6),
+            'wait_time_avg': round(self.wait_time_total / self.checkouts, 6) if self.checkouts else 0.0,
+        }
+
+
+class InstrumentedPool:
+    @property
+    def stats(self) -> PoolStats:
+        stats = self.__dict__.get('_stats')
+        if stats is None:
+            stats = self.__dict__['_stats'] = PoolStats()
+        return stats
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.__dict__['_stats'] = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return record
+
+    def _do_return_conn(self, record):
+        self.stats.checkins += 1
+        return super()._do_return_conn(record)
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(InstrumentedPool, NullPool):
+    pass
+
+
+def engine_options(settings, is_async=False):
+    if settings.null_pool:
+        return {'poolclass': InstrumentedNullPool, 'pool_pre_ping': settings.pool_pre_ping}
+    return {
+        'poolclass': InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        'pool_size': settings.pool_size,
+        'max_overflow': settings.max_overflow,
+        'pool_timeout': settings.pool_timeout,
+        'pool_recycle': settings.pool_recycle,
+        'pool_pre_ping': settings.pool_pre_ping,
+    }
+
+
+def pool_status(engine):
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedPool):
+        status.update(pool.stats.as_dict())
+    return status
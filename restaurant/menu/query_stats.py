@@ -0,0 +1,139 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.duration += seconds
+        if seconds >= self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self):
+        return (f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", '
+                f'db-slowest;dur={self.slowest * 1000:.2f}')
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.queries_max = 0
+        self.duration_total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def record(self, queries: RequestQueries):
+        self.requests += 1
+        self.queries += queries.count
+        self.queries_max = max(self.queries_max, queries.count)
+        self.duration_total += queries.duration
+        if queries.slowest > self.slowest:
+            self.slowest = queries.slowest
+            self.slowest_statement = queries.slowest_statement
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'queries_avg': round(self.queries / self.requests, 2) if self.requests else 0.0,
+            'queries_max': self.queries_max,
+            'db_time_avg': round(self.duration_total / self.requests, 6) if self.requests else 0.0,
+            'slowest': round(self.slowest, 6),
+            'slowest_statement': self.slowest_statement,
+        }
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar('request_queries', default=None)
+_routes = {}
+_captures = []
+_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the statement's own context, which goes with it when it fails, rather than on the pooled connection.
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    queries = _current.get()
+    if queries is not None:
+        queries.record(statement, seconds)
+
+
+def instrument(engine):
+    """Attribute every statement run on `engine` to the request that is being served, if any."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def record(route, queries: RequestQueries):
+    with _lock:
+        _routes.setdefault(route, RouteStats()).record(queries)
+        for captured in _captures:
+            captured.append(queries)
+
+
+def route_stats():
+    with _lock:
+        return {route: stats.as_dict() for route, stats in sorted(_routes.items())}
+
+
+def reset():
+    with _lock:
+        _routes.clear()
+
+
+class QueryStatsMiddleware:
+    """Count the statements of each request, report them in Server-Timing and aggregate them per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        queries = RequestQueries()
+        token = _current.set(queries)
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', []), (b'server-timing', queries.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get('route')
+            # Unmatched paths share one bucket so arbitrary URLs cannot grow the table.
+            record(f"{scope['method']} {route.path if route else '<unmatched>'}", queries)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail when any request served inside the block ran more than `limit` statements."""
+    captured = []
+    with _lock:
+        _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        with _lock:
+            _captures.remove(captured)
+    assert captured, 'no request was served'
+    most = max(queries.count for queries in captured)
+    assert most <= limit, f'{most} queries, expected at most {limit}'
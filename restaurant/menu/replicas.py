@@ -0,0 +1,115 @@
+import itertools
+import math
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from . import config
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+STICKY_COOKIE = 'read_primary_until'
+STICKY_HEADER = 'X-Read-Primary-Until'
+
+# Where a session reads from, under its info's READ_SOURCE; cache.read_through trusts each differently.
+READ_SOURCE = 'read_source'
+PRIMARY = 'primary'
+REPLICA = 'replica'
+STICKY = 'sticky'
+
+
+class Replicas:
+    """Replica engines taken in turn, skipping any that failed to connect in the last DB_REPLICA_RETRY seconds."""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self.down_until = [0.0] * len(self.engines)
+        self._turns = itertools.count()
+
+    def healthy(self):
+        """(index, engine) of every replica not marked down, starting from the one whose turn it is."""
+        start, now = next(self._turns), time.monotonic()
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self.down_until[index] <= now:
+                yield index, self.engines[index]
+
+    def mark_down(self, index):
+        self.down_until[index] = time.monotonic() + config.DB_REPLICA_RETRY
+
+
+def sticky_until(request):
+    value = request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def reads_replica(request):
+    """Whether `request` may be served by a replica: a read from a client that has not just written."""
+    return request.method in SAFE_METHODS and sticky_until(request) <= time.time()
+
+
+def read_source(db):
+    return db.info.get(READ_SOURCE, PRIMARY)
+
+
+def primary_session(request, session_factory):
+    """A session on the primary, its READ_SOURCE STICKY for a read inside the client's post-write window."""
+    db = session_factory()
+    if request.method in SAFE_METHODS and sticky_until(request) > time.time():
+        db.info[READ_SOURCE] = STICKY
+    return db
+
+
+def read_session(replicas: Replicas, session_factory):
+    """A session already connected to the first healthy replica that accepts a connection, None if none does."""
+    for index, engine in replicas.healthy():
+        db = session_factory(bind=engine)
+        try:
+            db.connection()
+            db.info[READ_SOURCE] = REPLICA
+            return db
+        except OperationalError:
+            db.close()
+            replicas.mark_down(index)
+    return None
+
+
+async def async_read_session(replicas: Replicas, session_factory):
+    for index, engine in replicas.healthy():
+        db = session_factory(bind=engine)
+        try:
+            await db.connection()
+            db.info[READ_SOURCE] = REPLICA
+            return db
+        # asyncpg lets a refused connection through as the OSError itself.
+        except (OperationalError, OSError):
+            await db.close()
+            replicas.mark_down(index)
+    return None
+
+
+class StickyPrimaryMiddleware:
+    """Send a client's reads to the primary for DB_STICKY_SECONDS after each of its successful (2xx) writes, so it reads
+    what it wrote whatever the replicas' lag. The deadline goes out as a cookie and, for clients that keep none, as a
+    header they may send back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_sticky(message):
+            if message['type'] == 'http.response.start' and 200 <= message['status'] < 300:
+                # Wall-clock time, since the next read may reach another worker or host.
+                until = f'{time.time() + config.DB_STICKY_SECONDS:.3f}'
+                cookie = (f'{STICKY_COOKIE}={until}; Max-Age={math.ceil(config.DB_STICKY_SECONDS)}; Path=/; '
+                          f'HttpOnly; SameSite=Lax')
+                message['headers'] = [*message.get('headers', []), (b'set-cookie', cookie.encode()),
+                                      (STICKY_HEADER.lower().encode(), until.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_sticky)
@@ -1,63 +1,153 @@
-from typing import List
+from typing import List, Literal, Optional
+from uuid import UUID
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
-from . import schemas, crud
-from .database import SessionLocal
+from . import schemas, crud, cache, database, pagination, bulk, export, conditional, fast_json, replicas, snapshot
 
 menu_router = APIRouter()
 
+menus_adapter = TypeAdapter(List[schemas.Menu])
+menu_adapter = TypeAdapter(schemas.Menu)
+submenus_adapter = TypeAdapter(List[schemas.SubMenu])
+submenu_adapter = TypeAdapter(schemas.SubMenu)
+dishes_adapter = TypeAdapter(List[schemas.Dish])
+dish_adapter = TypeAdapter(schemas.Dish)
+menu_tree_adapter = TypeAdapter(List[schemas.MenuTree])
+
 
 # Dependency
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    db = None
+    if database.read_replicas and replicas.reads_replica(request):
+        db = replicas.read_session(database.read_replicas, database.SessionLocal)
+    db = db or replicas.primary_session(request, database.SessionLocal)
     try:
         yield db
     finally:
         db.close()
 
 
-@menu_router.get("/", response_model=List[schemas.Menu])
-def get_menus(db: Session = Depends(get_db)):
-    return crud.get_menus(db=db)
+def catalogue_etag(route):
+    def dependency(request: Request, response: Response, db: Session = Depends(get_db)):
+        catalogue = snapshot.current(db)
+        if catalogue is not None:
+            version = catalogue.catalogue_version
+        else:
+            version = db.execute(conditional.catalogue_version_query()).scalar()
+        conditional.check(request, response, route, conditional.make_etag(route, version))
+    return dependency
+
+
+def menu_etag(route):
+    def dependency(menu_id, request: Request, response: Response, db: Session = Depends(get_db)):
+        version = None
+        if crud.is_valid_uuid(menu_id):
+            catalogue = snapshot.current(db)
+            if catalogue is not None:
+                version = catalogue.menu_version(menu_id)
+            else:
+                version = db.execute(conditional.menu_version_query(menu_id)).scalar()
+        conditional.check(request, response, route, None if version is None else conditional.make_etag(route, version))
+    return dependency
+
+
+def tree_etag(request: Request, response: Response, menu_id: Optional[UUID] = None, db: Session = Depends(get_db)):
+    if menu_id is None:
+        catalogue_etag('tree')(request, response, db)
+    else:
+        menu_etag('tree')(str(menu_id), request, response, db)
+
+
+@menu_router.get("/", response_model=List[schemas.Menu], dependencies=[Depends(catalogue_etag('menus'))])
+def get_menus(response: Response, limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+              after: Optional[str] = None, db: Session = Depends(get_db)):
+    if limit is not None or after is not None:
+        menus = pagination.paginated(response, crud.get_menus(db=db, limit=limit, after=after), limit)
+    else:
+        menus = cache.read_through(cache.MENUS_KEY, lambda: crud.get_menus(db=db), menus_adapter,
+                                   replicas.read_source(db))
+    return fast_json.respond(response, menus, menus_adapter)
+
+
+@menu_router.get("/tree/", response_model=List[schemas.MenuTree], dependencies=[Depends(tree_etag)])
+def get_menu_tree(menu_id: Optional[UUID] = None, db: Session = Depends(get_db)):
+    return cache.read_through(cache.tree_key(menu_id),
+                              lambda: crud.get_menu_tree(db=db, menu_id=menu_id), menu_tree_adapter,
+                              replicas.read_source(db))
+
+
+@menu_router.get("/export/")
+def export_menus(fmt: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'), db: Session = Depends(get_db)):
+    return StreamingResponse(export.stream_export(db.get_bind(), fmt), media_type=export.MEDIA_TYPES[fmt],
+                             headers={'Content-Disposition': f'attachment; filename="menus.{fmt}"'})
 
 
-@menu_router.get("/{menu_id}/", response_model=schemas.Menu)
+@menu_router.get("/{menu_id}/", response_model=schemas.Menu, dependencies=[Depends(menu_etag('menu'))])
 def get_menu_by_id(menu_id, db: Session = Depends(get_db)):
-    menu = crud.get_menu_by_id(db=db, menu_id=menu_id)
+    menu = cache.read_through(cache.menu_key(menu_id),
+                              lambda: crud.get_menu_by_id(db=db, menu_id=menu_id), menu_adapter,
+                              replicas.read_source(db))
     if menu is None:
         raise HTTPException(status_code=404, detail="menu not found")
     else:
         return menu
 
 
-@menu_router.get("/{menu_id}/submenus/", response_model=List[schemas.SubMenu])
-def get_submenus(menu_id, db: Session = Depends(get_db)):
-    submenus = crud.get_submenus(db=db, menu_id=menu_id)
-    return submenus
+@menu_router.get("/{menu_id}/submenus/", response_model=List[schemas.SubMenu],
+                 dependencies=[Depends(menu_etag('submenus'))])
+def get_submenus(menu_id, response: Response, limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+                  after: Optional[str] = None, db: Session = Depends(get_db)):
+    if limit is not None or after is not None:
+        submenus = pagination.paginated(response, crud.get_submenus(db=db, menu_id=menu_id, limit=limit,
+                                                                    after=after), limit)
+    else:
+        submenus = cache.read_through(cache.submenus_key(menu_id),
+                                      lambda: crud.get_submenus(db=db, menu_id=menu_id), submenus_adapter,
+                                      replicas.read_source(db))
+    return fast_json.respond(response, submenus, submenus_adapter)
 
 
-@menu_router.get("/{menu_id}/submenus/{submenu_id}/", response_model=schemas.SubMenu)
+@menu_router.get("/{menu_id}/submenus/{submenu_id}/", response_model=schemas.SubMenu,
+                 dependencies=[Depends(menu_etag('submenu'))])
 def get_submenu_by_id(menu_id, submenu_id, db: Session = Depends(get_db)):
-    submenus = crud.get_submenu_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id)
+    submenus = cache.read_through(cache.submenu_key(menu_id, submenu_id),
+                                  lambda: crud.get_submenu_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id),
+                                  submenu_adapter, replicas.read_source(db))
     if submenus is None:
         raise HTTPException(status_code=404, detail="submenu not found")
     else:
         return submenus
 
 
-@menu_router.get("/{menu_id}/submenus/{submenu_id}/dishes/", response_model=List[schemas.Dish])
-def get_dishes(menu_id, submenu_id, db: Session = Depends(get_db)):
-    dishes = crud.get_dishes(db=db, menu_id=menu_id, submenu_id=submenu_id)
-    return dishes
+@menu_router.get("/{menu_id}/submenus/{submenu_id}/dishes/", response_model=List[schemas.Dish],
+                 dependencies=[Depends(menu_etag('dishes'))])
+def get_dishes(menu_id, submenu_id, response: Response,
+               limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE), after: Optional[str] = None,
+               db: Session = Depends(get_db)):
+    if limit is not None or after is not None:
+        dishes = pagination.paginated(response, crud.get_dishes(db=db, menu_id=menu_id, submenu_id=submenu_id,
+                                                                limit=limit, after=after), limit)
+    else:
+        dishes = cache.read_through(cache.dishes_key(menu_id, submenu_id),
+                                    lambda: crud.get_dishes(db=db, menu_id=menu_id, submenu_id=submenu_id),
+                                    dishes_adapter, replicas.read_source(db))
+    return fast_json.respond(response, dishes, dishes_adapter)
 
 
-@menu_router.get("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", response_model=schemas.Dish)
+@menu_router.get("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", response_model=schemas.Dish,
+                 dependencies=[Depends(menu_etag('dish'))])
 def get_dish_by_id(menu_id, submenu_id, dish_id, db: Session = Depends(get_db)):
-    dish = crud.get_dish_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id)
+    dish = cache.read_through(cache.dish_key(menu_id, submenu_id, dish_id),
+                              lambda: crud.get_dish_by_id(db=db, menu_id=menu_id, submenu_id=submenu_id,
+                                                          dish_id=dish_id),
+                              dish_adapter, replicas.read_source(db))
     if dish is None:
         raise HTTPException(status_code=404, detail="dish not found")
     else:
@@ -66,31 +156,34 @@ def get_dish_by_id(menu_id, submenu_id, dish_id, db: Session = Depends(get_db)):
 
 @menu_router.post("/", response_model=schemas.MenuCreate, status_code=201)
 def create_menu(menu: schemas.MenuBase, db: Session = Depends(get_db)):
-    db_menu = crud.get_menu_by_title(db=db, title=menu.title)
-    if db_menu:
-        raise HTTPException(status_code=400, detail="Title of Menu already registered")
     return crud.create_menu(db=db, menu=menu)
 
 
+@menu_router.post("/import/", response_model=schemas.ImportResult, status_code=201)
+async def import_menus(request: Request, db: Session = Depends(get_db)):
+    menus = await bulk.read_import(request)
+    return await run_in_threadpool(crud.import_menus, db=db, menus=menus)
+
+
+@menu_router.put("/import/", response_model=schemas.ImportResult)
+async def upsert_menus(request: Request, db: Session = Depends(get_db)):
+    menus = bulk.require_ids(await bulk.read_import(request))
+    return await run_in_threadpool(crud.upsert_menus, db=db, menus=menus)
+
+
+@menu_router.post("/sync/", response_model=schemas.SyncResult)
+async def sync_menus(request: Request, db: Session = Depends(get_db)):
+    menus = bulk.require_ids(await bulk.read_import(request))
+    return await run_in_threadpool(crud.sync_menus, db=db, menus=menus)
+
+
 @menu_router.post("/{menu_id}/submenus/", response_model=schemas.SubMenuCreate, status_code=201)
 def create_submenu(menu_id, submenu: schemas.MenuBase, db: Session = Depends(get_db)):
-    db_menu = crud.check_menu_by_id(db=db, menu_id=menu_id)
-    if not db_menu:
-        raise HTTPException(status_code=400, detail="ID of Menu not registered")
-    db_submenu = crud.get_submenu_by_title(db=db, title=submenu.title)
-    if db_submenu:
-        raise HTTPException(status_code=400, detail="Title of Submenu already registered")
     return crud.create_submenu(db=db, menu_id=menu_id, submenu=submenu)
 
 
 @menu_router.post("/{menu_id}/submenus/{submenu_id}/dishes/", response_model=schemas.Dish, status_code=201)
 def create_dish(menu_id, submenu_id, dish: schemas.DishCreate, db: Session = Depends(get_db)):
-    db_menu = crud.check_menu_by_id(db=db, menu_id=menu_id)
-    if not db_menu:
-        raise HTTPException(status_code=400, detail="ID of Menu not registered")
-    db_submenu = crud.check_submenu_by_id(db=db, submenu_id=submenu_id)
-    if not db_submenu:
-        raise HTTPException(status_code=400, detail="ID of Submenu not registered")
     return crud.create_dish(db=db, menu_id=menu_id, submenu_id=submenu_id, dish=dish)
 
 
@@ -109,6 +202,21 @@ def update_dish(menu_id, submenu_id, dish_id, dish: schemas.DishUpdate, db: Sess
     return crud.update_dish(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id, dish=dish)
 
 
+@menu_router.put("/{menu_id}/", response_model=schemas.Menu)
+def upsert_menu(menu_id, menu: schemas.MenuBase, db: Session = Depends(get_db)):
+    return crud.upsert_menu(db=db, menu_id=menu_id, menu=menu)
+
+
+@menu_router.put("/{menu_id}/submenus/{submenu_id}/", response_model=schemas.SubMenu)
+def upsert_submenu(menu_id, submenu_id, submenu: schemas.MenuBase, db: Session = Depends(get_db)):
+    return crud.upsert_submenu(db=db, menu_id=menu_id, submenu_id=submenu_id, submenu=submenu)
+
+
+@menu_router.put("/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", response_model=schemas.Dish)
+def upsert_dish(menu_id, submenu_id, dish_id, dish: schemas.DishUpdate, db: Session = Depends(get_db)):
+    return crud.upsert_dish(db=db, menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id, dish=dish)
+
+
 @menu_router.delete("/{menu_id}/")
 def delete_menu_by_id(menu_id, db: Session = Depends(get_db)):
     return crud.delete_menu_by_id(db=db, menu_id=menu_id)
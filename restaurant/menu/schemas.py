@@ -1,5 +1,6 @@
 import decimal
 import uuid
+from typing import List, Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, condecimal, ConfigDict, Field
@@ -53,3 +54,43 @@ class DishCreate(MenuBase):
 
 class DishUpdate(MenuBase):
     price: decimal.Decimal
+
+
+class SubMenuTree(SubMenu):
+    dishes: List[Dish]
+
+
+class MenuTree(Menu):
+    submenus: List[SubMenuTree]
+
+
+class SubMenuImport(MenuBase):
+    dishes: List[DishCreate] = []
+
+
+class MenuImport(MenuBase):
+    submenus: List[SubMenuImport] = []
+
+
+class ImportResult(BaseModel):
+    menus: int
+    submenus: int
+    dishes: int
+
+
+class SyncResult(BaseModel):
+    inserted: ImportResult
+    updated: ImportResult
+    deleted: ImportResult
+    unchanged: ImportResult
+
+
+class SearchHit(BaseModel):
+    type: Literal['dish', 'submenu']
+    id: UUID
+    title: str
+    description: Optional[str]
+    price: Optional[condecimal(decimal_places=2)] = None
+    menu_id: UUID
+    submenu_id: Optional[UUID] = None
+    rank: float
@@ -0,0 +1,228 @@
+import re
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import (Double, Integer, Numeric, String, and_, bindparam, cast, func, literal, literal_column, not_,
+                        null, or_, select, text, tuple_, union_all)
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from . import models, pagination, schemas
+from .routers import get_db
+
+search_router = APIRouter()
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+CONFIG = literal_column("'simple'")
+WORD = re.compile(r'\w+')
+MODES = ('fts', 'trgm')
+
+trigram_checks = {}
+
+
+def ts_terms(q: str):
+    """The words of `q` as to_tsquery takes them: all of them, with the last matched as a prefix since it may be typed
+    halfway, and, when there are two or more before it, those alone. None when `q` has no words."""
+    words = WORD.findall(q)
+    if words:
+        whole = [f"'{word}'" for word in words[:-1]]
+        return ' & '.join(whole) if len(whole) > 1 else None, ' & '.join(whole + [f"'{words[-1]}':*"])
+
+
+WHOLE_WORDS = func.to_tsquery(CONFIG, bindparam('whole_words', type_=String))
+TERMS = func.to_tsquery(CONFIG, bindparam('terms', type_=String))
+Q = bindparam('q', type_=String)
+MIN_PRICE = bindparam('min_price', type_=Numeric(10, 2))
+MAX_PRICE = bindparam('max_price', type_=Numeric(10, 2))
+LIMIT = bindparam('limit', type_=Integer)
+AFTER_RANK = bindparam('after_rank', type_=Double)
+AFTER_ID = bindparam('after_id', type_=PG_UUID)
+
+
+def matches(vector, whole_words):
+    """`vector` matching every term. A prefix is the costly part of a GIN lookup, as it reads every word it starts.
+    Two or more whole words narrow the hits down enough for the index to look up only those, and for the rows it
+    finds to be checked against the prefix; strip() keeps that check out of the index, which would take it on too.
+    A single whole word can match much of the table, and checking those rows one by one costs more than the prefix."""
+    if not whole_words:
+        return vector.op('@@')(TERMS)
+    return and_(vector.op('@@')(WHOLE_WORDS), func.strip(vector).op('@@')(TERMS))
+
+
+# The rank of a full-text hit is its tier: a match in the title, then a match anywhere else, weighed as ts_rank weighs
+# the A and B labels of search_vector. Within a tier hits are paged by id, which each table's primary key walks in
+# order, so no tier reads more than a page of hits: through the primary key, or through the GIN index when the
+# planner expects few matches. Hits after the first tier are only looked for when it cannot fill the page.
+TIERS = {'title': 1.0, 'text': 0.4}
+
+
+def tier_condition(tier, model, whole_words):
+    in_title = matches(model.title_vector, whole_words)
+    if tier == 'title':
+        return in_title
+    return and_(matches(model.search_vector, whole_words), not_(in_title))
+
+
+def similarity(model):
+    """How close `q` comes to the title, or to some part of the description, weighed as the tiers are. Ranks come
+    back as double precision, whose text form round-trips exactly through a cursor where a real's would not."""
+    return cast(func.greatest(func.similarity(model.title, Q),
+                              TIERS['text'] * func.word_similarity(Q, model.description)), Double)
+
+
+def similar(model):
+    return or_(model.title.op('%')(Q), Q.op('<%')(model.description))
+
+
+def candidates(model, condition, rank, *columns, filters=(), order=()):
+    """The first page of hits of `model` in the order they are paged in: `order`, then id."""
+    return (select(model.id, model.title, model.description, *columns, rank.label('rank'))
+            .where(condition, *filters).order_by(*order, model.id.desc()).limit(LIMIT).subquery())
+
+
+def parts(find, kind=None, min_price=False, max_price=False):
+    """One select of hits per table searched, from the candidates `find` picks of it."""
+    selects = []
+    if kind in (None, 'dish'):
+        filters = []
+        if min_price:
+            filters.append(models.Dish.price >= MIN_PRICE)
+        if max_price:
+            filters.append(models.Dish.price <= MAX_PRICE)
+        found = find(models.Dish, models.Dish.price, models.Dish.submenu_id, filters=filters)
+        selects.append(select(literal_column("'dish'").label('type'), found.c.id, found.c.title, found.c.description,
+                              found.c.price, models.SubMenu.menu_id, found.c.submenu_id, found.c.rank)
+                       .join(models.SubMenu, models.SubMenu.id == found.c.submenu_id))
+    # Submenus have no price, so a price range leaves them out.
+    if kind in (None, 'submenu') and not min_price and not max_price:
+        found = find(models.SubMenu, models.SubMenu.menu_id)
+        selects.append(select(literal_column("'submenu'").label('type'), found.c.id, found.c.title,
+                              found.c.description, cast(null(), Numeric(10, 2)).label('price'), found.c.menu_id,
+                              cast(null(), PG_UUID).label('submenu_id'), found.c.rank))
+    return selects
+
+
+def best(selects):
+    hits = (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+    return select(hits).order_by(hits.c.rank.desc(), hits.c.id.desc()).limit(LIMIT)
+
+
+@lru_cache(maxsize=None)
+def trigram_statement(kind, min_price, max_price, after):
+    """The statement of a trigram search; the flags say which filters and cursor it binds."""
+    def find(model, *columns, filters=()):
+        rank = similarity(model)
+        if after:
+            filters = [*filters, tuple_(rank, model.id) < tuple_(AFTER_RANK, AFTER_ID)]
+        return candidates(model, similar(model), rank, *columns, filters=filters, order=[rank.desc()])
+    return best(parts(find, kind, min_price, max_price))
+
+
+@lru_cache(maxsize=None)
+def tiers_statement(kind, min_price, max_price, whole_words, positions):
+    """The statement of a full-text search. `positions` has one entry per tier: None to skip it, as the cursor is
+    past it, 'after' to page it after the cursor, 'all' to read it from the top."""
+    tiers = []
+    for (tier, rank), position in zip(TIERS.items(), positions):
+        if position is None:
+            continue
+
+        def find(model, *columns, filters=(), tier=tier, rank=rank, position=position):
+            if position == 'after':
+                filters = [*filters, model.id < AFTER_ID]
+            return candidates(model, tier_condition(tier, model, whole_words), literal(rank, Double), *columns,
+                              filters=filters)
+        tiers.append(best(parts(find, kind, min_price, max_price)))
+    if len(tiers) == 1:
+        return tiers[0]
+    first, rest = tiers[0].cte('first_tier'), tiers[1].subquery('rest')
+    filled = select(func.count()).select_from(first).scalar_subquery() >= LIMIT
+    hits = union_all(select(first), select(rest).where(not_(filled))).subquery('hits')
+    return select(hits).order_by(hits.c.rank.desc(), hits.c.id.desc()).limit(LIMIT)
+
+
+def search_query(q: str, mode='fts', kind=None, min_price=None, max_price=None, limit=DEFAULT_LIMIT, after=None):
+    """Dishes and submenus matching `q`, best first, as a statement and its parameters. Everything but the shape of
+    the search is bound, so each shape is built and compiled once. None when nothing can match, so no query need be
+    run."""
+    if kind == 'submenu' and (min_price is not None or max_price is not None):
+        return None
+    shape = kind, min_price is not None, max_price is not None
+    params = {'q': q, 'min_price': min_price, 'max_price': max_price, 'limit': limit + 1}
+    if after is not None:
+        params['after_rank'], params['after_id'] = after
+    if mode == 'trgm':
+        return trigram_statement(*shape, after is not None), params
+
+    terms = ts_terms(q)
+    positions = tuple(None if after is not None and rank > after[0] else
+                      'after' if after is not None and rank == after[0] else 'all' for rank in TIERS.values())
+    if terms is None or not any(positions):
+        return None
+    params['whole_words'], params['terms'] = terms
+    return tiers_statement(*shape, terms[0] is not None, positions), params
+
+
+def encode_cursor(mode, row):
+    return pagination.encode([mode, row.rank, str(row.id)])
+
+
+def decode_cursor(cursor: str):
+    try:
+        mode, rank, id_ = pagination.decode(cursor)
+        if mode not in MODES:
+            raise ValueError(mode)
+        return mode, (float(rank), UUID(id_))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def trigram_query():
+    """Whether pg_trgm is installed, checked once per database; see triggers.TRIGRAM_INDEX."""
+    return text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+
+
+def has_trigram(db: Session):
+    key = str(db.get_bind().url)
+    if key not in trigram_checks:
+        trigram_checks[key] = db.execute(trigram_query()).scalar()
+    return trigram_checks[key]
+
+
+def fetch(db: Session, query):
+    return db.execute(*query).all() if query is not None else []
+
+
+def page(response, mode, rows, limit):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = encode_cursor(mode, rows[-1])
+    return rows
+
+
+class SearchParams:
+    def __init__(self, q: str = Query(..., min_length=1, max_length=200),
+                 kind: Optional[Literal['dish', 'submenu']] = Query(None, alias='type'),
+                 min_price: Optional[Decimal] = Query(None, ge=0), max_price: Optional[Decimal] = Query(None, ge=0),
+                 limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), after: Optional[str] = None):
+        self.q, self.kind, self.min_price, self.max_price, self.limit = q, kind, min_price, max_price, limit
+        self.mode, self.position = decode_cursor(after) if after is not None else ('fts', None)
+        self.first_page = after is None
+
+    def query(self):
+        return search_query(self.q, self.mode, self.kind, self.min_price, self.max_price, self.limit, self.position)
+
+
+@search_router.get("/", response_model=List[schemas.SearchHit])
+def search(response: Response, params: SearchParams = Depends(), db: Session = Depends(get_db)):
+    rows = fetch(db, params.query())
+    # Only a first page that found nothing at all falls back to trigrams, which catch typos.
+    if not rows and params.first_page and has_trigram(db):
+        params.mode = 'trgm'
+        rows = fetch(db, params.query())
+    return page(response, params.mode, rows, params.limit)
+
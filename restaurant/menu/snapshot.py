@@ -0,0 +1,238 @@
+import sys
+import time
+from decimal import Decimal
+from threading import Lock
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import conditional, config, database, models, pagination, replicas
+
+
+class MenuRow(NamedTuple):
+    id: UUID
+    title: str
+    description: str
+    submenus_count: int
+    dishes_count: int
+
+
+class SubMenuRow(NamedTuple):
+    id: UUID
+    title: str
+    description: str
+    dishes_count: int
+
+
+class DishRow(NamedTuple):
+    id: UUID
+    title: str
+    description: str
+    price: Decimal
+
+
+# In the keyset order of the list routes, so every list is a slice of what these return, in the database's collation.
+MENUS = (select(models.Menu.id, models.Menu.title, models.Menu.description, models.Menu.submenus_count,
+                models.Menu.dishes_count, models.Menu.version)
+         .order_by(models.Menu.title, models.Menu.id))
+SUBMENUS = (select(models.SubMenu.menu_id, models.SubMenu.id, models.SubMenu.title, models.SubMenu.description,
+                   models.SubMenu.dishes_count)
+            .order_by(models.SubMenu.title, models.SubMenu.id))
+DISHES = (select(models.Dish.submenu_id, models.Dish.id, models.Dish.title, models.Dish.description,
+                 models.Dish.price)
+          .order_by(models.Dish.title, models.Dish.id))
+
+
+def key(id_) -> Optional[str]:
+    """`id_` as the snapshot's indexes hold it, None when it is no UUID at all."""
+    try:
+        return str(UUID(str(id_)))
+    except ValueError:
+        return None
+
+
+def _page(rows, found, parent, limit, after):
+    """The rows of a page as the SQL path fetches them, `limit` + 1 for pagination.page to find the next cursor.
+    None when the cursor's row is no longer in the list: the page then starts at a title and id only the
+    database's collation can place."""
+    start = 0
+    if after is not None:
+        title, id_ = pagination.decode_cursor(after)
+        item = found.get(str(id_))
+        if item is None or item[0] != parent or item[2].title != title:
+            return None
+        start = item[1] + 1
+    return list(rows[start:] if limit is None else rows[start:start + limit + 1])
+
+
+class Snapshot:
+    """The whole catalogue as loaded in one transaction, never changed once built. Rows are the tuples the list
+    routes return; each id maps to (parent id, position in its list, row)."""
+    __slots__ = ('generation', 'loaded_at', 'catalogue_version', 'menu_versions', 'menus', 'menu_by_id',
+                 'submenus', 'submenu_by_id', 'dishes', 'dish_by_id')
+
+    def __init__(self, generation, catalogue_version, menus, submenus, dishes):
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self.menus = tuple(MenuRow(*row[:5]) for row in menus)
+        self.menu_versions = {str(row.id): row.version for row in menus}
+        self.catalogue_version = catalogue_version
+        self.menu_by_id = {str(row.id): (None, position, row) for position, row in enumerate(self.menus)}
+
+        self.submenus, self.submenu_by_id = self._index(submenus, SubMenuRow)
+        self.dishes, self.dish_by_id = self._index(dishes, DishRow)
+
+    @staticmethod
+    def _index(rows, row_type):
+        lists, found = {}, {}
+        for parent_id, *values in rows:
+            siblings = lists.setdefault(str(parent_id), [])
+            row = row_type(*values)
+            found[str(row.id)] = (str(parent_id), len(siblings), row)
+            siblings.append(row)
+        return {parent: tuple(siblings) for parent, siblings in lists.items()}, found
+
+    def fresh(self):
+        return self.generation == _generation and (not config.SNAPSHOT_TTL or
+                                                   time.monotonic() - self.loaded_at < config.SNAPSHOT_TTL)
+
+    def menu_version(self, menu_id):
+        return self.menu_versions.get(key(menu_id))
+
+    def get_menus(self, limit=None, after=None):
+        return _page(self.menus, self.menu_by_id, None, limit, after)
+
+    def get_menu_by_id(self, menu_id):
+        item = self.menu_by_id.get(key(menu_id))
+        return item and item[2]
+
+    def get_submenus(self, menu_id, limit=None, after=None):
+        menu_id = key(menu_id)
+        return _page(self.submenus.get(menu_id, ()), self.submenu_by_id, menu_id, limit, after)
+
+    def get_submenu_by_id(self, menu_id, submenu_id):
+        item = self.submenu_by_id.get(key(submenu_id))
+        if item is None or item[0] != key(menu_id):
+            return None
+        return item[2]
+
+    def get_dishes(self, menu_id, submenu_id, limit=None, after=None):
+        if self.get_submenu_by_id(menu_id, submenu_id) is None:
+            return []
+        submenu_id = key(submenu_id)
+        return _page(self.dishes.get(submenu_id, ()), self.dish_by_id, submenu_id, limit, after)
+
+    def get_dish_by_id(self, menu_id, submenu_id, dish_id):
+        item = self.dish_by_id.get(key(dish_id))
+        if item is None or self.get_submenu_by_id(menu_id, submenu_id) is None or item[0] != key(submenu_id):
+            return None
+        return item[2]
+
+    def get_menu_tree(self, menu_id=None):
+        if menu_id is None:
+            menus = self.menus
+        else:
+            menu = self.get_menu_by_id(menu_id)
+            menus = () if menu is None else (menu,)
+        return [{**menu._asdict(), 'submenus': [{**submenu._asdict(), 'dishes': self.dishes.get(str(submenu.id), ())}
+                                                for submenu in self.submenus.get(str(menu.id), ())]}
+                for menu in menus]
+
+
+_lock = Lock()
+_generation = 0
+_current: Optional[Snapshot] = None
+
+
+def invalidate():
+    """Mark the snapshot stale; the next read loads another. Called after each write commits."""
+    global _generation
+    _generation += 1
+
+
+def generation() -> int:
+    """Counts invalidations: it moves on whenever anything this worker holds of the catalogue goes stale."""
+    return _generation
+
+
+def load(connection, generation):
+    version = connection.execute(conditional.catalogue_version_query()).scalar()
+    return Snapshot(generation, version, connection.execute(MENUS).all(), connection.execute(SUBMENUS).all(),
+                    connection.execute(DISHES).all())
+
+
+def _store(snapshot):
+    # A load that began before a later one may finish after it; keep the newer.
+    global _current
+    if _current is None or snapshot.generation >= _current.generation:
+        _current = snapshot
+    return snapshot
+
+
+def serves(db) -> bool:
+    # A read inside a client's post-write window goes to SQL: this worker's snapshot may predate another's write.
+    return config.SNAPSHOT and replicas.read_source(db) != replicas.STICKY
+
+
+def current(db: Session) -> Optional[Snapshot]:
+    """With SNAPSHOT, the snapshot reads are served from, loaded from the primary first when a write or SNAPSHOT_TTL
+    made it stale. Concurrent readers wait for one load rather than each running their own."""
+    if not serves(db):
+        return None
+    snapshot = _current
+    if snapshot is not None and snapshot.fresh():
+        return snapshot
+    with _lock:
+        if _current is not None and _current.fresh():
+            return _current
+        generation = _generation
+        # Never from a replica: a lagging one would hand its rows to every request, those pinned to the primary too.
+        bind = database.engine if replicas.read_source(db) == replicas.REPLICA else db.get_bind()
+        with bind.connect() as connection:
+            connection.execution_options(isolation_level='REPEATABLE READ')
+            return _store(load(connection, generation))
+
+
+async def current_async(db) -> Optional[Snapshot]:
+    # Without the lock: it belongs to no event loop, so a stale snapshot may be loaded by several readers at once.
+    if not serves(db):
+        return None
+    snapshot = _current
+    if snapshot is not None and snapshot.fresh():
+        return snapshot
+    generation = _generation
+    bind = database.async_engine if replicas.read_source(db) == replicas.REPLICA else db.bind
+    async with bind.connect() as connection:
+        await connection.execution_options(isolation_level='REPEATABLE READ')
+        return _store(await connection.run_sync(load, generation))
+
+
+def footprint(snapshot: Snapshot) -> int:
+    """Bytes `snapshot` holds: its indexes, rows and the values in them, each object counted once."""
+    seen, size, pending = set(), 0, [getattr(snapshot, name) for name in Snapshot.__slots__]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item)
+            pending.extend(item.values())
+        elif isinstance(item, tuple):
+            pending.extend(item)
+        elif isinstance(item, UUID):
+            pending.append(item.int)
+    return size + sys.getsizeof(snapshot)
+
+
+def status():
+    snapshot = _current
+    if snapshot is None:
+        return {'enabled': config.SNAPSHOT, 'loaded': False}
+    return {'enabled': config.SNAPSHOT, 'loaded': True, 'fresh': snapshot.fresh(),
+            'age_seconds': round(time.monotonic() - snapshot.loaded_at, 3), 'menus': len(snapshot.menus),
+            'submenus': len(snapshot.submenu_by_id), 'dishes': len(snapshot.dish_by_id),
+            'bytes': footprint(snapshot)}
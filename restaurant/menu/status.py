@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from . import database, query_stats, snapshot
+from .pool import pool_status
+
+status_router = APIRouter()
+
+
+@status_router.get("/pool")
+def get_pool_status():
+    return {name: pool_status(engine) for name, engine in database.engines().items()}
+
+
+@status_router.get("/queries")
+def get_query_stats():
+    return query_stats.route_stats()
+
+
+@status_router.get("/snapshot")
+def get_snapshot_status():
+    return snapshot.status()
@@ -0,0 +1,93 @@
+import decimal
+import hashlib
+import json
+
+from sqlalchemy import String, Text, cast, func, null, select
+
+from . import models
+from .bulk import PARENT_KEYS
+
+MODELS = (models.Menu, models.SubMenu, models.Dish)
+COUNT_KEYS = {models.Menu: 'menus', models.SubMenu: 'submenus', models.Dish: 'dishes'}
+CENTS = decimal.Decimal('0.01')
+
+
+def digest_column(model):
+    """md5 of the row content as JSON text, so the current state loads as one short string per item."""
+    content = [model.title, model.description]
+    if model is models.Dish:
+        content.append(cast(model.price, String))
+    return func.md5(cast(func.json_build_array(*content), Text)).label('digest')
+
+
+def row_digest(row):
+    """The digest_column of a snapshot row. Should the two ever render a value differently, the item is only
+    rewritten with what it already holds; a change is never missed."""
+    content = [row['title'], row['description']]
+    if 'price' in row:
+        content.append(str(decimal.Decimal(row['price']).quantize(CENTS, decimal.ROUND_HALF_UP)))
+    return hashlib.md5(json.dumps(content, ensure_ascii=False).encode()).hexdigest()
+
+
+def state_queries():
+    for model in MODELS:
+        parent = getattr(model, PARENT_KEYS[model]) if model in PARENT_KEYS else null()
+        yield model, select(model.id, parent.label('parent_id'), digest_column(model))
+
+
+class Plan:
+    """What it takes to turn `state`, {model: {id: (id, parent_id, digest)}}, into the flattened snapshot `rows`.
+
+    Every item missing from the snapshot is deleted. A missing menu or submenu that still holds kept items, which
+    the snapshot moves elsewhere, is only deleted once they have moved out (`deferred`); everything else is deleted
+    first (`deletes`), freeing its titles for the upserts.
+    """
+
+    def __init__(self, rows, state):
+        self.writes, self.deletes, self.deferred = {}, {}, {}
+        self.result = {key: dict.fromkeys(COUNT_KEYS.values(), 0)
+                       for key in ('inserted', 'updated', 'deleted', 'unchanged')}
+        self.touched = set()
+        kept = {model: {row['id'] for row in rows[model]} for model in MODELS}
+        menu_of = {submenu_id: current.parent_id for submenu_id, current in state[models.SubMenu].items()}
+        menu_of.update((row['id'], row['menu_id']) for row in rows[models.SubMenu])
+        holding = {model: set() for model in MODELS}
+        for child, parent in ((models.Dish, models.SubMenu), (models.SubMenu, models.Menu)):
+            for item_id, current in state[child].items():
+                if item_id in kept[child] or item_id in holding[child]:
+                    holding[parent].add(current.parent_id)
+
+        for model in MODELS:
+            key = COUNT_KEYS[model]
+            parent_key = PARENT_KEYS.get(model)
+            updated, inserted = [], []
+            for row in rows[model]:
+                current = state[model].get(row['id'])
+                if current is None:
+                    inserted.append(row)
+                elif current.digest != row_digest(row) or (parent_key and current.parent_id != row[parent_key]):
+                    updated.append(row)
+                    self.touch(model, current.id, current.parent_id, menu_of)
+                else:
+                    continue
+                self.touch(model, row['id'], row.get(parent_key), menu_of)
+            missing = [item_id for item_id in state[model] if item_id not in kept[model]]
+            for item_id in missing:
+                self.touch(model, item_id, state[model][item_id].parent_id, menu_of)
+            # Renames go first, so a new item may take a title an existing one gives up in the same statement.
+            self.writes[model] = updated + inserted
+            self.deletes[model] = [item_id for item_id in missing if item_id not in holding[model]]
+            self.deferred[model] = [item_id for item_id in missing if item_id in holding[model]]
+            self.result['inserted'][key] = len(inserted)
+            self.result['updated'][key] = len(updated)
+            self.result['deleted'][key] = len(missing)
+            self.result['unchanged'][key] = len(rows[model]) - len(inserted) - len(updated)
+
+    def touch(self, model, item_id, parent_id, menu_of):
+        if model is models.Menu:
+            self.touched.add(item_id)
+        elif model is models.SubMenu:
+            self.touched.add(parent_id)
+        else:
+            self.touched.add(menu_of.get(parent_id))
+        self.touched.discard(None)
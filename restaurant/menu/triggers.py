@@ -0,0 +1,323 @@
+from sqlalchemy import DDL
+
+# submenus_count / dishes_count are kept up to date by statement-level triggers, so CASCADE deletes
+# and bulk statements are counted once per statement rather than once per row. Dish triggers only
+# touch submenus.dishes_count; the submenus UPDATE trigger then carries the delta to menus.
+
+SUBMENU_COUNTERS = """
+CREATE OR REPLACE FUNCTION submenus_counters_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET submenus_count = menus.submenus_count + delta.n,
+                     dishes_count = menus.dishes_count + delta.d
+    FROM (SELECT menu_id, count(*) AS n, sum(dishes_count) AS d FROM new_rows GROUP BY menu_id) AS delta
+    WHERE menus.id = delta.menu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION submenus_counters_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET submenus_count = menus.submenus_count - delta.n,
+                     dishes_count = menus.dishes_count - delta.d
+    FROM (SELECT menu_id, count(*) AS n, sum(dishes_count) AS d FROM old_rows GROUP BY menu_id) AS delta
+    WHERE menus.id = delta.menu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION submenus_counters_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET submenus_count = menus.submenus_count + delta.n,
+                     dishes_count = menus.dishes_count + delta.d
+    FROM (
+        SELECT menu_id, sum(n) AS n, sum(d) AS d FROM (
+            SELECT menu_id, -1 AS n, -dishes_count AS d FROM old_rows
+            UNION ALL
+            SELECT menu_id, 1 AS n, dishes_count AS d FROM new_rows
+        ) AS changes
+        GROUP BY menu_id
+    ) AS delta
+    WHERE menus.id = delta.menu_id AND (delta.n <> 0 OR delta.d <> 0);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER submenus_counters_insert AFTER INSERT ON submenus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_counters_insert();
+
+CREATE TRIGGER submenus_counters_delete AFTER DELETE ON submenus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_counters_delete();
+
+CREATE TRIGGER submenus_counters_update AFTER UPDATE ON submenus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_counters_update();
+"""
+
+DISH_COUNTERS = """
+CREATE OR REPLACE FUNCTION dishes_counters_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE submenus SET dishes_count = submenus.dishes_count + delta.n
+    FROM (SELECT submenu_id, count(*) AS n FROM new_rows GROUP BY submenu_id) AS delta
+    WHERE submenus.id = delta.submenu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dishes_counters_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE submenus SET dishes_count = submenus.dishes_count - delta.n
+    FROM (SELECT submenu_id, count(*) AS n FROM old_rows GROUP BY submenu_id) AS delta
+    WHERE submenus.id = delta.submenu_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dishes_counters_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE submenus SET dishes_count = submenus.dishes_count + delta.n
+    FROM (
+        SELECT submenu_id, sum(n) AS n FROM (
+            SELECT submenu_id, -1 AS n FROM old_rows
+            UNION ALL
+            SELECT submenu_id, 1 AS n FROM new_rows
+        ) AS changes
+        GROUP BY submenu_id
+    ) AS delta
+    WHERE submenus.id = delta.submenu_id AND delta.n <> 0;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER dishes_counters_insert AFTER INSERT ON dishes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_counters_insert();
+
+CREATE TRIGGER dishes_counters_delete AFTER DELETE ON dishes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_counters_delete();
+
+CREATE TRIGGER dishes_counters_update AFTER UPDATE ON dishes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_counters_update();
+"""
+
+submenu_counters = DDL(SUBMENU_COUNTERS)
+dish_counters = DDL(DISH_COUNTERS)
+
+# menus.version changes on every write below a menu, so it can serve as the ETag. Any UPDATE of a menus row takes
+# a new value, which already covers inserts and deletes below it through the counter triggers; updates that leave
+# the counts alone bump the parent menus explicitly.
+
+MENU_VERSIONS = """
+CREATE OR REPLACE FUNCTION menus_version_bump() RETURNS trigger AS $$
+BEGIN
+    NEW.version := nextval('menus_version_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER menus_version_bump BEFORE UPDATE ON menus
+    FOR EACH ROW WHEN (OLD.version = NEW.version) EXECUTE FUNCTION menus_version_bump();
+"""
+
+SUBMENU_VERSIONS = """
+CREATE OR REPLACE FUNCTION submenus_version_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET version = nextval('menus_version_seq')
+    WHERE id IN (SELECT menu_id FROM old_rows UNION SELECT menu_id FROM new_rows);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER submenus_version_update AFTER UPDATE ON submenus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_version_update();
+"""
+
+DISH_VERSIONS = """
+CREATE OR REPLACE FUNCTION dishes_version_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE menus SET version = nextval('menus_version_seq')
+    WHERE id IN (SELECT submenus.menu_id FROM submenus
+                 WHERE submenus.id IN (SELECT submenu_id FROM old_rows UNION SELECT submenu_id FROM new_rows));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER dishes_version_update AFTER UPDATE ON dishes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_version_update();
+"""
+
+menu_versions = DDL(MENU_VERSIONS)
+submenu_versions = DDL(SUBMENU_VERSIONS)
+dish_versions = DDL(DISH_VERSIONS)
+
+# Sequence values are handed out as writes start, not as they commit, so max(menus.version) may stay put while an
+# earlier write commits. Every statement on menus, which every write below a menu is through the triggers above,
+# takes the catalogue row instead: its row lock queues the writers, and each draws its value once the one before has
+# committed, so the row's version moves on in commit order.
+
+CATALOGUE_VERSION = """
+CREATE OR REPLACE FUNCTION catalogue_version_bump() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalogue SET version = nextval('menus_version_seq');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalogue_version_bump AFTER INSERT OR UPDATE OR DELETE ON menus
+    FOR EACH STATEMENT EXECUTE FUNCTION catalogue_version_bump();
+"""
+
+catalogue_version = DDL(CATALOGUE_VERSION)
+catalogue_row = DDL("INSERT INTO catalogue (id) VALUES (true)")
+
+# Each row a statement inserts, deletes or changes the columns of is sent on menu_changes when the transaction commits,
+# and not at all if it rolls back; a row changed twice in one transaction with the same outcome is sent once. The
+# payload names the row and its parents, so a listener drops exactly their keys (see menu.notify): a JSON object of
+# type, op, id, menu_id and submenu_id. Updates the counter and version triggers make to a parent are left out, as
+# the child's own change already covers them; a row moved to another parent is sent as a DELETE from the old one and
+# an INSERT into the new. Rows deleted along with their parent are left to the parent's notification, which takes
+# everything below it.
+
+MENU_NOTIFY = """
+CREATE OR REPLACE FUNCTION menus_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('menu_changes', json_build_object('type', 'menu', 'op', TG_OP, 'id', new_rows.id)::text)
+        FROM old_rows JOIN new_rows USING (id)
+        WHERE (old_rows.title, old_rows.description) IS DISTINCT FROM (new_rows.title, new_rows.description);
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('menu_changes', json_build_object('type', 'menu', 'op', TG_OP, 'id', id)::text)
+        FROM new_rows;
+    ELSE
+        PERFORM pg_notify('menu_changes', json_build_object('type', 'menu', 'op', TG_OP, 'id', id)::text)
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER menus_notify_insert AFTER INSERT ON menus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_update AFTER UPDATE ON menus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+
+CREATE TRIGGER menus_notify_delete AFTER DELETE ON menus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION menus_notify();
+"""
+
+SUBMENU_NOTIFY = """
+CREATE OR REPLACE FUNCTION submenus_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'id', new_rows.id, 'menu_id', new_rows.menu_id,
+                    'op', CASE WHEN old_rows.menu_id = new_rows.menu_id THEN 'UPDATE' ELSE 'INSERT' END)::text)
+        FROM old_rows JOIN new_rows USING (id)
+        WHERE (old_rows.title, old_rows.description, old_rows.menu_id)
+              IS DISTINCT FROM (new_rows.title, new_rows.description, new_rows.menu_id);
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'op', 'DELETE', 'id', old_rows.id, 'menu_id', old_rows.menu_id)::text)
+        FROM old_rows JOIN new_rows USING (id)
+        WHERE old_rows.menu_id <> new_rows.menu_id;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'op', TG_OP, 'id', id, 'menu_id', menu_id)::text)
+        FROM new_rows;
+    ELSE
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'submenu', 'op', TG_OP, 'id', old_rows.id, 'menu_id', old_rows.menu_id)::text)
+        FROM old_rows JOIN menus ON menus.id = old_rows.menu_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER submenus_notify_insert AFTER INSERT ON submenus
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_notify();
+
+CREATE TRIGGER submenus_notify_update AFTER UPDATE ON submenus
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_notify();
+
+CREATE TRIGGER submenus_notify_delete AFTER DELETE ON submenus
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION submenus_notify();
+"""
+
+DISH_NOTIFY = """
+CREATE OR REPLACE FUNCTION dishes_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'id', new_rows.id, 'menu_id', submenus.menu_id, 'submenu_id', new_rows.submenu_id,
+                    'op', CASE WHEN old_rows.submenu_id = new_rows.submenu_id THEN 'UPDATE' ELSE 'INSERT' END)::text)
+        FROM old_rows JOIN new_rows USING (id) JOIN submenus ON submenus.id = new_rows.submenu_id
+        WHERE (old_rows.title, old_rows.description, old_rows.price, old_rows.submenu_id)
+              IS DISTINCT FROM (new_rows.title, new_rows.description, new_rows.price, new_rows.submenu_id);
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'op', 'DELETE', 'id', old_rows.id, 'menu_id', submenus.menu_id,
+                    'submenu_id', old_rows.submenu_id)::text)
+        FROM old_rows JOIN new_rows USING (id) JOIN submenus ON submenus.id = old_rows.submenu_id
+        WHERE old_rows.submenu_id <> new_rows.submenu_id;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'op', TG_OP, 'id', new_rows.id, 'menu_id', submenus.menu_id,
+                    'submenu_id', new_rows.submenu_id)::text)
+        FROM new_rows JOIN submenus ON submenus.id = new_rows.submenu_id;
+    ELSE
+        PERFORM pg_notify('menu_changes', json_build_object(
+                    'type', 'dish', 'op', TG_OP, 'id', old_rows.id, 'menu_id', submenus.menu_id,
+                    'submenu_id', old_rows.submenu_id)::text)
+        FROM old_rows JOIN submenus ON submenus.id = old_rows.submenu_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER dishes_notify_insert AFTER INSERT ON dishes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_notify();
+
+CREATE TRIGGER dishes_notify_update AFTER UPDATE ON dishes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_notify();
+
+CREATE TRIGGER dishes_notify_delete AFTER DELETE ON dishes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dishes_notify();
+"""
+
+menu_notify = DDL(MENU_NOTIFY)
+submenu_notify = DDL(SUBMENU_NOTIFY)
+dish_notify = DDL(DISH_NOTIFY)
+
+
+# Search falls back to trigram similarity for typos, in titles and descriptions. pg_trgm ships with contrib rather
+# than with every server, so the indexes are only built where the extension can be installed; menu.search checks for
+# it before using it.
+
+TRIGRAM_INDEX = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ix_{table}_title_trgm ON {table} USING gin (title gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_{table}_description_trgm ON {table} USING gin (description gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+
+def trigram_index(table):
+    return DDL(TRIGRAM_INDEX.format(table=table))
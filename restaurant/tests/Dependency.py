@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy_utils import database_exists, create_database
 
 from main import app
+from menu import query_stats
 from menu.database import url_object, Base
 from menu.routers import get_db, menu_router
 
@@ -18,12 +19,14 @@ test_url = URL.create(
 )
 
 engine = create_engine(test_url)
+query_stats.instrument(engine)
 
 if not database_exists(engine.url):
     create_database(engine.url)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 
 
@@ -0,0 +1,83 @@
+import json
+import time
+import uuid
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.counters import aggregated_menus
+from tests.Dependency import client, engine
+
+SUBMENUS = 40
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+class TestMenuAggregates:
+    menu_id = "e5d4c3b2-a190-4f8e-9d7c-6b5a49382716"
+    dishes_total = sum(range(SUBMENUS))
+
+    @classmethod
+    def setup_class(cls):
+        submenus = [{"id": str(uuid.uuid4()), "title": f"aggregate sub {s}", "description": "",
+                     "menu_id": cls.menu_id} for s in range(SUBMENUS)]
+        dishes = [{"id": str(uuid.uuid4()), "title": f"aggregate dish {s}-{d}", "description": "", "price": d,
+                   "submenu_id": submenu["id"]}
+                  for s, submenu in enumerate(submenus) for d in range(s)]
+        with Session(engine) as session:
+            session.execute(insert(models.Menu), [{"id": cls.menu_id, "title": "aggregate menu", "description": ""}])
+            session.execute(insert(models.SubMenu), submenus)
+            session.execute(insert(models.Dish), dishes)
+            session.commit()
+
+    @classmethod
+    def teardown_class(cls):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == cls.menu_id))
+            session.commit()
+
+    def test_listing_returns_one_row_per_menu_with_totals(self):
+        response = client.get("/")
+        assert response.status_code == 200
+        rows = [menu for menu in response.json() if menu['id'] == self.menu_id]
+        assert len(rows) == 1
+        assert rows[0]['submenus_count'] == SUBMENUS
+        assert rows[0]['dishes_count'] == self.dishes_total
+        response = client.get(f"/{self.menu_id}/")
+        assert response.json()['submenus_count'] == SUBMENUS
+        assert response.json()['dishes_count'] == self.dishes_total
+
+    def test_aggregated_counts_match_stored_counts(self):
+        with Session(engine) as session:
+            rows = session.execute(aggregated_menus()).all()
+            assert len(rows) == len({row.id for row in rows})
+            row = session.execute(aggregated_menus(self.menu_id)).one()
+            assert (row.submenus_count, row.dishes_count) == (SUBMENUS, self.dishes_total)
+
+    def test_aggregate_plan_has_no_correlated_subqueries(self):
+        query = aggregated_menus().compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        with Session(engine) as session:
+            session.execute(text("ANALYZE menus, submenus, dishes"))
+            plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = list(plan_nodes(plan[0]['Plan']))
+        assert not [node for node in nodes if node.get('Parent Relationship') == 'SubPlan']
+        assert len([node for node in nodes if node.get('Relation Name') == 'dishes']) == 1
+        assert len([node for node in nodes if node.get('Relation Name') == 'submenus']) == 1
+
+    def test_latency_budget(self):
+        with Session(engine) as session:
+            session.execute(aggregated_menus()).all()
+            started = time.perf_counter()
+            session.execute(aggregated_menus()).all()
+            assert time.perf_counter() - started < 0.25
+        started = time.perf_counter()
+        assert client.get("/").status_code == 200
+        assert time.perf_counter() - started < 0.25
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from main import create_app
+from menu import database
+from menu.config import Settings
+from tests.Dependency import test_url
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestCreateApp:
+    def test_import_connects_to_nothing(self):
+        # An unresolvable host: importing main and building an app would fail on the first connection attempt.
+        for db_async, loaded in (("false", "'sqlalchemy.ext.asyncio' in sys.modules"), ("true", "False")):
+            env = dict(os.environ, DATABASE_URL="postgresql://nobody:x@nowhere.invalid:5432/none",
+                       DB_HOST="nowhere.invalid", DB_ASYNC=db_async)
+            code = f"import sys, main; from menu import database; sys.exit('engine' in vars(database) or {loaded})"
+            result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+            assert result.returncode == 0, (db_async, result.stderr)
+
+    def test_lifespan_creates_and_disposes_the_engines(self):
+        settings = Settings(db_async=True, metrics=False, query_stats=False,
+                            database_url=test_url.render_as_string(hide_password=False))
+        app = create_app(settings)
+        assert {route.path for route in app.routes} >= {"/api/v1/menus/", "/api/v1/search/", "/api/v1/status/pool"}
+        with TestClient(app) as client:
+            assert set(database.engines()) == {"sync", "async"}
+            assert database.async_engine.url.database == "tests"
+            assert client.get("/api/v1/menus/", params={"limit": 1}).status_code == 200
+            assert set(client.get("/api/v1/status/pool").json()) == {"sync", "async"}
+        assert "async_engine" not in vars(database)
+        assert set(database.engines()) == {"sync"}
+
+    def test_lifespan_replaces_engines_made_before_it(self):
+        with database.engine.connect():
+            pass
+        earlier = database.engine
+        assert earlier.pool.checkedin() > 0
+        settings = Settings(metrics=False, query_stats=False, pool_size=2, max_overflow=0,
+                            database_url=test_url.render_as_string(hide_password=False))
+        with TestClient(create_app(settings)):
+            assert database.engine is not earlier
+            assert (database.engine.pool.size(), database.engine.pool._max_overflow) == (2, 0)
+            # Disposed: the connection it held is closed, and its pool is a new, empty one.
+            assert earlier.pool.checkedin() == 0
@@ -0,0 +1,268 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from menu import config, models, query_stats, snapshot
+from menu.async_routers import async_menu_router, get_async_db
+from menu.query_stats import QueryStatsMiddleware, assert_max_queries
+from menu.async_search import async_search_router
+from tests.Dependency import engine, test_url
+
+async_engine = create_async_engine(test_url.set(drivername="postgresql+asyncpg"), poolclass=NullPool)
+query_stats.instrument(async_engine.sync_engine)
+
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+app = FastAPI()
+app.add_middleware(QueryStatsMiddleware)
+app.include_router(async_menu_router)
+app.include_router(async_search_router, prefix="/api/v1/search")
+app.dependency_overrides[get_async_db] = override_get_async_db
+
+client = TestClient(app)
+
+
+class TestAsyncMenus:
+    menu = {
+        "id": "0b6b3d6e-1f9c-4c8e-9a57-5d5f0f6b1a01",
+        "title": "async menu",
+        "description": "async menu",
+    }
+    submenu = {
+        "id": "7c1e9b0a-2d4f-4e6a-8b3c-9d0e1f2a3b02",
+        "title": "async submenu",
+        "description": "async submenu",
+    }
+    dish = {
+        "id": "5e4d3c2b-1a09-4f8e-b7d6-c5b4a3928103",
+        "title": "async dish",
+        "description": "async dish",
+        "price": "12.345",
+    }
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == self.menu['id']))
+            session.commit()
+
+    def test_create_and_read_tree(self):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        response = client.post("/", json=self.menu)
+        assert response.status_code == 201
+        assert response.json()['submenus_count'] == 0
+        response = client.post(f"{menu_url}submenus/", json=self.submenu)
+        assert response.status_code == 201
+        assert response.json()['dishes_count'] == 0
+        response = client.post(f"{submenu_url}dishes/", json=self.dish)
+        assert response.status_code == 201
+        assert response.json()['price'] == "12.35"
+
+        response = client.get(menu_url)
+        assert response.status_code == 200
+        assert response.json()['submenus_count'] == 1
+        assert response.json()['dishes_count'] == 1
+        response = client.get(f"{menu_url}submenus/")
+        assert [submenu['id'] for submenu in response.json()] == [self.submenu['id']]
+        response = client.get(f"{submenu_url}dishes/")
+        assert [dish['id'] for dish in response.json()] == [self.dish['id']]
+        response = client.get(f"{submenu_url}dishes/{self.dish['id']}/")
+        assert response.json()['title'] == self.dish['title']
+
+    def test_paginated_list(self):
+        assert client.post("/", json=self.menu).status_code == 201
+        for s in range(3):
+            submenu = {"title": f"async page submenu {s}", "description": ""}
+            assert client.post(f"/{self.menu['id']}/submenus/", json=submenu).status_code == 201
+        response = client.get(f"/{self.menu['id']}/submenus/", params={"limit": 2})
+        assert [submenu['title'] for submenu in response.json()] == ["async page submenu 0", "async page submenu 1"]
+        after = response.headers['X-Next-Cursor']
+        response = client.get(f"/{self.menu['id']}/submenus/", params={"limit": 2, "after": after})
+        assert [submenu['title'] for submenu in response.json()] == ["async page submenu 2"]
+        assert 'X-Next-Cursor' not in response.headers
+
+    def test_import(self):
+        menus = [{**self.menu, "submenus": [{**self.submenu, "dishes": [self.dish]}]}]
+        response = client.post("/import/", json=menus)
+        assert response.status_code == 201
+        assert response.json() == {"menus": 1, "submenus": 1, "dishes": 1}
+        assert client.get(f"/{self.menu['id']}/").json()['dishes_count'] == 1
+        response = client.get(f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/{self.dish['id']}/")
+        assert response.json()['price'] == "12.35"
+        response = client.post("/import/", json=menus)
+        assert response.status_code == 409
+        assert [item['message'] for item in response.json()['detail']] == [
+            "Title of Menu already registered", "ID of Menu already registered",
+            "Title of Submenu already registered", "ID of Submenu already registered",
+            "Title of Dish already registered", "ID of Dish already registered"]
+
+    def test_export(self):
+        menus = [{**self.menu, "submenus": [{**self.submenu, "dishes": [self.dish]}]}]
+        assert client.post("/import/", json=menus).status_code == 201
+        response = client.get("/export/")
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [(row['menu_id'], row['submenu_id'], row['dish_id'], row['dish_price']) for row in rows] == [
+            (self.menu['id'], self.submenu['id'], self.dish['id'], "12.35")]
+        response = client.get("/export/", params={"format": "csv"})
+        assert response.text.splitlines()[0].startswith("menu_id,menu_title")
+
+    def test_etag(self):
+        assert client.post("/", json=self.menu).status_code == 201
+        for url in ("/", "/tree/", f"/{self.menu['id']}/", f"/{self.menu['id']}/submenus/"):
+            etag = client.get(url).headers['etag']
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        etag = client.get(f"/{self.menu['id']}/").headers['etag']
+        assert client.post(f"/{self.menu['id']}/submenus/", json=self.submenu).status_code == 201
+        assert client.get(f"/{self.menu['id']}/", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_update_and_delete(self):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        assert client.post("/", json=self.menu).status_code == 201
+        assert client.post(f"{menu_url}submenus/", json=self.submenu).status_code == 201
+        assert client.post(f"{submenu_url}dishes/", json=self.dish).status_code == 201
+
+        response = client.patch(f"{submenu_url}dishes/{self.dish['id']}/", json={**self.dish, "price": "1.10"})
+        assert response.status_code == 200
+        assert response.json()['price'] == "1.10"
+        response = client.patch(submenu_url, json={**self.submenu, "description": "changed"})
+        assert response.status_code == 200
+        assert response.json()['description'] == "changed"
+
+        response = client.delete(f"{submenu_url}dishes/{self.dish['id']}/")
+        assert response.json() == {"status": True, "message": "The dish has been deleted"}
+        response = client.delete(f"{submenu_url}dishes/{self.dish['id']}/")
+        assert response.status_code == 404
+        assert response.json() == {'detail': "Dish not found"}
+        response = client.delete(menu_url)
+        assert response.json() == {"status": True, "message": "The menu has been deleted"}
+        with Session(engine) as session:
+            assert session.get(models.SubMenu, self.submenu['id']) is None
+
+    def test_errors(self):
+        assert client.get(f"/{self.menu['id']}/").status_code == 404
+        response = client.delete("/1111/")
+        assert response.status_code == 422
+        assert response.json() == {'detail': 'Wrong id type'}
+        response = client.post(f"/{self.menu['id']}/submenus/", json=self.submenu)
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'ID of Menu not registered'}
+        assert client.post("/", json=self.menu).status_code == 201
+        response = client.post("/", json=self.menu)
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Title of Menu already registered'}
+
+    def test_writes_are_single_statements(self):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        dish_url = f"{submenu_url}dishes/{self.dish['id']}/"
+        with assert_max_queries(1):
+            assert client.post("/", json=self.menu).status_code == 201
+        with assert_max_queries(1):
+            assert client.post(f"{menu_url}submenus/", json=self.submenu).status_code == 201
+        with assert_max_queries(1):
+            assert client.post(f"{submenu_url}dishes/", json=self.dish).status_code == 201
+        with assert_max_queries(2):
+            response = client.post(f"{submenu_url}dishes/", json={**self.dish, "id": self.submenu['id']})
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Title of Dish already registered'}
+        with assert_max_queries(1):
+            assert client.patch(dish_url, json=self.dish).status_code == 200
+        with assert_max_queries(1):
+            assert client.patch(submenu_url, json=self.submenu).status_code == 200
+        with assert_max_queries(1):
+            assert client.patch(menu_url, json=self.menu).status_code == 200
+        with assert_max_queries(1):
+            assert client.delete(dish_url).status_code == 200
+        with assert_max_queries(1):
+            assert client.delete(menu_url).status_code == 200
+
+    def test_upsert(self):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        dish_url = f"{submenu_url}dishes/{self.dish['id']}/"
+        for price in ("1.00", "2.00"):
+            with assert_max_queries(1):
+                assert client.put(menu_url, json=self.menu).status_code == 200
+            with assert_max_queries(1):
+                assert client.put(submenu_url, json=self.submenu).status_code == 200
+            with assert_max_queries(1):
+                response = client.put(dish_url, json={**self.dish, "price": price})
+            assert response.json()['price'] == price
+        assert client.get(menu_url).json()['dishes_count'] == 1
+        batch = [{**self.menu, "submenus": [{**self.submenu, "dishes": [{**self.dish, "price": "3.00"}]}]}]
+        with assert_max_queries(3):
+            response = client.put("/import/", json=batch)
+        assert response.json() == {"menus": 1, "submenus": 1, "dishes": 1}
+        assert client.get(dish_url).json()['price'] == "3.00"
+        response = client.put(f"/{self.submenu['id']}/", json=self.menu)
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Title of Menu already registered'}
+
+    def test_sync(self):
+        others = client.get("/tree/").json()
+        menu = {**self.menu, "submenus": [{**self.submenu, "dishes": [self.dish]}]}
+        response = client.post("/sync/", json=others + [menu])
+        assert response.json()['inserted'] == {"menus": 1, "submenus": 1, "dishes": 1}
+        menu['submenus'][0]['dishes'] = [{**self.dish, "price": "4.00"}]
+        with assert_max_queries(4):
+            response = client.post("/sync/", json=others + [menu])
+        assert response.json()['updated'] == {"menus": 0, "submenus": 0, "dishes": 1}
+        menu['submenus'] = []
+        response = client.post("/sync/", json=others + [menu])
+        assert response.json()['deleted'] == {"menus": 0, "submenus": 1, "dishes": 1}
+        assert client.get(f"/{self.menu['id']}/").json()['submenus_count'] == 0
+
+    def test_search(self):
+        client.post("/", json=self.menu)
+        client.post(f"/{self.menu['id']}/submenus/", json=self.submenu)
+        client.post(f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/", json=self.dish)
+        with assert_max_queries(1):
+            response = client.get("/api/v1/search/", params={"q": "async di", "max_price": "20"})
+        assert [(hit['type'], hit['id'], hit['price']) for hit in response.json()] == [
+            ("dish", self.dish['id'], "12.35")]
+        response = client.get("/api/v1/search/", params={"q": "async", "limit": 1})
+        cursor = response.headers["x-next-cursor"]
+        response = client.get("/api/v1/search/", params={"q": "async", "limit": 1, "after": cursor})
+        assert response.status_code == 200 and "x-next-cursor" not in response.headers
+
+    def test_fast_json(self, monkeypatch):
+        client.post("/", json=self.menu)
+        client.post(f"/{self.menu['id']}/submenus/", json=self.submenu)
+        client.post(f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/", json=self.dish)
+        url = f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/"
+        slow = client.get(url)
+        monkeypatch.setattr(config, 'FAST_JSON', True)
+        fast = client.get(url)
+        assert fast.json() == slow.json() and fast.json()[0]['price'] == "12.35"
+        assert fast.headers['etag'] == slow.headers['etag']
+
+    def test_snapshot(self, monkeypatch):
+        client.post("/", json=self.menu)
+        client.post(f"/{self.menu['id']}/submenus/", json=self.submenu)
+        client.post(f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/", json=self.dish)
+        submenu_url = f"/{self.menu['id']}/submenus/{self.submenu['id']}/"
+        urls = ["/", "/tree/", f"/{self.menu['id']}/", submenu_url, f"{submenu_url}dishes/",
+                f"{submenu_url}dishes/{self.dish['id']}/"]
+        sql = [client.get(url) for url in urls]
+        monkeypatch.setattr(config, 'SNAPSHOT', True)
+        snapshot.invalidate()
+        client.get("/")
+        with assert_max_queries(0):
+            memory = [client.get(url) for url in urls]
+        for before, after in zip(sql, memory):
+            assert (after.json(), after.headers['etag']) == (before.json(), before.headers['etag'])
+        client.patch(f"{submenu_url}dishes/{self.dish['id']}/", json={**self.dish, "price": "1"})
+        assert client.get(f"{submenu_url}dishes/").json()[0]['price'] == "1.00"
@@ -0,0 +1,199 @@
+import asyncio
+import fnmatch
+import threading
+import time
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from menu import cache, models
+from menu.cache import LRUCache, NullCache, RedisCache
+from tests.Dependency import client, engine
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.threads = set()
+
+    def get(self, name):
+        self.threads.add(threading.get_ident())
+        item = self.data.get(name)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at and expires_at < time.monotonic():
+            del self.data[name]
+            return None
+        return value
+
+    def set(self, name, value, ex=None):
+        self.threads.add(threading.get_ident())
+        self.data[name] = (value.encode(), time.monotonic() + ex if ex else None)
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+    def scan_iter(self, match='*'):
+        return [name for name in list(self.data) if fnmatch.fnmatchcase(name, match)]
+
+
+class TestCacheBackends:
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(max_size=2, ttl=0)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        assert lru.get('a') == 1
+        lru.set('c', 3)
+        assert lru.get('b') is None
+        assert lru.get('a') == 1
+        assert lru.get('c') == 3
+        assert len(lru) == 2
+
+    def test_lru_ttl(self):
+        lru = LRUCache(max_size=10, ttl=0.01)
+        lru.set('a', 1)
+        time.sleep(0.02)
+        assert lru.get('a') is None
+
+    def test_lru_delete_prefix(self):
+        lru = LRUCache(max_size=10, ttl=0)
+        lru.set('menu:1', 1)
+        lru.set('menu:1:submenus', [])
+        lru.set('menu:2', 2)
+        lru.delete_prefix('menu:1')
+        assert lru.get('menu:1') is None
+        assert lru.get('menu:1:submenus') is None
+        assert lru.get('menu:2') == 2
+
+    def test_get_or_set_counts_hits_and_misses(self):
+        lru = LRUCache(max_size=10, ttl=0)
+        calls = []
+        loader = lambda: calls.append(1) or []
+        assert lru.get_or_set('key', loader) == []
+        assert lru.get_or_set('key', loader) == []
+        assert len(calls) == 1
+        assert lru.stats() == {'hits': 1, 'misses': 1}
+        assert lru.get_or_set('missing', lambda: None) is None
+        assert lru.get('missing') is None
+
+    def test_redis_cache(self):
+        redis_cache = RedisCache(FakeRedis(), ttl=60)
+        redis_cache.set('menu:1', {'id': '1', 'title': 'menu'})
+        redis_cache.set('menu:1:submenus', [])
+        redis_cache.set('menu:2', {'id': '2'})
+        assert redis_cache.get('menu:1') == {'id': '1', 'title': 'menu'}
+        redis_cache.delete_prefix('menu:1')
+        assert redis_cache.get('menu:1') is None
+        assert redis_cache.get('menu:1:submenus') is None
+        assert redis_cache.get('menu:2') == {'id': '2'}
+        redis_cache.clear()
+        assert redis_cache.get('menu:2') is None
+
+    def test_redis_stays_off_the_event_loop(self):
+        redis = FakeRedis()
+        redis_cache = RedisCache(redis, ttl=60)
+
+        async def load():
+            return {'id': '1'}
+
+        async def read_twice():
+            values = [await redis_cache.get_or_set_async('menu:1', load) for _ in range(2)]
+            return values, threading.get_ident()
+
+        values, loop_thread = asyncio.run(read_twice())
+        assert values == [{'id': '1'}] * 2 and (redis_cache.hits, redis_cache.misses) == (1, 1)
+        assert redis.threads and loop_thread not in redis.threads
+
+
+class TestCachedRoutes:
+    menu = {
+        "id": "6f0e4f46-2b1c-4a43-a1c4-3b1d2a0b8a11",
+        "title": "cached menu",
+        "description": "cached menu",
+    }
+    submenu = {
+        "id": "9c3b5a52-6c9d-4f9e-8a3e-6a1b7b6b7f22",
+        "title": "cached submenu",
+        "description": "cached submenu",
+    }
+    dish = {
+        "id": "1d2e3f40-5a6b-4c7d-8e9f-0a1b2c3d4e33",
+        "title": "cached dish",
+        "description": "cached dish",
+        "price": "10.50",
+    }
+
+    def setup_method(self):
+        cache.set_cache(LRUCache(max_size=100, ttl=0))
+
+    def teardown_method(self):
+        cache.set_cache(NullCache())
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == self.menu['id']))
+            session.commit()
+
+    def listed_menu(self):
+        response = client.get("/")
+        assert response.status_code == 200
+        return next((menu for menu in response.json() if menu['id'] == self.menu['id']), None)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        response = client.post("/", json=self.menu)
+        assert response.status_code == 201
+        for _ in range(3):
+            response = client.get(f"/{self.menu['id']}/")
+            assert response.status_code == 200
+            assert response.json()['title'] == self.menu['title']
+        assert cache.get_cache().stats() == {'hits': 2, 'misses': 1}
+
+    def test_not_found_is_not_cached(self):
+        response = client.get(f"/{self.menu['id']}/")
+        assert response.status_code == 404
+        response = client.post("/", json=self.menu)
+        assert response.status_code == 201
+        response = client.get(f"/{self.menu['id']}/")
+        assert response.status_code == 200
+
+    def test_dish_writes_invalidate_counts(self):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        assert client.post("/", json=self.menu).status_code == 201
+        assert client.post(f"{menu_url}submenus/", json=self.submenu).status_code == 201
+        assert self.listed_menu()['submenus_count'] == 1
+        assert client.get(menu_url).json()['dishes_count'] == 0
+        assert client.get(submenu_url).json()['dishes_count'] == 0
+        assert client.get(f"{submenu_url}dishes/").json() == []
+
+        response = client.post(f"{submenu_url}dishes/", json=self.dish)
+        assert response.status_code == 201
+        assert self.listed_menu()['dishes_count'] == 1
+        assert client.get(menu_url).json()['dishes_count'] == 1
+        assert client.get(f"{menu_url}submenus/").json()[0]['dishes_count'] == 1
+        assert client.get(submenu_url).json()['dishes_count'] == 1
+        assert len(client.get(f"{submenu_url}dishes/").json()) == 1
+
+        response = client.patch(f"{submenu_url}dishes/{self.dish['id']}/",
+                                json={**self.dish, "description": "changed"})
+        assert response.status_code == 200
+        assert client.get(f"{submenu_url}dishes/{self.dish['id']}/").json()['description'] == "changed"
+        assert client.get(f"{submenu_url}dishes/").json()[0]['description'] == "changed"
+
+        response = client.delete(f"{submenu_url}dishes/{self.dish['id']}/")
+        assert response.status_code == 200
+        assert client.get(menu_url).json()['dishes_count'] == 0
+        assert client.get(submenu_url).json()['dishes_count'] == 0
+        assert client.get(f"{submenu_url}dishes/").json() == []
+        assert client.get(f"{submenu_url}dishes/{self.dish['id']}/").status_code == 404
+
+    def test_menu_delete_evicts_subtree(self):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        assert client.post("/", json=self.menu).status_code == 201
+        assert client.post(f"{menu_url}submenus/", json=self.submenu).status_code == 201
+        assert client.get(submenu_url).status_code == 200
+        assert client.delete(menu_url).status_code == 200
+        assert client.get(submenu_url).status_code == 404
+        assert client.get(f"{menu_url}submenus/").json() == []
+        assert self.listed_menu() is None
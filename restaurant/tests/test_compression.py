@@ -0,0 +1,115 @@
+import gzip
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from main import create_app
+from menu import compression, models, snapshot
+from menu.compression import CompressedBodies, negotiate
+from menu.config import Settings
+from tests.Dependency import client as plain_client, engine, test_url
+
+CATALOGUE = [{"title": "compressed menu", "description": "", "submenus": [
+    {"title": "compressed submenu", "description": "", "dishes": [
+        {"title": f"compressed dish {d}", "description": "a dish described at some length", "price": f"{d}.5"}
+        for d in range(50)]}]}]
+
+
+@pytest.fixture(scope="module")
+def client():
+    settings = Settings(compression=True, metrics=False, query_stats=False,
+                        database_url=test_url.render_as_string(hide_password=False))
+    with TestClient(create_app(settings), base_url="http://testserver/api/v1/menus") as client:
+        yield client
+
+
+@pytest.fixture
+def compressions(monkeypatch):
+    calls = []
+
+    def counted(body, coding):
+        calls.append(coding)
+        return compress(body, coding)
+
+    compress = compression.compress
+    monkeypatch.setattr(compression, 'compress', counted)
+    return calls
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize("accept_encoding, coding", [
+        ("gzip, deflate, br", "br"), ("gzip", "gzip"), ("br;q=0, gzip;q=0.5", "gzip"), ("*", "br"),
+        ("identity", None), ("", None), ("gzip;q=0, *;q=0", None), ("GZIP;Q=1", "gzip"), ("gzip;q=x", None)])
+    def test_prefers_brotli(self, accept_encoding, coding):
+        assert negotiate(accept_encoding) == coding
+
+    def test_gzip_without_brotli(self, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', None)
+        assert negotiate("br, gzip") == "gzip" and negotiate("br") is None
+
+
+class TestCompressedBodies:
+    def test_invalidation_and_age_drop_bodies(self, compressions):
+        bodies = CompressedBodies(2 ** 20, ttl=0.2)
+        key = ("/api/v1/menus/", b"", '"menus-1"', "gzip")
+        assert gzip.decompress(bodies.get_or_compress(key, b"stale", "gzip")) == b"stale"
+        assert gzip.decompress(bodies.get_or_compress(key, b"fresh", "gzip")) == b"stale"
+        snapshot.invalidate()
+        assert gzip.decompress(bodies.get_or_compress(key, b"fresh", "gzip")) == b"fresh"
+        time.sleep(0.3)
+        assert gzip.decompress(bodies.get_or_compress(key, b"aged", "gzip")) == b"aged"
+        assert bodies.size == len(bodies.get_or_compress(key, b"aged", "gzip")) and compressions == ["gzip"] * 3
+
+
+class TestCompression:
+    def setup_method(self):
+        assert plain_client.post("/import/", json=CATALOGUE).status_code == 201
+        menu = next(menu for menu in plain_client.get("/tree/").json() if menu['title'] == "compressed menu")
+        self.menu_url = f"/{menu['id']}/"
+        self.dishes_url = f"/{menu['id']}/submenus/{menu['submenus'][0]['id']}/dishes/"
+        self.dish_url = f"{self.dishes_url}{menu['submenus'][0]['dishes'][0]['id']}/"
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("compressed ")))
+            session.commit()
+
+    def test_same_body_fewer_bytes(self, client):
+        identity = client.get(self.dishes_url, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers and identity.headers["vary"] == "Accept-Encoding"
+        for coding in ("gzip", "br"):
+            response = client.get(self.dishes_url, headers={"Accept-Encoding": coding})
+            assert response.headers["content-encoding"] == coding and response.headers["vary"] == "Accept-Encoding"
+            assert int(response.headers["content-length"]) < len(identity.content) / 4
+            assert response.content == identity.content
+            assert response.headers["etag"] == f"W/{identity.headers['etag']}"
+
+    def test_compressed_once_per_version(self, client, compressions):
+        for _ in range(3):
+            client.get(self.dishes_url, headers={"Accept-Encoding": "gzip"})
+        client.get(self.dishes_url, headers={"Accept-Encoding": "br"})
+        client.get(self.dishes_url, params={"limit": 20}, headers={"Accept-Encoding": "gzip"})
+        assert compressions == ["gzip", "br", "gzip"]
+        client.patch(self.dish_url, json={"title": "compressed dish 0", "description": "", "price": "9"})
+        response = client.get(self.dishes_url, headers={"Accept-Encoding": "gzip"})
+        assert compressions == ["gzip", "br", "gzip", "gzip"] and response.json()[0]['price'] == "9.00"
+
+    def test_weak_etag_revalidates(self, client):
+        etag = client.get(self.dishes_url, headers={"Accept-Encoding": "gzip"}).headers["etag"]
+        response = client.get(self.dishes_url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status_code == 304 and not response.content
+
+    def test_left_alone(self, client, compressions):
+        small = client.get(self.menu_url, headers={"Accept-Encoding": "gzip"})
+        export = client.get("/export/", headers={"Accept-Encoding": "gzip"})
+        missing = client.get(f"{self.menu_url}submenus/{self.menu_url[1:]}", headers={"Accept-Encoding": "gzip"})
+        for response in (small, export, missing):
+            assert "content-encoding" not in response.headers
+        assert export.text and missing.status_code == 404 and compressions == []
+
+    def test_off_by_default(self):
+        response = plain_client.get(self.dishes_url, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers and "vary" not in response.headers
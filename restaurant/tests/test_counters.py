@@ -0,0 +1,94 @@
+import uuid
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.counters import check_counters, repair_counters
+from tests.Dependency import client, engine
+
+
+class TestCounters:
+    menu = {
+        "id": "d4c3b2a1-0f9e-4d8c-b7a6-958473625141",
+        "title": "counted menu",
+        "description": "counted menu",
+    }
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == self.menu['id']))
+            session.commit()
+
+    def create_submenu(self, title, dishes):
+        response = client.post(f"/{self.menu['id']}/submenus/", json={"title": title, "description": title})
+        assert response.status_code == 201
+        submenu_id = response.json()['id']
+        with Session(engine) as session:
+            session.execute(insert(models.Dish), [
+                {"id": str(uuid.uuid4()), "title": f"{title} dish {d}", "description": "", "price": d,
+                 "submenu_id": submenu_id}
+                for d in range(dishes)
+            ])
+            session.commit()
+        return submenu_id
+
+    def counts(self):
+        with Session(engine) as session:
+            menu = session.get(models.Menu, self.menu['id'])
+            return menu.submenus_count, menu.dishes_count
+
+    def test_counts_follow_writes(self):
+        assert client.post("/", json=self.menu).status_code == 201
+        assert self.counts() == (0, 0)
+        first = self.create_submenu("counted sub 1", 5)
+        second = self.create_submenu("counted sub 2", 3)
+        assert self.counts() == (2, 8)
+        response = client.get(f"/{self.menu['id']}/submenus/{first}/")
+        assert response.json()['dishes_count'] == 5
+
+        dish = {"title": "counted api dish", "description": "", "price": "1.00"}
+        response = client.post(f"/{self.menu['id']}/submenus/{second}/dishes/", json=dish)
+        assert response.status_code == 201
+        dish_id = response.json()['id']
+        assert self.counts() == (2, 9)
+
+        response = client.delete(f"/{self.menu['id']}/submenus/{second}/dishes/{dish_id}/")
+        assert response.status_code == 200
+        assert self.counts() == (2, 8)
+
+        response = client.delete(f"/{self.menu['id']}/submenus/{first}/")
+        assert response.status_code == 200
+        assert self.counts() == (1, 3)
+        response = client.get("/")
+        menu = next(menu for menu in response.json() if menu['id'] == self.menu['id'])
+        assert menu['submenus_count'] == 1
+        assert menu['dishes_count'] == 3
+        with Session(engine) as session:
+            assert check_counters(session) == {'submenus': [], 'menus': []}
+
+    def test_moving_dishes_between_submenus(self):
+        assert client.post("/", json=self.menu).status_code == 201
+        first = self.create_submenu("counted sub 1", 4)
+        second = self.create_submenu("counted sub 2", 0)
+        with Session(engine) as session:
+            session.execute(update(models.Dish).where(models.Dish.submenu_id == first).values(submenu_id=second))
+            session.commit()
+            assert session.get(models.SubMenu, first).dishes_count == 0
+            assert session.get(models.SubMenu, second).dishes_count == 4
+        assert self.counts() == (2, 4)
+
+    def test_check_and_repair(self):
+        assert client.post("/", json=self.menu).status_code == 201
+        submenu_id = self.create_submenu("counted sub 1", 2)
+        with Session(engine) as session:
+            session.execute(update(models.SubMenu).where(models.SubMenu.id == submenu_id).values(dishes_count=7))
+            session.execute(update(models.Menu).where(models.Menu.id == self.menu['id']).values(submenus_count=3))
+            session.commit()
+            drift = check_counters(session)
+            assert [str(row['id']) for row in drift['submenus']] == [submenu_id]
+            assert drift['submenus'][0]['actual_dishes_count'] == 2
+            assert [str(row['id']) for row in drift['menus']] == [self.menu['id']]
+            assert repair_counters(session) == {'submenus': 1, 'menus': 1}
+            assert check_counters(session) == {'submenus': [], 'menus': []}
+        assert self.counts() == (1, 2)
@@ -303,8 +303,8 @@ class TestDishes:
                 "price": "12.57",
             }
         )
-        assert response.status_code == 500
-        assert response.json() == {"detail": "A duplicate record already exists"}
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Title of Dish already registered"}
         with Session(engine) as session:
             db_dish = session.get(models.Dish, self.dish['id'])
             assert db_dish.title == self.dish['title']
@@ -0,0 +1,114 @@
+import threading
+
+from sqlalchemy import delete, event, update
+from sqlalchemy.orm import Session
+
+from menu import config, models
+from tests.Dependency import client, engine
+
+
+class TestETag:
+    menus = [
+        {"id": "c4d5e6f7-0819-4a2b-9c3d-4e5f60718293", "title": "etag menu A", "description": "A"},
+        {"id": "d5e6f708-192a-4b3c-8d4e-5f60718293a4", "title": "etag menu B", "description": "B"},
+    ]
+    submenu = {"id": "e6f70819-2a3b-4c4d-9e5f-60718293a4b5", "title": "etag submenu", "description": ""}
+    dish = {"id": "f708192a-3b4c-4d5e-8f60-718293a4b5c6", "title": "etag dish", "description": "", "price": "1.00"}
+
+    def setup_method(self):
+        for menu in self.menus:
+            assert client.post("/", json=menu).status_code == 201
+        self.menu_url = f"/{self.menus[0]['id']}/"
+        self.submenu_url = f"{self.menu_url}submenus/{self.submenu['id']}/"
+        assert client.post(f"{self.menu_url}submenus/", json=self.submenu).status_code == 201
+        assert client.post(f"{self.submenu_url}dishes/", json=self.dish).status_code == 201
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id.in_([menu['id'] for menu in self.menus])))
+            session.commit()
+
+    def etags(self):
+        urls = ["/", "/tree/", self.menu_url, f"/{self.menus[1]['id']}/", f"{self.menu_url}submenus/",
+                self.submenu_url, f"{self.submenu_url}dishes/", f"{self.submenu_url}dishes/{self.dish['id']}/"]
+        return {url: client.get(url).headers['etag'] for url in urls}
+
+    def test_every_get_route_revalidates(self):
+        for url, etag in self.etags().items():
+            response = client.get(url, headers={"If-None-Match": etag})
+            assert response.status_code == 304, url
+            assert response.content == b''
+            assert response.headers['etag'] == etag
+            assert response.headers['cache-control'] == "no-cache"
+            assert client.get(url, headers={"If-None-Match": '"stale", W/' + etag}).status_code == 304
+            assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    def test_not_modified_skips_the_read(self):
+        etag = client.get(f"{self.submenu_url}dishes/").headers['etag']
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            assert client.get(f"{self.submenu_url}dishes/", headers={"If-None-Match": etag}).status_code == 304
+            assert client.get("/", headers={"If-None-Match": client.get("/").headers['etag']}).status_code == 304
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        # One version lookup for the dish list, then a full GET and a version lookup for the menus list.
+        assert len(statements) == 4
+        assert "dishes" not in statements[0]
+
+    def test_writes_change_the_etag_of_their_menu_only(self):
+        before = self.etags()
+        response = client.patch(f"{self.submenu_url}dishes/{self.dish['id']}/", json={**self.dish, "price": "2.00"})
+        assert response.status_code == 200
+        after = self.etags()
+        assert after[f"/{self.menus[1]['id']}/"] == before[f"/{self.menus[1]['id']}/"]
+        assert all(after[url] != before[url] for url in before if url != f"/{self.menus[1]['id']}/")
+
+        for write in (lambda: client.patch(self.submenu_url, json={**self.submenu, "description": "changed"}),
+                      lambda: client.delete(f"{self.submenu_url}dishes/{self.dish['id']}/"),
+                      lambda: client.patch(self.menu_url, json={**self.menus[0], "description": "changed"})):
+            before = client.get(self.menu_url).headers['etag']
+            assert write().status_code == 200
+            assert client.get(self.menu_url).headers['etag'] != before
+
+    def test_deleting_a_menu_changes_the_list_etag(self):
+        etag = client.get("/").headers['etag']
+        assert client.delete(f"/{self.menus[1]['id']}/").status_code == 200
+        assert client.get("/", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_list_etag_follows_commit_order(self):
+        def write(menu, description):
+            session = Session(engine)
+            session.execute(update(models.Menu).filter(models.Menu.id == menu['id']).values(description=description))
+            return session
+
+        def commit(session):
+            with session:
+                session.commit()
+
+        # The first writer takes the lower version but commits last.
+        first = write(self.menus[0], "committed last")
+        second = threading.Thread(target=lambda: commit(write(self.menus[1], "committed first")))
+        second.start()
+        second.join(0.5)
+        etag = client.get("/").headers['etag']
+        commit(first)
+        second.join()
+        response = client.get("/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert {menu['description'] for menu in response.json() if menu['id'] == self.menus[0]['id']} == {
+            "committed last"}
+
+    def test_missing_menu_has_no_etag(self):
+        response = client.get("/a0b1c2d3-e4f5-4a6b-8c7d-8e9fa0b1c2d3/", headers={"If-None-Match": "*"})
+        assert response.status_code == 404
+        assert 'etag' not in response.headers
+
+    def test_cache_control_per_route(self, monkeypatch):
+        monkeypatch.setitem(config.CACHE_CONTROL_ROUTES, 'dishes', "private, max-age=5")
+        assert client.get(f"{self.submenu_url}dishes/").headers['cache-control'] == "private, max-age=5"
+        assert client.get(self.submenu_url).headers['cache-control'] == "no-cache"
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+from menu import export, models
+from tests.Dependency import client, engine
+
+DISHES = 500000
+
+
+def rss():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class TestExport:
+    menus = [
+        {"title": "export menu", "description": "with, \"quotes\"", "submenus": [
+            {"title": "export submenu", "description": "", "dishes": [
+                {"title": "export dish 2", "description": "two", "price": "2.50"},
+                {"title": "export dish 1", "description": "one", "price": "1"},
+            ]},
+            {"title": "export empty submenu", "description": "", "dishes": []},
+        ]},
+        {"title": "export empty menu", "description": "", "submenus": []},
+    ]
+
+    def setup_method(self):
+        assert client.post("/import/", json=self.menus).status_code == 201
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("export ")))
+            session.commit()
+
+    def test_ndjson(self):
+        response = client.get("/export/")
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [(row['menu_title'], row['submenu_title'], row['dish_title'], row['dish_price']) for row in rows] == [
+            ("export empty menu", None, None, None),
+            ("export menu", "export empty submenu", None, None),
+            ("export menu", "export submenu", "export dish 1", "1.00"),
+            ("export menu", "export submenu", "export dish 2", "2.50"),
+        ]
+
+    def test_csv(self):
+        response = client.get("/export/", params={"format": "csv"})
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/csv')
+        assert response.headers['content-disposition'] == 'attachment; filename="menus.csv"'
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 4
+        assert rows[2]['menu_description'] == 'with, "quotes"'
+        assert (rows[2]['dish_title'], rows[2]['dish_description'], rows[2]['dish_price']) == ("export dish 1", "one",
+                                                                                              "1.00")
+
+    def test_unknown_format(self):
+        assert client.get("/export/", params={"format": "xml"}).status_code == 422
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc/self/statm')
+class TestExportMemory:
+    menu_id = "e1f2a3b4-c5d6-4e7f-8a9b-0c1d2e3f4a5b"
+    submenu_id = "f2a3b4c5-d6e7-4f8a-9b0c-1d2e3f4a5b6c"
+
+    @classmethod
+    def setup_class(cls):
+        with Session(engine) as session:
+            session.execute(text("INSERT INTO menus (id, title, description) VALUES (:id, 'export big menu', '')"),
+                            {"id": cls.menu_id})
+            session.execute(text("INSERT INTO submenus (id, title, description, menu_id) "
+                                 "VALUES (:id, 'export big submenu', '', :menu_id)"),
+                            {"id": cls.submenu_id, "menu_id": cls.menu_id})
+            session.execute(text("INSERT INTO dishes (id, title, description, price, submenu_id) "
+                                 "SELECT gen_random_uuid(), 'export big dish ' || g, repeat('x', 100), g / 100.0, :id "
+                                 "FROM generate_series(1, :n) AS g"), {"id": cls.submenu_id, "n": DISHES})
+            session.commit()
+
+    @classmethod
+    def teardown_class(cls):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == cls.menu_id))
+            session.commit()
+
+    @pytest.mark.parametrize('fmt', ['ndjson', 'csv'])
+    def test_peak_rss_stays_bounded(self, fmt):
+        baseline = peak = rss()
+        size = rows = 0
+        for chunk in export.stream_export(engine, fmt):
+            size += len(chunk)
+            rows += chunk.count('\n')
+            peak = max(peak, rss())
+        assert rows >= DISHES
+        assert size > 100 * 2 ** 20
+        assert peak - baseline < 32 * 2 ** 20
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from main import app
+from menu import cache, config, fast_json, models
+from menu.cache import LRUCache, NullCache
+from tests.Dependency import client, engine
+
+CATALOGUE = [{"title": "fast menu", "description": "to go", "submenus": [
+    {"title": "fast submenu", "description": "", "dishes": [
+        {"title": f"fast dish {d}", "description": f"no. {d}", "price": f"{d}.5"} for d in range(5)]},
+    {"title": "fast empty submenu", "description": "", "dishes": []},
+]}]
+
+
+class TestFastJson:
+    def setup_method(self):
+        assert client.post("/import/", json=CATALOGUE).status_code == 201
+        menu = next(menu for menu in client.get("/tree/").json() if menu['title'] == "fast menu")
+        submenu = next(submenu for submenu in menu['submenus'] if submenu['title'] == "fast submenu")
+        self.urls = ["/", f"/{menu['id']}/submenus/", f"/{menu['id']}/submenus/{submenu['id']}/dishes/"]
+
+    def teardown_method(self):
+        cache.set_cache(NullCache())
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("fast ")))
+            session.commit()
+
+    def responses(self, monkeypatch, fast, params=None):
+        monkeypatch.setattr(config, 'FAST_JSON', fast)
+        return [client.get(url, params=params) for url in self.urls]
+
+    def assert_same(self, monkeypatch, params=None):
+        for slow, fast in zip(self.responses(monkeypatch, False, params), self.responses(monkeypatch, True, params)):
+            assert (fast.status_code, fast.headers['content-type']) == (200, "application/json")
+            assert fast.json() == slow.json()
+            for header in ("etag", "cache-control", "x-next-cursor"):
+                assert fast.headers.get(header) == slow.headers.get(header)
+
+    def test_same_json_and_headers(self, monkeypatch):
+        self.assert_same(monkeypatch)
+        self.assert_same(monkeypatch, {"limit": 1})
+        dishes = self.responses(monkeypatch, True)[2].json()
+        assert [dish['price'] for dish in dishes] == ["0.50", "1.50", "2.50", "3.50", "4.50"]
+
+    def test_from_the_cache(self, monkeypatch):
+        cache.set_cache(LRUCache())
+        self.responses(monkeypatch, True)
+        self.assert_same(monkeypatch)
+
+    def test_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(fast_json, 'orjson', None)
+        self.assert_same(monkeypatch)
+
+    @pytest.mark.parametrize("path, schema", [
+        ("/", "Menu"), ("/{menu_id}/submenus/", "SubMenu"), ("/{menu_id}/submenus/{submenu_id}/dishes/", "Dish")])
+    def test_openapi_keeps_the_response_model(self, path, schema):
+        content = app.openapi()['paths'][path]['get']['responses']['200']['content']
+        assert content['application/json']['schema']['items'] == {'$ref': f'#/components/schemas/{schema}'}
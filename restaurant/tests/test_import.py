@@ -0,0 +1,69 @@
+import json
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from menu import models
+from tests.Dependency import client, engine
+
+
+def catalogue(prefix, menus=2, submenus=2, dishes=3):
+    return [{"title": f"{prefix} {m}", "description": f"menu {m}",
+             "submenus": [{"title": f"{prefix} {m}-{s}", "description": "",
+                           "dishes": [{"title": f"{prefix} {m}-{s}-{d}", "description": "", "price": f"{d}.555"}
+                                      for d in range(dishes)]}
+                          for s in range(submenus)]}
+            for m in range(menus)]
+
+
+class TestImport:
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("import ")))
+            session.commit()
+
+    def test_import_nested_json(self):
+        response = client.post("/import/", json=catalogue("import json"))
+        assert response.status_code == 201
+        assert response.json() == {"menus": 2, "submenus": 4, "dishes": 12}
+        menus = [menu for menu in client.get("/").json() if menu['title'].startswith("import json")]
+        assert [(menu['submenus_count'], menu['dishes_count']) for menu in menus] == [(2, 6), (2, 6)]
+        tree = client.get("/tree/", params={"menu_id": menus[0]['id']}).json()
+        submenu = tree[0]['submenus'][0]
+        assert submenu['dishes_count'] == 3
+        assert [(dish['title'], dish['description'], dish['price']) for dish in submenu['dishes']] == [
+            ("import json 0-0-0", "", "0.56"), ("import json 0-0-1", "", "1.56"), ("import json 0-0-2", "", "2.56")]
+
+    def test_import_ndjson_keeps_given_ids(self):
+        menus = catalogue("import ndjson", menus=3, dishes=1)
+        menus[0]['id'] = "f0e1d2c3-b4a5-4968-8776-655443322110"
+        body = "\n".join(json.dumps(menu) for menu in menus) + "\n"
+        response = client.post("/import/", content=body, headers={"content-type": "application/x-ndjson"})
+        assert response.status_code == 201
+        assert response.json() == {"menus": 3, "submenus": 6, "dishes": 6}
+        assert client.get(f"/{menus[0]['id']}/").json()['dishes_count'] == 2
+
+    def test_conflicts_are_reported_and_nothing_is_written(self):
+        assert client.post("/import/", json=catalogue("import taken", menus=1)).status_code == 201
+        menus = catalogue("import new", menus=1)
+        menus[0]['submenus'][0]['title'] = "import taken 0-1"
+        menus[0]['submenus'][1]['dishes'].append({"title": "import new 0-0-0", "description": "", "price": "1"})
+        response = client.post("/import/", json=menus)
+        assert response.status_code == 409
+        assert [(item['type'], item['title'], item['message']) for item in response.json()['detail']] == [
+            ("dish", "import new 0-0-0", "Duplicate title in import"),
+            ("submenu", "import taken 0-1", "Title of Submenu already registered"),
+        ]
+        assert not [menu for menu in client.get("/").json() if menu['title'].startswith("import new")]
+
+    def test_validation_errors(self):
+        menus = catalogue("import invalid", menus=1)
+        del menus[0]['submenus'][1]['dishes'][2]['price']
+        response = client.post("/import/", json=menus)
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'] == ['body', 0, 'submenus', 1, 'dishes', 2, 'price']
+        body = json.dumps(catalogue("import invalid", menus=1)[0]) + "\n{\"title\": 1}\n"
+        response = client.post("/import/", content=body, headers={"content-type": "application/x-ndjson"})
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'][:2] == ['body', 2]
+        assert not [menu for menu in client.get("/").json() if menu['title'].startswith("import invalid")]
@@ -0,0 +1,115 @@
+import json
+import uuid
+
+from sqlalchemy import delete, event, insert, text
+from sqlalchemy.orm import Session
+
+from menu import models
+from tests.Dependency import client, engine
+
+PREFIX = "explain "
+TABLES = {"menus", "submenus", "dishes"}
+
+
+def scanned(plan):
+    """(node type, table) of every scan in an EXPLAIN (FORMAT JSON) plan."""
+    if "Relation Name" in plan:
+        yield plan["Node Type"], plan["Relation Name"]
+    for child in plan.get("Plans", ()):
+        yield from scanned(child)
+
+
+class TestIndexes:
+    """Big enough a catalogue that a sequential scan loses to any usable index, so one in a plan means none was."""
+
+    @classmethod
+    def setup_class(cls):
+        cls.menu_ids = [str(uuid.uuid4()) for _ in range(500)]
+        cls.submenu_ids = {menu_id: [str(uuid.uuid4()) for _ in range(4)] for menu_id in cls.menu_ids}
+        cls.dish_ids = {submenu_id: [str(uuid.uuid4()) for _ in range(10)]
+                        for submenu_ids in cls.submenu_ids.values() for submenu_id in submenu_ids}
+        with Session(engine) as session:
+            session.execute(insert(models.Menu), [{"id": menu_id, "title": f"{PREFIX}{menu_id}", "description": ""}
+                                                  for menu_id in cls.menu_ids])
+            session.execute(insert(models.SubMenu), [
+                {"id": submenu_id, "title": f"{PREFIX}{submenu_id}", "description": "", "menu_id": menu_id}
+                for menu_id, submenu_ids in cls.submenu_ids.items() for submenu_id in submenu_ids])
+            session.execute(insert(models.Dish), [
+                {"id": dish_id, "title": f"{PREFIX}{dish_id}", "description": "", "price": 1, "submenu_id": submenu_id}
+                for submenu_id, dish_ids in cls.dish_ids.items() for dish_id in dish_ids])
+            session.commit()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM ANALYZE menus, submenus, dishes"))
+
+    @classmethod
+    def teardown_class(cls):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith(PREFIX)))
+            session.commit()
+
+    def statements(self, method, url, **kwargs):
+        """Every statement `url` runs, with its parameters."""
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.request(method, url, **kwargs)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        assert response.status_code < 400, response.text
+        return captured
+
+    def sequential_scans(self, statement, parameters):
+        with engine.connect() as connection:
+            cursor = connection.connection.cursor()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+            connection.rollback()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return [table for node, table in scanned(plan[0]["Plan"]) if node == "Seq Scan" and table in TABLES]
+
+    def assert_no_sequential_scans(self, method, url, **kwargs):
+        statements = self.statements(method, url, **kwargs)
+        assert statements
+        for statement, parameters in statements:
+            assert not self.sequential_scans(statement, parameters), statement
+
+    def test_reads(self):
+        menu_id = self.menu_ids[250]
+        submenu_id = self.submenu_ids[menu_id][2]
+        dish_id = self.dish_ids[submenu_id][5]
+        after = client.get("/", params={"limit": 10}).headers["x-next-cursor"]
+        for url, params in (
+                ("/", {"limit": 10}),
+                ("/", {"limit": 10, "after": after}),
+                (f"/{menu_id}/", {}),
+                (f"/{menu_id}/submenus/", {}),
+                (f"/{menu_id}/submenus/", {"limit": 2}),
+                (f"/{menu_id}/submenus/{submenu_id}/", {}),
+                (f"/{menu_id}/submenus/{submenu_id}/dishes/", {}),
+                (f"/{menu_id}/submenus/{submenu_id}/dishes/", {"limit": 3}),
+                (f"/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/", {}),
+        ):
+            self.assert_no_sequential_scans("GET", url, params=params)
+
+    def test_writes(self):
+        menu_id = self.menu_ids[100]
+        submenu_id, other_submenu_id = self.submenu_ids[menu_id][:2]
+        dish_id = self.dish_ids[submenu_id][0]
+        self.assert_no_sequential_scans("PATCH", f"/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/",
+                                        json={"title": f"{PREFIX}patched dish", "description": "", "price": "2"})
+        self.assert_no_sequential_scans("POST", f"/{menu_id}/submenus/{submenu_id}/dishes/",
+                                        json={"title": f"{PREFIX}new dish", "description": "", "price": "2"})
+        self.assert_no_sequential_scans("DELETE", f"/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}/")
+        self.assert_no_sequential_scans("DELETE", f"/{menu_id}/submenus/{other_submenu_id}/")
+
+    def test_cascades(self):
+        # What ON DELETE CASCADE runs for each deleted parent.
+        submenu_id = self.submenu_ids[self.menu_ids[0]][0]
+        for statement, parameters in (("DELETE FROM submenus WHERE menu_id = %(id)s", {"id": self.menu_ids[0]}),
+                                      ("DELETE FROM dishes WHERE submenu_id = %(id)s", {"id": submenu_id})):
+            assert not self.sequential_scans(statement, parameters), statement
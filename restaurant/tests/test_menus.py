@@ -129,8 +129,8 @@ class TestMenus:
                 "description": "about menu2",
             },
         )
-        assert response.status_code == 500
-        assert response.json() == {"detail": "A duplicate record already exists"}
+        assert response.status_code == 400
+        assert response.json() == {"detail": "ID of Menu already registered"}
         with Session(engine) as session:
             assert session.get(models.Menu, self.menu['id']) is not None
         response = client.delete(f"/{self.menu['id']}/")
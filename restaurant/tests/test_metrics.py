@@ -0,0 +1,91 @@
+import asyncio
+import re
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.metrics import Metrics, MetricsMiddleware
+from tests.Dependency import client, engine
+
+
+def sample(text, name):
+    match = re.search(rf'^{re.escape(name)} (\S+)$', text, re.MULTILINE)
+    return float(match[1]) if match else 0.0
+
+
+class TestMetrics:
+    menu = {"id": "4d5e6f7a-8b9c-4dae-8f01-2b3c4d5e6f7a", "title": "metrics menu", "description": ""}
+    menu_url = f"/{menu['id']}/"
+    route = 'method="GET",route="/{menu_id}/"'
+
+    def setup_method(self):
+        assert client.post("/", json=self.menu).status_code == 201
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == self.menu['id']))
+            session.commit()
+
+    def test_content_type(self):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'text/plain; version=0.0.4; charset=utf-8'
+
+    def test_labels_use_route_template(self):
+        before = client.get("/metrics").text
+        client.get(self.menu_url)
+        client.get("/0e1f2a3b-4c5d-4e6f-8a7b-9c0d1e2f3a4b/")
+        text = client.get("/metrics").text
+        assert self.menu['id'] not in text
+        for status in (200, 404):
+            name = f'http_responses_total{{{self.route},status="{status}"}}'
+            assert sample(text, name) == sample(before, name) + 1
+        name = f'http_request_duration_seconds_count{{{self.route}}}'
+        assert sample(text, name) == sample(before, name) + 2
+
+    def test_unmatched_paths_share_a_label(self):
+        before = client.get("/metrics").text
+        client.get("/no/such/path/1")
+        client.get("/no/such/path/2")
+        text = client.get("/metrics").text
+        name = 'http_responses_total{method="",route="<unmatched>",status="404"}'
+        assert sample(text, name) == sample(before, name) + 2
+        assert '/no/such/path' not in text
+
+    def test_response_size(self):
+        before = client.get("/metrics").text
+        body = client.get(self.menu_url).content
+        text = client.get("/metrics").text
+        name = f'http_response_size_bytes_sum{{{self.route}}}'
+        assert sample(text, name) == sample(before, name) + len(body)
+
+    def test_in_flight_counts_the_scrape(self):
+        assert sample(client.get("/metrics").text, 'http_requests_in_flight') == 1
+
+    def test_pool_and_cache(self):
+        text = client.get("/metrics").text
+        assert re.search(r'^db_pool_checked_out\{engine="sync"\} \d+$', text, re.MULTILINE)
+        assert re.search(r'^db_pool_checkouts_total\{engine="sync"\} \d+$', text, re.MULTILINE)
+        assert re.search(r'^cache_hits_total\{backend="\w+"\} \d+$', text, re.MULTILINE)
+
+
+class TestMetricsMiddleware:
+    def test_exceptions_are_counted_as_500(self):
+        async def app(scope, receive, send):
+            raise RuntimeError
+
+        registry = Metrics()
+        middleware = MetricsMiddleware(app, registry)
+
+        async def call():
+            try:
+                await middleware({'type': 'http'}, None, None)
+            except RuntimeError:
+                pass
+
+        asyncio.run(call())
+        text = registry.render()
+        assert sample(text, 'http_request_exceptions_total') == 1
+        assert sample(text, 'http_requests_in_flight') == 0
+        assert sample(text, 'http_responses_total{method="",route="<unmatched>",status="500"}') == 1
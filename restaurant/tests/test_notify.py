@@ -0,0 +1,209 @@
+import json
+import select
+import threading
+import time
+
+import psycopg2
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, text, update
+from sqlalchemy.orm import Session
+
+from main import create_app
+from menu import cache, config, models, notify, snapshot
+from menu.cache import LRUCache, NullCache
+from menu.config import Settings
+from menu.notify import InvalidationListener
+from tests.Dependency import client, engine, test_url
+
+CATALOGUE = [{"title": "notify menu", "description": "", "submenus": [
+    {"title": "notify submenu", "description": "", "dishes": [
+        {"title": "notify dish", "description": "", "price": "1.50"}]}]}]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def received(connection, timeout=0.5):
+    changes = []
+    while select.select([connection], [], [], timeout)[0]:
+        connection.poll()
+        changes += [json.loads(notification.payload) for notification in connection.notifies]
+        connection.notifies.clear()
+    return changes
+
+
+@pytest.fixture
+def listening():
+    connection = psycopg2.connect(**test_url.translate_connect_args(username='user', database='dbname'))
+    connection.autocommit = True
+    connection.cursor().execute(f'LISTEN {notify.CHANNEL}')
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def listener():
+    cache.set_cache(LRUCache())
+    listener = InvalidationListener(test_url)
+    listener.start()
+    wait_for(listener.listening.is_set)
+    yield listener
+    listener.stop()
+    cache.set_cache(NullCache())
+
+
+def terminate_listeners():
+    with Session(engine) as session:
+        session.execute(text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE application_name = :name"),
+                        {"name": notify.APPLICATION_NAME})
+
+
+class TestMenuChanges:
+    def setup_method(self):
+        assert client.post("/import/", json=CATALOGUE).status_code == 201
+        self.menu = next(menu for menu in client.get("/tree/").json() if menu['title'] == "notify menu")
+        self.submenu = self.menu['submenus'][0]
+        self.dish = self.submenu['dishes'][0]
+        self.dish_url = f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/{self.dish['id']}/"
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("notify ")))
+            session.commit()
+
+    def test_every_write_notifies_its_row_and_parents_on_commit(self, listening):
+        received(listening, 0.1)
+        with Session(engine) as session:
+            session.execute(update(models.Dish).filter(models.Dish.id == self.dish['id']).values(price=2))
+            session.execute(update(models.SubMenu).filter(models.SubMenu.id == self.submenu['id']).values(title="x"))
+            assert received(listening, 0.1) == []
+            session.commit()
+        # The counts and versions these bumped on their parents are not changes of the parents' own.
+        assert received(listening) == [
+            {"type": "dish", "op": "UPDATE", "id": self.dish['id'], "menu_id": self.menu['id'],
+             "submenu_id": self.submenu['id']},
+            {"type": "submenu", "op": "UPDATE", "id": self.submenu['id'], "menu_id": self.menu['id']}]
+
+        with Session(engine) as session:
+            session.execute(delete(models.Dish).filter(models.Dish.id == self.dish['id']))
+            session.rollback()
+        assert received(listening) == []
+
+        submenu = client.post(f"/{self.menu['id']}/submenus/", json={"title": "notify another", "description": ""})
+        client.delete(f"/{self.menu['id']}/")
+        # What the menu's delete took along is left to its own notification.
+        assert received(listening) == [
+            {"type": "submenu", "op": "INSERT", "id": submenu.json()['id'], "menu_id": self.menu['id']},
+            {"type": "menu", "op": "DELETE", "id": self.menu['id']}]
+
+    def test_a_move_is_a_delete_from_one_parent_and_an_insert_into_the_other(self, listening):
+        other = client.post(f"/{self.menu['id']}/submenus/", json={"title": "notify other", "description": ""}).json()
+        received(listening, 0.1)
+        with Session(engine) as session:
+            session.execute(update(models.Dish).filter(models.Dish.id == self.dish['id'])
+                            .values(submenu_id=other['id']))
+            session.commit()
+        assert sorted(received(listening), key=lambda change: change['op']) == [
+            {"type": "dish", "op": "DELETE", "id": self.dish['id'], "menu_id": self.menu['id'],
+             "submenu_id": self.submenu['id']},
+            {"type": "dish", "op": "INSERT", "id": self.dish['id'], "menu_id": self.menu['id'],
+             "submenu_id": other['id']}]
+
+    def test_the_listener_drops_what_another_worker_changed(self, listener, monkeypatch):
+        monkeypatch.setattr(config, 'SNAPSHOT', True)
+        menu_url, submenus_url = f"/{self.menu['id']}/", f"/{self.menu['id']}/submenus/"
+        for url in ("/", menu_url, submenus_url, self.dish_url):
+            client.get(url)
+        key = cache.dish_key(self.menu['id'], self.submenu['id'], self.dish['id'])
+        assert cache.get_cache().get(key) is not None
+        loaded = snapshot._current
+        # As another worker would: straight to the database, past this worker's own invalidation.
+        with Session(engine) as session:
+            session.execute(delete(models.Dish).filter(models.Dish.id == self.dish['id']))
+            session.commit()
+        wait_for(lambda: cache.get_cache().get(key) is None)
+        assert cache.get_cache().get(cache.MENUS_KEY) is None
+        assert not loaded.fresh()
+        assert client.get(self.dish_url).status_code == 404
+
+    def test_a_dish_update_drops_only_the_keys_that_show_it(self, listener):
+        menu_url = f"/{self.menu['id']}/"
+        submenu_url = f"{menu_url}submenus/{self.submenu['id']}/"
+        other_dish = client.post(f"{submenu_url}dishes/", json={"title": "notify other dish", "description": "",
+                                                                "price": "1.00"}).json()
+        other_submenu = client.post(f"{menu_url}submenus/", json={"title": "notify other", "description": ""}).json()
+        urls = ["/", menu_url, f"{menu_url}submenus/", submenu_url, f"{submenu_url}dishes/", self.dish_url,
+                f"{submenu_url}dishes/{other_dish['id']}/", f"{menu_url}submenus/{other_submenu['id']}/",
+                f"{menu_url}submenus/{other_submenu['id']}/dishes/"]
+        for url in urls:
+            client.get(url)
+        held = set(cache.get_cache()._data)
+        assert len(held) == len(urls)
+        with Session(engine) as session:
+            session.execute(update(models.Dish).filter(models.Dish.id == self.dish['id']).values(price=7))
+            session.commit()
+        dropped = {cache.dish_key(self.menu['id'], self.submenu['id'], self.dish['id']),
+                   cache.dishes_key(self.menu['id'], self.submenu['id'])}
+        wait_for(lambda: not dropped & set(cache.get_cache()._data))
+        assert set(cache.get_cache()._data) == held - dropped
+        assert client.get(self.dish_url).json()['price'] == "7.00"
+
+    def test_reconnects_and_flushes(self, listener):
+        client.get(f"/{self.menu['id']}/")
+        assert len(cache.get_cache()) == 1
+        terminate_listeners()
+        wait_for(lambda: len(cache.get_cache()) == 0)
+        wait_for(listener.listening.is_set)
+
+    def test_a_change_it_cannot_apply_flushes_and_listens_again(self, listener, monkeypatch):
+        monkeypatch.setattr(notify, 'RETRY_SECONDS', 0.05)
+        failures = []
+
+        def unreachable(payload):
+            failures.append(payload)
+            raise ConnectionError("cache unreachable")
+
+        monkeypatch.setattr(notify, 'apply', unreachable)
+        client.get(f"/{self.menu['id']}/")
+        with Session(engine) as session:
+            session.execute(update(models.Dish).filter(models.Dish.id == self.dish['id']).values(price=3))
+            session.commit()
+        wait_for(lambda: failures and len(cache.get_cache()) == 0)
+        monkeypatch.undo()
+        wait_for(listener.listening.is_set)
+        assert listener._thread.is_alive()
+
+        client.get(self.dish_url)
+        with Session(engine) as session:
+            session.execute(update(models.Dish).filter(models.Dish.id == self.dish['id']).values(price=4))
+            session.commit()
+        wait_for(lambda: len(cache.get_cache()) == 0)
+
+    def test_a_shared_cache_is_not_flushed(self):
+        class SharedCache(LRUCache):
+            shared = True
+
+        cache.set_cache(SharedCache())
+        try:
+            cache.get_cache().set(cache.MENUS_KEY, [])
+            generation = snapshot.generation()
+            notify.flush()
+            assert cache.get_cache().get(cache.MENUS_KEY) == [] and snapshot.generation() > generation
+        finally:
+            cache.set_cache(NullCache())
+
+    def test_lifespan_starts_and_stops_the_listener(self):
+        settings = Settings(metrics=False, query_stats=False, cache_notify=True,
+                            database_url=test_url.render_as_string(hide_password=False))
+        with TestClient(create_app(settings)):
+            assert notify.APPLICATION_NAME in listener_threads()
+        assert notify.APPLICATION_NAME not in listener_threads()
+
+
+def listener_threads():
+    return [thread.name for thread in threading.enumerate()]
@@ -0,0 +1,83 @@
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from tests.Dependency import client, engine
+
+DISHES = 25
+
+
+def walk(url, limit):
+    pages, after = [], None
+    while True:
+        params = {"limit": limit} if after is None else {"limit": limit, "after": after}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        after = response.headers.get(NEXT_CURSOR_HEADER)
+        if after is None:
+            return pages
+
+
+class TestPagination:
+    menu_id = "d1c2b3a4-9e8f-4a7b-8c6d-5e4f3a2b1c0d"
+    submenu_id = "a9b8c7d6-e5f4-4321-8fed-cba987654321"
+    submenus_url = f"/{menu_id}/submenus/"
+    dishes_url = f"/{menu_id}/submenus/{submenu_id}/dishes/"
+
+    @classmethod
+    def setup_class(cls):
+        dishes = [{"id": str(uuid.uuid4()), "title": f"page dish {d % 7}-{d:02}", "description": "", "price": d,
+                   "submenu_id": cls.submenu_id} for d in range(DISHES)]
+        submenus = [{"id": cls.submenu_id, "title": "page submenu 0", "description": "", "menu_id": cls.menu_id}]
+        submenus += [{"id": str(uuid.uuid4()), "title": f"page submenu {s}", "description": "",
+                      "menu_id": cls.menu_id} for s in range(1, 5)]
+        with Session(engine) as session:
+            session.execute(insert(models.Menu), [{"id": cls.menu_id, "title": "page menu", "description": ""}])
+            session.execute(insert(models.SubMenu), submenus)
+            session.execute(insert(models.Dish), dishes)
+            session.commit()
+
+    @classmethod
+    def teardown_class(cls):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == cls.menu_id))
+            session.commit()
+
+    def test_dish_pages_cover_full_list_in_order(self):
+        full = client.get(self.dishes_url).json()
+        assert [dish['title'] for dish in full] == sorted(dish['title'] for dish in full)
+        pages = walk(self.dishes_url, 10)
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert [dish for page in pages for dish in page] == full
+
+    def test_exact_multiple_has_no_trailing_cursor(self):
+        response = client.get(self.submenus_url, params={"limit": 5})
+        assert len(response.json()) == 5
+        assert NEXT_CURSOR_HEADER not in response.headers
+        pages = walk(self.submenus_url, 2)
+        assert [[submenu['title'] for submenu in page] for page in pages] == [
+            ["page submenu 0", "page submenu 1"], ["page submenu 2", "page submenu 3"], ["page submenu 4"]]
+
+    def test_menu_pages(self):
+        pages = walk("/", 1)
+        assert [menu['id'] for page in pages for menu in page] == [menu['id'] for menu in client.get("/").json()]
+        assert [menu['submenus_count'] for page in pages for menu in page if menu['id'] == self.menu_id] == [5]
+
+    def test_cursor_is_keyset_position(self):
+        full = client.get(self.dishes_url).json()
+        cursor = encode_cursor(SimpleNamespace(**full[16]))
+        response = client.get(self.dishes_url, params={"after": cursor})
+        assert response.json() == full[17:]
+        assert NEXT_CURSOR_HEADER not in response.headers
+
+    def test_invalid_parameters(self):
+        response = client.get(self.dishes_url, params={"after": "not a cursor"})
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Invalid cursor'}
+        assert client.get(self.dishes_url, params={"limit": 0}).status_code == 422
+        assert client.get(self.dishes_url, params={"limit": 1001}).status_code == 422
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError
+
+from menu.pool import InstrumentedNullPool, InstrumentedQueuePool, pool_status
+from tests.Dependency import client, test_url
+
+
+class TestPool:
+    def test_checkout_counters(self):
+        engine = create_engine(test_url, poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=0)
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            status = pool_status(engine)
+            assert status['pool'] == 'InstrumentedQueuePool'
+            assert status['size'] == 2
+            assert status['checkouts'] == 1
+            assert status['checked_out'] == 1
+        status = pool_status(engine)
+        assert status['checkins'] == 1
+        assert status['checked_out'] == 0
+        assert status['checked_in'] == 1
+        engine.dispose()
+
+    def test_timeouts_are_counted(self):
+        engine = create_engine(test_url, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0,
+                               pool_timeout=0.1)
+        with engine.connect():
+            with pytest.raises(TimeoutError):
+                engine.connect()
+        status = pool_status(engine)
+        assert status['timeouts'] == 1
+        assert status['checkouts'] == 1
+        engine.dispose()
+
+    def test_stats_survive_dispose(self):
+        engine = create_engine(test_url, poolclass=InstrumentedQueuePool)
+        with engine.connect():
+            pass
+        engine.dispose()
+        with engine.connect():
+            pass
+        assert pool_status(engine)['checkouts'] == 2
+        engine.dispose()
+
+    def test_null_pool(self):
+        engine = create_engine(test_url, poolclass=InstrumentedNullPool)
+        with engine.connect():
+            pass
+        status = pool_status(engine)
+        assert status['pool'] == 'InstrumentedNullPool'
+        assert 'size' not in status
+        assert status['checkouts'] == 1
+        assert status['checkins'] == 1
+
+    def test_pool_status_endpoint(self):
+        response = client.get("/api/v1/status/pool")
+        assert response.status_code == 200
+        data = response.json()
+        assert data['sync']['pool'] == 'InstrumentedQueuePool'
+        for key in ('size', 'overflow', 'checked_out', 'wait_time_total', 'wait_time_max', 'timeouts'):
+            assert key in data['sync']
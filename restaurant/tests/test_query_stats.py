@@ -0,0 +1,147 @@
+import copy
+import re
+
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session
+
+from menu import models, query_stats
+from menu.query_stats import assert_max_queries
+from tests.Dependency import client, engine
+
+
+class TestQueryStats:
+    menu = {"id": "1a2b3c4d-5e6f-4a7b-8c9d-0e1f2a3b4c5d", "title": "stats menu", "description": ""}
+    submenu = {"id": "2b3c4d5e-6f7a-4b8c-9d0e-1f2a3b4c5d6e", "title": "stats submenu", "description": ""}
+    dish = {"id": "3c4d5e6f-7a8b-4c9d-8e1f-2a3b4c5d6e7f", "title": "stats dish", "description": "", "price": "1.00"}
+    menu_url = f"/{menu['id']}/"
+    submenu_url = f"{menu_url}submenus/{submenu['id']}/"
+    dish_url = f"{submenu_url}dishes/{dish['id']}/"
+
+    def setup_method(self):
+        assert client.post("/", json=self.menu).status_code == 201
+        assert client.post(f"{self.menu_url}submenus/", json=self.submenu).status_code == 201
+        assert client.post(f"{self.submenu_url}dishes/", json=self.dish).status_code == 201
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id == self.menu['id']))
+            session.commit()
+
+    def test_server_timing_header(self):
+        response = client.get(self.menu_url)
+        match = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) queries", db-slowest;dur=([\d.]+)',
+                             response.headers['server-timing'])
+        assert match is not None
+        assert int(match[2]) == 2
+        assert float(match[3]) <= float(match[1])
+
+    @pytest.mark.parametrize("url, limit", [
+        ("/", 2), ("/tree/", 4), (menu_url, 2), (f"{menu_url}submenus/", 2), (submenu_url, 2),
+        (f"{submenu_url}dishes/", 2), (dish_url, 2),
+    ])
+    def test_reads(self, url, limit):
+        with assert_max_queries(limit):
+            assert client.get(url).status_code == 200
+
+    def test_not_modified_is_a_single_lookup(self):
+        etag = client.get(self.dish_url).headers['etag']
+        with assert_max_queries(1):
+            assert client.get(self.dish_url, headers={"If-None-Match": etag}).status_code == 304
+
+    def test_writes(self):
+        with assert_max_queries(1):
+            assert client.patch(self.dish_url, json={**self.dish, "price": "2.00"}).status_code == 200
+        with assert_max_queries(1):
+            assert client.patch(self.submenu_url, json=self.submenu).status_code == 200
+        with assert_max_queries(1):
+            assert client.patch(self.menu_url, json=self.menu).status_code == 200
+        with assert_max_queries(1):
+            assert client.delete(self.dish_url).status_code == 200
+        with assert_max_queries(1):
+            assert client.delete(self.submenu_url).status_code == 200
+        with assert_max_queries(1):
+            assert client.delete(self.menu_url).status_code == 200
+
+    def test_creates(self):
+        menu = {"title": "stats menu 2", "description": ""}
+        with assert_max_queries(1):
+            response = client.post("/", json=menu)
+        assert response.status_code == 201
+        with assert_max_queries(1):
+            assert client.delete(f"/{response.json()['id']}/").status_code == 200
+        submenu = {"title": "stats submenu 2", "description": ""}
+        with assert_max_queries(1):
+            assert client.post(f"{self.menu_url}submenus/", json=submenu).status_code == 201
+        dish = {"title": "stats dish 2", "description": "", "price": "1.00"}
+        with assert_max_queries(1):
+            assert client.post(f"{self.submenu_url}dishes/", json=dish).status_code == 201
+
+    def test_conflicts_cost_one_more_lookup(self):
+        with assert_max_queries(2):
+            response = client.post("/", json={**self.menu, "id": "5e6f7a8b-9c0d-4e1f-8a2b-3c4d5e6f7a8b"})
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Title of Menu already registered'}
+        with assert_max_queries(2):
+            response = client.post(f"{self.submenu_url}dishes/", json={**self.dish, "title": "stats dish 3"})
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'ID of Dish already registered'}
+        with assert_max_queries(2):
+            response = client.patch(f"{self.menu_url}submenus/{self.dish['id']}/", json=self.submenu)
+        assert response.status_code == 404
+        assert response.json() == {'detail': 'Submenu not found'}
+
+    def test_write_checks_the_whole_path(self):
+        other = {"id": "6f7a8b9c-0d1e-4f2a-9b3c-4d5e6f7a8b9c", "title": "stats other menu", "description": ""}
+        assert client.post("/", json=other).status_code == 201
+        try:
+            wrong_submenu_url = f"/{other['id']}/submenus/{self.submenu['id']}/"
+            response = client.post(f"{wrong_submenu_url}dishes/", json={**self.dish, "id": other['id']})
+            assert response.status_code == 400
+            assert response.json() == {'detail': 'ID of Submenu not registered'}
+            response = client.patch(f"{wrong_submenu_url}dishes/{self.dish['id']}/", json=self.dish)
+            assert response.status_code == 404
+            assert response.json() == {'detail': 'Submenu not found'}
+            assert client.delete(wrong_submenu_url).status_code == 404
+        finally:
+            client.delete(f"/{other['id']}/")
+
+    def test_update_to_a_taken_title(self):
+        other = {"title": "stats dish 4", "description": "", "price": "1.00"}
+        assert client.post(f"{self.submenu_url}dishes/", json=other).status_code == 201
+        response = client.patch(self.dish_url, json={**self.dish, "title": other['title']})
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Title of Dish already registered'}
+
+    def test_helper_fails_over_the_limit(self):
+        with pytest.raises(AssertionError, match="2 queries, expected at most 1"):
+            with assert_max_queries(1):
+                client.get(self.menu_url)
+
+    def test_failed_statements_leave_nothing_on_the_connection(self):
+        queries = query_stats.RequestQueries()
+        token = query_stats._current.set(queries)
+        try:
+            with engine.connect() as connection:
+                info = copy.deepcopy(dict(connection.info))
+                for _ in range(3):
+                    with pytest.raises(DataError):
+                        connection.execute(text("SELECT 1 / 0"))
+                    connection.rollback()
+                assert connection.info == info
+                connection.execute(text("SELECT 1"))
+        finally:
+            query_stats._current.reset(token)
+        assert queries.count == 1 and queries.slowest_statement == "SELECT 1"
+
+    def test_stats_are_aggregated_per_route(self):
+        query_stats.reset()
+        client.get(self.menu_url)
+        client.get("/2b3c4d5e-6f7a-4b8c-9d0e-1f2a3b4c5d6e/")
+        client.get("/no/such/path/at/all")
+        stats = client.get("/api/v1/status/queries").json()
+        assert stats["GET /{menu_id}/"]["requests"] == 2
+        assert stats["GET /{menu_id}/"]["queries_max"] == 2
+        assert stats["GET /{menu_id}/"]["slowest_statement"].startswith("SELECT")
+        assert stats["GET <unmatched>"]["queries_max"] == 0
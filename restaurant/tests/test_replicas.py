@@ -0,0 +1,131 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from sqlalchemy_utils import database_exists, create_database
+
+from main import create_app
+from menu import cache, config, database, models, snapshot
+from menu.cache import LRUCache, NullCache
+from menu.config import Settings
+from menu.database import Base
+from menu.replicas import STICKY_COOKIE, STICKY_HEADER
+from tests.Dependency import engine, test_url
+
+# A second database on the same server stands in for a replica that has not caught up: it never sees the writes.
+replica_url = test_url.set(database='tests_replica')
+replica = create_engine(replica_url)
+if not database_exists(replica.url):
+    create_database(replica.url, template='template0')
+Base.metadata.drop_all(bind=replica)
+Base.metadata.create_all(bind=replica)
+replica.dispose()
+
+unreachable_url = test_url.set(port=1)
+
+
+def make_app(*replica_urls, db_async=False):
+    return create_app(Settings(db_async=db_async, metrics=False, query_stats=False,
+                               database_url=test_url.render_as_string(hide_password=False),
+                               replica_urls=tuple(url.render_as_string(hide_password=False) for url in replica_urls)))
+
+
+@pytest.fixture(params=[False, True], ids=['sync', 'async'])
+def db_async(request):
+    return request.param
+
+
+class TestReplicas:
+    def test_reads_go_to_the_replica_and_writes_stick_to_the_primary(self, db_async):
+        # One client throughout: async engines are bound to the event loop of the TestClient that started them.
+        with TestClient(make_app(replica_url, db_async=db_async)) as client:
+            response = client.post("/api/v1/menus/", json={"title": "Replicated", "description": "menu"})
+            assert response.status_code == 201
+            assert float(response.headers[STICKY_HEADER]) > time.time()
+            assert STICKY_COOKIE in client.cookies
+            url = f"/api/v1/menus/{response.json()['id']}"
+            assert client.get(url).status_code == 200
+
+            client.cookies.clear()
+            assert client.get(url).status_code == 404
+            assert client.get(url, headers={STICKY_HEADER: response.headers[STICKY_HEADER]}).status_code == 200
+            assert client.delete(url).status_code == 200
+
+    def test_the_cache_keeps_read_your_writes(self, db_async):
+        cache.set_cache(LRUCache())
+        try:
+            with TestClient(make_app(replica_url, db_async=db_async)) as client:
+                menu = client.post("/api/v1/menus/", json={"title": "Cached", "description": "menu"}).json()
+                until = client.cookies[STICKY_COOKIE]
+                client.cookies.clear()
+                # The lagging replica's read is served, not stored.
+                assert client.get("/api/v1/menus/").json() == []
+                assert cache.get_cache().get(cache.MENUS_KEY) is None
+
+                # An entry the writer's window may not trust, as another worker could have left it.
+                cache.get_cache().set(cache.MENUS_KEY, [])
+                written = client.get("/api/v1/menus/", headers={STICKY_HEADER: until}).json()
+                assert [item['id'] for item in written] == [menu['id']]
+                # The primary's read replaced it, for everyone.
+                assert client.get("/api/v1/menus/").json() == written
+                client.delete(f"/api/v1/menus/{menu['id']}")
+        finally:
+            cache.set_cache(NullCache())
+
+    def test_the_snapshot_comes_from_the_primary(self, db_async, monkeypatch):
+        monkeypatch.setattr(config, 'SNAPSHOT', True)
+        snapshot.invalidate()
+        with TestClient(make_app(replica_url, db_async=db_async)) as client:
+            menu = client.post("/api/v1/menus/", json={"title": "Snapshot", "description": "menu"}).json()
+            until = client.cookies[STICKY_COOKIE]
+            client.cookies.clear()
+            url = f"/api/v1/menus/{menu['id']}"
+            # A replica read loads it, from the primary all the same.
+            assert client.get(url).json()['title'] == "Snapshot"
+            loaded = snapshot._current
+            assert loaded.fresh()
+
+            # As another worker would write: straight to the database, past this worker's invalidation.
+            with Session(engine) as session:
+                session.execute(update(models.Menu).filter(models.Menu.id == menu['id']).values(title="Renamed"))
+                session.commit()
+            assert snapshot._current is loaded and loaded.fresh()
+            assert client.get(url).json()['title'] == "Snapshot"
+            assert client.get(url, headers={STICKY_HEADER: until}).json()['title'] == "Renamed"
+            client.delete(url)
+
+    def test_the_primary_window_expires(self, monkeypatch):
+        monkeypatch.setattr(config, 'DB_STICKY_SECONDS', 0.2)
+        with TestClient(make_app(replica_url)) as client:
+            menu = client.post("/api/v1/menus/", json={"title": "Brief", "description": "menu"}).json()
+            url = f"/api/v1/menus/{menu['id']}"
+            assert client.get(url).status_code == 200
+            time.sleep(0.3)
+            assert client.get(url).status_code == 404
+            client.delete(url)
+
+    def test_failed_writes_do_not_stick(self):
+        with TestClient(make_app(replica_url)) as client:
+            for response in (client.post("/api/v1/menus/", json={"title": 1}),
+                             client.patch("/api/v1/menus/not-a-uuid", json={"title": "x", "description": "y"})):
+                assert response.status_code >= 400
+                assert STICKY_HEADER not in response.headers
+            assert STICKY_COOKIE not in client.cookies
+
+    def test_an_unreachable_replica_is_skipped(self, db_async):
+        with TestClient(make_app(unreachable_url, replica_url, db_async=db_async)) as client:
+            replicas = database.async_read_replicas if db_async else database.read_replicas
+            for _ in range(3):
+                assert client.get("/api/v1/menus/").json() == []
+            assert replicas.down_until[0] > time.monotonic() > replicas.down_until[1]
+
+    def test_no_reachable_replica_reads_the_primary(self):
+        with TestClient(make_app(unreachable_url)) as client:
+            assert client.get("/api/v1/menus/").status_code == 200
+            assert database.read_replicas.down_until[0] > time.monotonic()
+
+    def test_pool_status_lists_the_replicas(self):
+        with TestClient(make_app(replica_url, replica_url)) as client:
+            assert set(client.get("/api/v1/status/pool").json()) == {"sync", "sync_replica_0", "sync_replica_1"}
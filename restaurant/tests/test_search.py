@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+from menu import models, search
+from menu.query_stats import assert_max_queries
+from tests.Dependency import client, engine
+
+URL = "/api/v1/search/"
+
+with engine.connect() as connection:
+    HAS_TRIGRAM = connection.execute(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+                                     ).scalar()
+
+CATALOGUE = [{"title": "search menu", "description": "", "submenus": [
+    {"title": "search Soups", "description": "zuppa of the day", "dishes": [
+        {"title": "search Zuppa toscana", "description": "kale and sausage", "price": "8.50"},
+        {"title": "search Minestrone", "description": "vegetable zuppa", "price": "6.00"},
+    ]},
+    {"title": "search Mains", "description": "", "dishes": [
+        {"title": "search Zucchini fritters", "description": "with yogurt", "price": "11.00"},
+        {"title": "search Sausage and kale", "description": "", "price": "14.00"},
+    ]},
+]}]
+
+
+def titles(response):
+    assert response.status_code == 200, response.text
+    return [hit['title'] for hit in response.json()]
+
+
+class TestSearch:
+    def setup_method(self):
+        assert client.post("/import/", json=CATALOGUE).status_code == 201
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("search ")))
+            session.commit()
+
+    def test_titles_rank_above_descriptions(self):
+        response = client.get(URL, params={"q": "zuppa"})
+        first, *rest = titles(response)
+        assert (first, sorted(rest)) == ("search Zuppa toscana", ["search Minestrone", "search Soups"])
+        hit = response.json()[0]
+        assert (hit['type'], hit['price'], hit['menu_id'] is not None, hit['submenu_id'] is not None) == (
+            "dish", "8.50", True, True)
+        assert [hit['submenu_id'] for hit in response.json() if hit['type'] == 'submenu'] == [None]
+
+    def test_every_word_matches_and_the_last_as_a_prefix(self):
+        assert titles(client.get(URL, params={"q": "kale sausa"})) == [
+            "search Sausage and kale", "search Zuppa toscana"]
+        assert titles(client.get(URL, params={"q": "with yog"})) == ["search Zucchini fritters"]
+        assert titles(client.get(URL, params={"q": "sausage and ka"})) == [
+            "search Sausage and kale", "search Zuppa toscana"]
+        assert titles(client.get(URL, params={"q": "sausage and yo"})) == []
+        assert titles(client.get(URL, params={"q": "zucch yogurt"})) == []
+        assert titles(client.get(URL, params={"q": "!!"})) == []
+
+    def test_filters(self):
+        assert titles(client.get(URL, params={"q": "zuppa", "type": "submenu"})) == ["search Soups"]
+        assert titles(client.get(URL, params={"q": "kale", "min_price": "10"})) == ["search Sausage and kale"]
+        assert titles(client.get(URL, params={"q": "zuppa", "max_price": "7"})) == ["search Minestrone"]
+        assert client.get(URL, params={"q": "kale", "min_price": "-1"}).status_code == 422
+        assert client.get(URL, params={"q": ""}).status_code == 422
+
+    def test_pagination(self):
+        seen, cursor = [], None
+        while True:
+            response = client.get(URL, params={"q": "search", "limit": 2, **({"after": cursor} if cursor else {})})
+            seen += titles(response)
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(["search Soups", "search Mains", "search Zuppa toscana", "search Minestrone",
+                                       "search Zucchini fritters", "search Sausage and kale"])
+        assert client.get(URL, params={"q": "search", "after": "nope"}).status_code == 400
+
+    def test_every_match_is_ranked_and_paged_once(self):
+        # Many weak matches, from descriptions, and a strong one from a title, imported last.
+        dishes = [{"title": f"search filler {d}", "description": "quinoa", "price": "1"} for d in range(1100)]
+        dishes.append({"title": "search Quinoa bowl", "description": "", "price": "1"})
+        catalogue = [{"title": "search many", "description": "", "submenus": [
+            {"title": "search many submenu", "description": "", "dishes": dishes}]}]
+        assert client.post("/import/", json=catalogue).status_code == 201
+        seen, cursor = [], None
+        while True:
+            response = client.get(URL, params={"q": "quinoa", "limit": 100, **({"after": cursor} if cursor else {})})
+            seen += titles(response)
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert seen[0] == "search Quinoa bowl"
+        assert sorted(seen) == sorted(dish['title'] for dish in dishes)
+
+    def test_one_query_per_search(self):
+        with assert_max_queries(1):
+            assert titles(client.get(URL, params={"q": "fritters"})) == ["search Zucchini fritters"]
+
+    @pytest.mark.skipif(not HAS_TRIGRAM, reason="pg_trgm is not installed")
+    def test_typos_fall_back_to_trigrams(self):
+        assert titles(client.get(URL, params={"q": "search Minestrne"})) == ["search Minestrone"]
+
+    @pytest.mark.skipif(not HAS_TRIGRAM, reason="pg_trgm is not installed")
+    def test_typos_in_descriptions_fall_back_to_trigrams(self):
+        assert titles(client.get(URL, params={"q": "yogurd"})) == ["search Zucchini fritters"]
+
+    def test_without_trigrams_a_miss_is_one_query(self, monkeypatch):
+        monkeypatch.setattr(search, 'has_trigram', lambda db: False)
+        with assert_max_queries(1):
+            assert titles(client.get(URL, params={"q": "search Minestrne"})) == []
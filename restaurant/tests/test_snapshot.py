@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from menu import config, models, snapshot
+from menu.query_stats import assert_max_queries
+from tests.Dependency import client, engine
+
+CATALOGUE = [{"title": "snapshot menu", "description": "in memory", "submenus": [
+    {"title": "snapshot submenu", "description": "", "dishes": [
+        {"title": f"snapshot dish {d}", "description": f"no. {d}", "price": f"{d}.25"} for d in range(5)]},
+    {"title": "snapshot empty submenu", "description": "", "dishes": []},
+]}]
+
+
+@pytest.fixture
+def in_memory(monkeypatch):
+    monkeypatch.setattr(config, 'SNAPSHOT', True)
+    # Other tests write straight to the database, past the invalidation crud does.
+    snapshot.invalidate()
+
+
+class TestSnapshot:
+    def setup_method(self):
+        assert client.post("/import/", json=CATALOGUE).status_code == 201
+        menu = next(menu for menu in client.get("/tree/").json() if menu['title'] == "snapshot menu")
+        self.menu = menu
+        self.submenu = submenu = next(item for item in menu['submenus'] if item['title'] == "snapshot submenu")
+        empty = next(item for item in menu['submenus'] if item['title'] == "snapshot empty submenu")
+        menu_url, submenu_url = f"/{menu['id']}/", f"/{menu['id']}/submenus/{submenu['id']}/"
+        self.urls = ["/", "/tree/", f"/tree/?menu_id={menu['id']}", menu_url, f"{menu_url}submenus/", submenu_url,
+                     f"{submenu_url}dishes/", f"{submenu_url}dishes/{submenu['dishes'][2]['id']}/",
+                     f"{menu_url}submenus/{empty['id']}/dishes/",
+                     # Parents that do not match, and ids that match nothing.
+                     f"/{empty['id']}/", f"/{empty['id']}/submenus/{submenu['id']}/",
+                     f"{menu_url}submenus/{empty['id']}/dishes/{submenu['dishes'][0]['id']}/",
+                     f"/{submenu['id']}/submenus/{submenu['id']}/dishes/", "/tree/?menu_id=" + submenu['id']]
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("snapshot ")))
+            session.commit()
+
+    def responses(self, monkeypatch, in_memory, urls=None, params=None):
+        monkeypatch.setattr(config, 'SNAPSHOT', in_memory)
+        return [client.get(url, params=params) for url in urls or self.urls]
+
+    def assert_same(self, monkeypatch, urls=None, params=None):
+        for url, sql, memory in zip(urls or self.urls, self.responses(monkeypatch, False, urls, params),
+                                    self.responses(monkeypatch, True, urls, params)):
+            assert (memory.status_code, memory.json()) == (sql.status_code, sql.json()), url
+            for header in ("etag", "x-next-cursor"):
+                assert memory.headers.get(header) == sql.headers.get(header), url
+
+    def test_same_responses_as_sql(self, monkeypatch, in_memory):
+        self.assert_same(monkeypatch)
+
+    def test_pages(self, monkeypatch, in_memory):
+        urls = ["/", f"/{self.menu['id']}/submenus/", f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/"]
+        self.assert_same(monkeypatch, urls, {"limit": 2})
+        url = urls[2]
+        pages, after = [], None
+        while True:
+            response = client.get(url, params={"limit": 2, **({"after": after} if after else {})})
+            pages.append([dish['title'] for dish in response.json()])
+            self.assert_same(monkeypatch, [url], {"limit": 2, **({"after": after} if after else {})})
+            after = response.headers.get("x-next-cursor")
+            if after is None:
+                break
+        assert pages == [["snapshot dish 0", "snapshot dish 1"], ["snapshot dish 2", "snapshot dish 3"],
+                         ["snapshot dish 4"]]
+
+    def test_a_deleted_cursor_row_pages_through_sql(self, monkeypatch, in_memory):
+        url = f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/"
+        after = client.get(url, params={"limit": 2}).headers["x-next-cursor"]
+        client.delete(f"{url}{self.submenu['dishes'][1]['id']}/")
+        assert [dish['title'] for dish in client.get(url, params={"limit": 2, "after": after}).json()] == [
+            "snapshot dish 2", "snapshot dish 3"]
+
+    def test_no_queries_once_loaded(self, in_memory):
+        client.get("/")
+        with assert_max_queries(0):
+            for url in self.urls:
+                client.get(url)
+            assert client.get(self.urls[6], params={"limit": 2}).status_code == 200
+            assert client.get(self.urls[3], headers={"If-None-Match": "*"}).status_code == 304
+
+    def test_writes_swap_in_a_new_snapshot(self, in_memory):
+        dishes_url = self.urls[6]
+        before = client.get(dishes_url)
+        loaded = snapshot.status()
+        client.patch(f"{dishes_url}{self.submenu['dishes'][0]['id']}/",
+                     json={"title": "snapshot dish 0", "description": "changed", "price": "9.99"})
+        after = client.get(dishes_url)
+        assert after.json()[0]['price'] == "9.99" and after.headers['etag'] != before.headers['etag']
+        client.delete(dishes_url.removesuffix("dishes/"))
+        assert client.get(dishes_url).json() == []
+        assert client.get(f"/{self.menu['id']}/").json()['dishes_count'] == 0
+        assert snapshot.status()['dishes'] == loaded['dishes'] - 5
+
+    def test_expires_after_the_ttl(self, monkeypatch, in_memory):
+        client.get("/")
+        with Session(engine) as session:
+            session.execute(update(models.Menu).filter(models.Menu.id == self.menu['id'])
+                            .values(description="written elsewhere"))
+            session.commit()
+        assert client.get(self.urls[3]).json()['description'] == "in memory"
+        monkeypatch.setattr(config, 'SNAPSHOT_TTL', 0.001)
+        assert client.get(self.urls[3]).json()['description'] == "written elsewhere"
+
+    def test_status_reports_the_footprint(self, in_memory):
+        client.get("/")
+        status = client.get("/api/v1/status/snapshot").json()
+        assert status['loaded'] and status['fresh'] and status['dishes'] >= 5
+        client.post(f"/{self.menu['id']}/submenus/{self.submenu['id']}/dishes/",
+                    json={"title": "snapshot dish 5", "description": "one more", "price": "5.25"})
+        client.get("/")
+        assert client.get("/api/v1/status/snapshot").json()['bytes'] > status['bytes']
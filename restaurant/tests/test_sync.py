@@ -0,0 +1,103 @@
+import uuid
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.query_stats import assert_max_queries
+from tests.Dependency import client, engine
+
+
+def catalogue(prefix, menus=2, submenus=2, dishes=3):
+    return [{"id": str(uuid.uuid4()), "title": f"{prefix} {m}", "description": "",
+             "submenus": [{"id": str(uuid.uuid4()), "title": f"{prefix} {m}-{s}", "description": "",
+                           "dishes": [{"id": str(uuid.uuid4()), "title": f"{prefix} {m}-{s}-{d}", "description": "",
+                                       "price": f"{d}.50"}
+                                      for d in range(dishes)]}
+                          for s in range(submenus)]}
+            for m in range(menus)]
+
+
+def counts(menus=0, submenus=0, dishes=0):
+    return {"menus": menus, "submenus": submenus, "dishes": dishes}
+
+
+class TestSync:
+    def setup_method(self):
+        # A sync deletes whatever its snapshot leaves out, so every snapshot carries the rest of the catalogue along.
+        self.others = client.get("/tree/").json()
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("sync ")))
+            session.commit()
+
+    def sync(self, menus):
+        response = client.post("/sync/", json=self.others + menus)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def test_only_changes_are_written(self):
+        menus = catalogue("sync changes")
+        result = self.sync(menus)
+        assert (result['inserted'], result['updated'], result['deleted']) == (counts(2, 4, 12), counts(), counts())
+        with assert_max_queries(3):
+            result = self.sync(menus)
+        assert (result['inserted'], result['updated'], result['deleted']) == (counts(), counts(), counts())
+        others = [len(items) for items in self.flat_others()]
+        assert result['unchanged'] == counts(2 + others[0], 4 + others[1], 12 + others[2])
+
+        menus[0]['description'] = "changed"
+        dishes = menus[1]['submenus'][0]['dishes']
+        dishes[0]['price'] = "7.25"
+        dishes.pop()
+        dishes.append({"id": str(uuid.uuid4()), "title": "sync changes new", "description": "", "price": "1"})
+        with assert_max_queries(3 + 1 + 2):
+            result = self.sync(menus)
+        assert (result['inserted'], result['updated'], result['deleted']) == (
+            counts(dishes=1), counts(menus=1, dishes=1), counts(dishes=1))
+        menu = client.get(f"/{menus[1]['id']}/").json()
+        assert (menu['submenus_count'], menu['dishes_count']) == (2, 6)
+        submenu_url = f"/{menus[1]['id']}/submenus/{menus[1]['submenus'][0]['id']}/"
+        assert sorted(dish['price'] for dish in client.get(f"{submenu_url}dishes/").json()) == [
+            "1.00", "1.50", "7.25"]
+        assert client.get(f"/{menus[0]['id']}/").json()['description'] == "changed"
+
+    def test_moves_out_of_deleted_parents(self):
+        menus = catalogue("sync moves")
+        self.sync(menus)
+        gone, kept = menus
+        moved = gone['submenus'][0]
+        moved['title'] = "sync moves renamed"
+        kept['submenus'].append(moved)
+        kept['submenus'][0]['dishes'].append(gone['submenus'][1]['dishes'][0])
+        result = self.sync([kept])
+        assert (result['inserted'], result['updated'], result['deleted']) == (
+            counts(), counts(submenus=1, dishes=1), counts(menus=1, submenus=1, dishes=2))
+        menu = client.get(f"/{kept['id']}/").json()
+        assert (menu['submenus_count'], menu['dishes_count']) == (3, 10)
+        assert client.get(f"/{kept['id']}/submenus/{moved['id']}/").json()['dishes_count'] == 3
+        assert client.get(f"/{gone['id']}/").status_code == 404
+
+    def test_deleted_items_free_their_titles(self):
+        menus = catalogue("sync titles", menus=1, submenus=1, dishes=1)
+        self.sync(menus)
+        menus[0]['submenus'][0]['dishes'][0]['id'] = str(uuid.uuid4())
+        result = self.sync(menus)
+        assert (result['inserted'], result['deleted']) == (counts(dishes=1), counts(dishes=1))
+
+    def test_errors(self):
+        menus = catalogue("sync errors", menus=1, submenus=1, dishes=1)
+        del menus[0]['submenus'][0]['id']
+        response = client.post("/sync/", json=self.others + menus)
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'][-3:] == ['submenus', 0, 'id']
+        menus = catalogue("sync errors", menus=1, submenus=2, dishes=0)
+        menus[0]['submenus'][1]['title'] = menus[0]['submenus'][0]['title']
+        response = client.post("/sync/", json=self.others + menus)
+        assert response.status_code == 409
+        assert [item['message'] for item in response.json()['detail']] == ["Duplicate title in import"]
+
+    def flat_others(self):
+        submenus = [submenu for menu in self.others for submenu in menu['submenus']]
+        return self.others, submenus, [dish for submenu in submenus for dish in submenu['dishes']]
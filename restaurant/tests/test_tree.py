@@ -0,0 +1,78 @@
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session
+
+from menu import models
+from tests.Dependency import client, engine
+
+
+class TestMenuTree:
+    menus = [
+        {"id": "a1f0c7e2-3b4d-4e5f-8a9b-0c1d2e3f4a51", "title": "tree menu A", "description": "A"},
+        {"id": "b2e1d8f3-4c5e-4f6a-9b0c-1d2e3f4a5b62", "title": "tree menu B", "description": "B"},
+    ]
+
+    def setup_method(self):
+        for menu in self.menus:
+            assert client.post("/", json=menu).status_code == 201
+            for s in range(2):
+                submenu = {"title": f"{menu['title']} sub {s}", "description": f"sub {s}"}
+                response = client.post(f"/{menu['id']}/submenus/", json=submenu)
+                assert response.status_code == 201
+                submenu_id = response.json()['id']
+                for d in range(3):
+                    dish = {"title": f"{menu['title']} sub {s} dish {d}", "description": "dish", "price": f"{d}.5"}
+                    response = client.post(f"/{menu['id']}/submenus/{submenu_id}/dishes/", json=dish)
+                    assert response.status_code == 201
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.id.in_([menu['id'] for menu in self.menus])))
+            session.commit()
+
+    def test_full_tree(self):
+        response = client.get("/tree/")
+        assert response.status_code == 200
+        tree = [menu for menu in response.json() if menu['id'] in {menu['id'] for menu in self.menus}]
+        assert [menu['title'] for menu in tree] == ["tree menu A", "tree menu B"]
+        for menu in tree:
+            assert menu['submenus_count'] == 2
+            assert menu['dishes_count'] == 6
+            assert [submenu['title'] for submenu in menu['submenus']] == [f"{menu['title']} sub 0",
+                                                                          f"{menu['title']} sub 1"]
+            for submenu in menu['submenus']:
+                assert submenu['dishes_count'] == 3
+                assert [dish['price'] for dish in submenu['dishes']] == ["0.50", "1.50", "2.50"]
+
+    def test_tree_matches_flat_routes(self):
+        menu = self.menus[0]
+        tree = client.get("/tree/", params={"menu_id": menu['id']}).json()
+        assert len(tree) == 1
+        flat_menu = client.get(f"/{menu['id']}/").json()
+        assert {key: tree[0][key] for key in flat_menu} == flat_menu
+        for submenu in tree[0]['submenus']:
+            flat_submenu = client.get(f"/{menu['id']}/submenus/{submenu['id']}/").json()
+            assert {key: submenu[key] for key in flat_submenu} == flat_submenu
+            flat_dishes = client.get(f"/{menu['id']}/submenus/{submenu['id']}/dishes/").json()
+            assert sorted(flat_dishes, key=lambda dish: dish['title']) == submenu['dishes']
+
+    def test_filter_to_unknown_or_invalid_menu(self):
+        response = client.get("/tree/", params={"menu_id": "c3f2e9a4-5d6f-4a7b-8c9d-2e3f4a5b6c73"})
+        assert response.status_code == 200
+        assert response.json() == []
+        response = client.get("/tree/", params={"menu_id": "1111"})
+        assert response.status_code == 422
+
+    def test_query_count_is_bounded(self):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            assert client.get("/tree/").status_code == 200
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        # The ETag version lookup is a separate single-row read and not part of loading the tree.
+        statements = [statement for statement in statements if "catalogue.version" not in statement]
+        assert len([statement for statement in statements if statement.lstrip().startswith("SELECT")]) == 3
@@ -0,0 +1,115 @@
+import uuid
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from menu import models
+from menu.query_stats import assert_max_queries
+from tests.Dependency import client, engine
+
+
+def catalogue(prefix, menus=2, submenus=2, dishes=3):
+    return [{"id": str(uuid.uuid4()), "title": f"{prefix} {m}", "description": "",
+             "submenus": [{"id": str(uuid.uuid4()), "title": f"{prefix} {m}-{s}", "description": "",
+                           "dishes": [{"id": str(uuid.uuid4()), "title": f"{prefix} {m}-{s}-{d}", "description": "",
+                                       "price": f"{d}.50"}
+                                      for d in range(dishes)]}
+                          for s in range(submenus)]}
+            for m in range(menus)]
+
+
+class TestUpsert:
+    menu = {"id": "8b9c0d1e-2f3a-4b4c-9d5e-6f7a8b9c0d1e", "title": "upsert menu", "description": ""}
+    submenu = {"id": "9c0d1e2f-3a4b-4c5d-8e6f-7a8b9c0d1e2f", "title": "upsert submenu", "description": ""}
+    dish = {"id": "0d1e2f3a-4b5c-4d6e-9f7a-8b9c0d1e2f3a", "title": "upsert dish", "description": "", "price": "1.00"}
+    menu_url = f"/{menu['id']}/"
+    submenu_url = f"{menu_url}submenus/{submenu['id']}/"
+    dish_url = f"{submenu_url}dishes/{dish['id']}/"
+
+    def teardown_method(self):
+        with Session(engine) as session:
+            session.execute(delete(models.Menu).filter(models.Menu.title.startswith("upsert ")))
+            session.commit()
+
+    def test_put_creates_then_updates(self):
+        for _ in range(2):
+            with assert_max_queries(1):
+                assert client.put(self.menu_url, json=self.menu).status_code == 200
+            with assert_max_queries(1):
+                assert client.put(self.submenu_url, json=self.submenu).status_code == 200
+            with assert_max_queries(1):
+                assert client.put(self.dish_url, json=self.dish).status_code == 200
+        response = client.put(self.dish_url, json={**self.dish, "price": "2.50"})
+        assert response.json() == {**self.dish, "price": "2.50"}
+        response = client.put(self.menu_url, json={**self.menu, "description": "changed"})
+        assert response.json() == {**self.menu, "description": "changed", "submenus_count": 1, "dishes_count": 1}
+        assert client.get(self.submenu_url).json()['dishes_count'] == 1
+
+    def test_path_id_wins_over_body_id(self):
+        response = client.put(self.menu_url, json={**self.menu, "id": str(uuid.uuid4())})
+        assert response.json()['id'] == self.menu['id']
+
+    def test_errors(self):
+        response = client.put(self.submenu_url, json=self.submenu)
+        assert response.status_code == 404
+        assert response.json() == {'detail': 'Menu not found'}
+        assert client.put(self.menu_url, json=self.menu).status_code == 200
+        response = client.put(self.dish_url, json=self.dish)
+        assert response.status_code == 404
+        assert response.json() == {'detail': 'Submenu not found'}
+        assert client.put(self.submenu_url, json=self.submenu).status_code == 200
+        response = client.put(f"/{uuid.uuid4()}/", json=self.menu)
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'Title of Menu already registered'}
+        assert client.put("/1111/", json=self.menu).status_code == 422
+
+    def test_rows_are_not_moved_to_another_parent(self):
+        other = {"id": str(uuid.uuid4()), "title": "upsert other", "description": ""}
+        assert client.put(self.menu_url, json=self.menu).status_code == 200
+        assert client.put(self.submenu_url, json=self.submenu).status_code == 200
+        assert client.put(f"/{other['id']}/", json=other).status_code == 200
+        response = client.put(f"/{other['id']}/submenus/{self.submenu['id']}/", json=self.submenu)
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'ID of Submenu already registered'}
+        assert client.get(self.menu_url).json()['submenus_count'] == 1
+
+    def test_batch(self):
+        menus = catalogue("upsert batch")
+        with assert_max_queries(3):
+            response = client.put("/import/", json=menus)
+        assert response.status_code == 200
+        assert response.json() == {"menus": 2, "submenus": 4, "dishes": 12}
+        menus[0]['title'] = "upsert batch renamed"
+        # Rows left out of a batch are kept, not deleted.
+        menus[0]['submenus'][0]['dishes'].pop()
+        menus[0]['submenus'][1]['dishes'][0]['price'] = "9.99"
+        with assert_max_queries(3):
+            assert client.put("/import/", json=menus).status_code == 200
+        menu = client.get(f"/{menus[0]['id']}/").json()
+        assert (menu['title'], menu['submenus_count'], menu['dishes_count']) == ("upsert batch renamed", 2, 6)
+        dish = menus[0]['submenus'][1]['dishes'][0]
+        assert client.get(f"/{menus[0]['id']}/submenus/{menus[0]['submenus'][1]['id']}/dishes/{dish['id']}/"
+                          ).json()['price'] == "9.99"
+
+    def test_batch_requires_ids(self):
+        menus = catalogue("upsert ids", menus=1, submenus=1, dishes=1)
+        del menus[0]['submenus'][0]['dishes'][0]['id']
+        response = client.put("/import/", json=menus)
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'] == ['body', 0, 'submenus', 0, 'dishes', 0, 'id']
+
+    def test_batch_conflicts_write_nothing(self):
+        taken = catalogue("upsert taken", menus=1, submenus=1, dishes=1)
+        assert client.put("/import/", json=taken).status_code == 200
+        menus = catalogue("upsert new", menus=1, submenus=1, dishes=1)
+        menus[0]['submenus'][0]['title'] = taken[0]['submenus'][0]['title']
+        response = client.put("/import/", json=menus)
+        assert response.status_code == 409
+        assert [item['message'] for item in response.json()['detail']] == ["Title of Submenu already registered"]
+        menus = catalogue("upsert new", menus=1, submenus=1, dishes=1)
+        menus[0]['submenus'][0]['id'] = taken[0]['submenus'][0]['id']
+        response = client.put("/import/", json=menus)
+        assert response.status_code == 409
+        assert [item['message'] for item in response.json()['detail']] == ["ID of Submenu already registered"]
+        with Session(engine) as session:
+            assert session.query(models.Menu).filter(models.Menu.title.startswith("upsert new")).count() == 0